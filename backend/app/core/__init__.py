@@ -4,8 +4,9 @@ Core services and abstractions.
 This module provides environment-aware abstractions for common services:
 - Cache (Redis)
 - Logging (structured JSON logs)
-- Monitoring (Sentry, APM)
-- Payment (Stripe)
+- Monitoring (Sentry, APM, per-request timing middleware)
+- Profiling (sampling profiler, flamegraph export)
+- Payment (Stripe, sync and async, with a stateful test-mode simulator)
 
 All services work with or without external providers configured.
 Enable/disable services via environment variables in .env files.
@@ -32,9 +33,15 @@ Usage:
 """
 
 from .cache import cache, CacheService
-from .logger import get_logger, log_request, log_db_query, log_error, app_logger
+from .logger import get_logger, log_request, log_db_query, log_error, app_logger, flight_recorder
 from .monitoring import monitor, MonitoringService
+from .profiler import profiler, SamplingProfiler
+from .query_analyzer import query_analyzer, QueryAnalyzer
 from .payment import payment, PaymentService, PaymentStatus, PaymentError
+from .async_payment import async_payment, AsyncPaymentService
+from .webhooks import webhooks, WebhookProcessor, WebhookError
+from .stripe_simulator import stripe_simulator, StripeSimulator
+from .middleware import RequestTimingMiddleware
 
 __all__ = [
     # Cache
@@ -47,16 +54,31 @@ __all__ = [
     "log_db_query",
     "log_error",
     "app_logger",
+    "flight_recorder",
+    "query_analyzer",
+    "QueryAnalyzer",
 
     # Monitoring
     "monitor",
     "MonitoringService",
+    "RequestTimingMiddleware",
+
+    # Profiling
+    "profiler",
+    "SamplingProfiler",
 
     # Payment
     "payment",
     "PaymentService",
     "PaymentStatus",
     "PaymentError",
+    "async_payment",
+    "AsyncPaymentService",
+    "webhooks",
+    "WebhookProcessor",
+    "WebhookError",
+    "stripe_simulator",
+    "StripeSimulator",
 ]
 
 __version__ = "1.0.0"
@@ -0,0 +1,387 @@
+"""
+Async payment processing abstraction.
+
+Same operations and return shapes as PaymentService, as awaitables backed by
+a pooled HTTP/1.1 keep-alive client (httpx) talking to the Stripe REST API.
+Use it from async handlers so Stripe round trips don't block the event loop.
+Works in test mode without real Stripe account, against the in-process
+simulator (app.core.stripe_simulator); point STRIPE_API_BASE at the
+simulator's HTTP server to exercise the real client path.
+
+Usage:
+    from app.core.async_payment import async_payment
+
+    # Create payment intent
+    intent = await async_payment.create_payment_intent(amount=1000, currency="usd")
+
+    # Create customer
+    customer = await async_payment.create_customer(email="user@example.com")
+
+    # Refund payment
+    refund = await async_payment.create_refund(payment_intent_id="pi_xxx", amount=500)
+
+    # On shutdown
+    await async_payment.aclose()
+
+Webhooks involve no outbound I/O: use app.core.webhooks.
+
+Environment Variables:
+    STRIPE_ENABLED: Enable/disable Stripe (default: false)
+    STRIPE_SECRET_KEY: Stripe API secret key (required if STRIPE_ENABLED=true)
+    STRIPE_API_BASE: API base URL (default: https://api.stripe.com)
+    STRIPE_API_VERSION: Stripe-Version header (default: account default)
+    STRIPE_POOL_SIZE: Max pooled connections (default: 10)
+    STRIPE_TIMEOUT_S: Read/write timeout in seconds (default: 30)
+    STRIPE_CONNECT_TIMEOUT_S: Connect timeout in seconds (default: 5)
+    STRIPE_KEEPALIVE_EXPIRY_S: Idle keep-alive connection lifetime (default: 30)
+
+Retries and rate limiting are shared with PaymentService (see STRIPE_MAX_RETRIES
+and STRIPE_RATE_LIMIT_RPS in app.core.payment).
+"""
+
+import os
+from urllib.parse import quote, urlencode
+from typing import Any, Dict, List, Optional, Tuple
+
+from .payment import (
+    PaymentError,
+    payment_cache,
+    stripe_calls,
+    _idempotent_async,
+    _customer_dict,
+    _payment_intent_dict,
+    _refund_dict,
+)
+from .stripe_simulator import stripe_simulator
+from .timing import timed
+
+
+class AsyncPaymentService:
+    """
+    Async payment service with optional Stripe backend.
+
+    Falls back to test mode if Stripe is disabled or httpx is not installed.
+    The HTTP client is created lazily inside the running event loop.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None
+    ):
+        self.enabled = os.getenv("STRIPE_ENABLED", "false").lower() == "true"
+        self._test_mode = not self.enabled
+        self._httpx = None
+        self._client = None
+        self._secret_key = None
+
+        self.api_base = os.getenv("STRIPE_API_BASE", "https://api.stripe.com").rstrip("/")
+        self.api_version = os.getenv("STRIPE_API_VERSION")
+        self.pool_size = pool_size or int(os.getenv("STRIPE_POOL_SIZE", "10"))
+        self.timeout = timeout or float(os.getenv("STRIPE_TIMEOUT_S", "30"))
+        self.connect_timeout = connect_timeout or float(os.getenv("STRIPE_CONNECT_TIMEOUT_S", "5"))
+        self.keepalive_expiry = float(os.getenv("STRIPE_KEEPALIVE_EXPIRY_S", "30"))
+
+        if self.enabled:
+            try:
+                import httpx
+
+                secret_key = os.getenv("STRIPE_SECRET_KEY")
+                if not secret_key:
+                    raise ValueError("STRIPE_SECRET_KEY not set but STRIPE_ENABLED=true")
+
+                self._httpx = httpx
+                self._secret_key = secret_key
+                print(f"✅ Async Stripe client enabled (pool size: {self.pool_size})")
+
+            except Exception as e:
+                print(f"⚠️ Async Stripe initialization failed: {e}. Using test mode.")
+                self.enabled = False
+                self._httpx = None
+                self._test_mode = True
+        else:
+            print("ℹ️ Async Stripe payments disabled. Using test mode.")
+
+    async def __aenter__(self) -> "AsyncPaymentService":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close pooled connections. The client is recreated on next use."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    @timed("payment")
+    async def create_payment_intent(
+        self,
+        amount: int,
+        currency: str = "usd",
+        metadata: Optional[Dict[str, Any]] = None,
+        customer_id: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a payment intent.
+
+        Args:
+            amount: Amount in smallest currency unit (cents for USD)
+            currency: Currency code (usd, eur, etc.)
+            metadata: Additional metadata (order_id, user_id, etc.)
+            customer_id: Stripe customer ID (optional)
+            operation_id: Unique ID of this operation for the idempotency key
+                (repeats are not detected without it)
+
+        Returns:
+            Payment intent object (same shape as PaymentService)
+        """
+        params = {
+            "amount": amount,
+            "currency": currency,
+            "metadata": metadata or {},
+        }
+
+        if customer_id:
+            params["customer"] = customer_id
+
+        async def create(idempotency_key: str) -> Dict[str, Any]:
+            intent = await self._request(
+                "payment_intent.create", "POST", "/v1/payment_intents", params,
+                "create payment intent", idempotency_key
+            )
+            result = _payment_intent_dict(intent, include_secret=True)
+            return await payment_cache.store_created_async("payment_intent", result)
+
+        async def read_secret(payment_intent_id: str) -> str:
+            intent = await self._request(
+                "payment_intent.retrieve", "GET", _object_path("payment_intents", payment_intent_id), None,
+                "retrieve payment intent"
+            )
+            return intent["client_secret"]
+
+        return await _idempotent_async("payment_intent.create", params, operation_id, create, read_secret)
+
+    @timed("payment")
+    async def retrieve_payment_intent(self, payment_intent_id: str, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Retrieve a payment intent by ID (cached, see PaymentService).
+
+        Args:
+            payment_intent_id: Payment intent ID
+            fresh: Bypass the cache and read from Stripe (read-your-writes)
+
+        Returns:
+            Payment intent object (same shape as PaymentService)
+        """
+        if not fresh:
+            cached = await payment_cache.get_async("payment_intent", payment_intent_id)
+            if cached is not None:
+                return cached
+
+        intent = await self._request(
+            "payment_intent.retrieve", "GET", _object_path("payment_intents", payment_intent_id), None,
+            "retrieve payment intent"
+        )
+        return await payment_cache.store_async("payment_intent", _payment_intent_dict(intent))
+
+    @timed("payment")
+    async def retrieve_customer(self, customer_id: str, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Retrieve a customer by ID (cached, see PaymentService).
+
+        Args:
+            customer_id: Stripe customer ID
+            fresh: Bypass the cache and read from Stripe (read-your-writes)
+
+        Returns:
+            Customer object (same shape as PaymentService)
+        """
+        if not fresh:
+            cached = await payment_cache.get_async("customer", customer_id)
+            if cached is not None:
+                return cached
+
+        customer = await self._request(
+            "customer.retrieve", "GET", _object_path("customers", customer_id), None, "retrieve customer"
+        )
+        return await payment_cache.store_async("customer", _customer_dict(customer))
+
+    @timed("payment")
+    async def create_customer(
+        self,
+        email: str,
+        name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        operation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a Stripe customer.
+
+        Args:
+            email: Customer email
+            name: Customer name (optional)
+            metadata: Additional metadata
+            operation_id: Unique ID of this operation for the idempotency key
+                (repeats are not detected without it)
+
+        Returns:
+            Customer object (same shape as PaymentService)
+        """
+        params = {
+            "email": email,
+            "metadata": metadata or {},
+        }
+
+        if name:
+            params["name"] = name
+
+        async def create(idempotency_key: str) -> Dict[str, Any]:
+            customer = await self._request(
+                "customer.create", "POST", "/v1/customers", params, "create customer", idempotency_key
+            )
+            return await payment_cache.store_created_async("customer", _customer_dict(customer))
+
+        return await _idempotent_async("customer.create", params, operation_id, create)
+
+    @timed("payment")
+    async def create_refund(
+        self,
+        payment_intent_id: str,
+        amount: Optional[int] = None,
+        reason: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a refund for a payment.
+
+        Args:
+            payment_intent_id: Payment intent ID to refund
+            amount: Amount to refund (None for full refund)
+            reason: Refund reason (optional)
+            operation_id: Unique ID of this operation for the idempotency key
+                (repeats are not detected without it)
+
+        Returns:
+            Refund object (same shape as PaymentService)
+        """
+        params = {
+            "payment_intent": payment_intent_id,
+        }
+
+        if amount:
+            params["amount"] = amount
+
+        if reason:
+            params["reason"] = reason
+
+        async def create(idempotency_key: str) -> Dict[str, Any]:
+            refund = await self._request(
+                "refund.create", "POST", "/v1/refunds", params, "create refund", idempotency_key
+            )
+            return _refund_dict(refund)
+
+        return await _idempotent_async("refund.create", params, operation_id, create)
+
+    def _get_client(self):
+        if self._client is None:
+            httpx = self._httpx
+            headers = {"Authorization": f"Bearer {self._secret_key}"}
+            if self.api_version:
+                headers["Stripe-Version"] = self.api_version
+
+            self._client = httpx.AsyncClient(
+                base_url=self.api_base,
+                headers=headers,
+                http2=False,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        action: str,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        try:
+            return await stripe_calls.call_async(operation, self._send, method, path, params, idempotency_key)
+        except Exception as e:
+            raise PaymentError(f"Failed to {action}: {str(e)}")
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if self._test_mode:
+            return await stripe_simulator.call_async(method, path, params, idempotency_key)
+
+        client = self._get_client()
+        if method == "GET":
+            response = await client.get(path, params=_encode_params(params or {}))
+        else:
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+            if idempotency_key:
+                headers["Idempotency-Key"] = idempotency_key
+            response = await client.request(
+                method,
+                path,
+                content=urlencode(_encode_params(params or {})),
+                headers=headers,
+            )
+
+        if response.status_code >= 400:
+            try:
+                message = response.json()["error"]["message"]
+            except Exception:
+                message = f"HTTP {response.status_code}"
+            raise StripeHTTPError(message, response.status_code, response.headers)
+
+        return response.json()
+
+
+class StripeHTTPError(Exception):
+    """Error response from the Stripe API; status and headers drive retries."""
+
+    def __init__(self, message: str, http_status: int, headers: Any):
+        super().__init__(message)
+        self.http_status = http_status
+        self.headers = headers
+
+
+def _object_path(resource: str, object_id: str) -> str:
+    """API path of one object; the ID is escaped so it stays a single path segment."""
+    return f"/v1/{resource}/{quote(object_id, safe='')}"
+
+
+def _encode_params(params: Dict[str, Any], prefix: str = "") -> List[Tuple[str, str]]:
+    """Flatten params into Stripe's form encoding (metadata[key]=value, items[0]=...)."""
+    pairs = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, dict):
+            pairs.extend(_encode_params(value, name))
+        elif isinstance(value, (list, tuple)):
+            pairs.extend(_encode_params(dict(enumerate(value)), name))
+        elif isinstance(value, bool):
+            pairs.append((name, "true" if value else "false"))
+        elif value is not None:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+# Global async payment instance
+async_payment = AsyncPaymentService()
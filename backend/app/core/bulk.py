@@ -0,0 +1,183 @@
+"""
+Bulk operation runner.
+
+Runs one operation over many items with bounded concurrency, streams
+per-item outcomes as they complete, checkpoints progress to a file so an
+interrupted batch resumes where it stopped, and summarises the run.
+
+Usage:
+    from app.core import payment
+
+    run = payment.bulk_refund(
+        [{"payment_intent_id": "pi_1", "amount": 500}, "pi_2", ...],
+        concurrency=8,
+        checkpoint="/var/tmp/refund-campaign-42.jsonl",
+    )
+    for outcome in run:
+        if outcome["status"] == "failed":
+            logger.warning("Refund failed", extra=outcome)
+
+    print(run.summary())
+
+Each item gets the operation ID "<batch_id>:<index>" unless it brings its own,
+so re-running a batch (with the same checkpoint or batch_id) never repeats a
+completed operation even if the checkpoint lags behind.
+"""
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from .monitoring import monitor
+
+# Failures kept in the summary (all of them are streamed)
+MAX_SUMMARY_FAILURES = 100
+
+
+class BulkRun:
+    """
+    A lazily executed bulk operation.
+
+    Iterate to drive the run and receive outcomes in completion order:
+    {"index", "status": "succeeded" | "failed" | "skipped", "result" | "error"}.
+    summary() drains any remaining items and returns the totals.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        items: Iterable[Any],
+        fn: Callable[[Any, str], Dict[str, Any]],
+        concurrency: int = 8,
+        checkpoint: Optional[str] = None,
+        batch_id: Optional[str] = None
+    ):
+        """
+        Args:
+            operation: Operation name for metrics and the summary
+            items: Items to process (any iterable; consumed lazily)
+            fn: Called as fn(item, operation_id) for each item
+            concurrency: Max items in progress at once
+            checkpoint: JSONL file recording completed items, for resuming
+            batch_id: Prefix of per-item operation IDs (default: checkpoint file
+                name, or a random ID when there is no checkpoint)
+        """
+        self.operation = operation
+        self.items = items
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.checkpoint = checkpoint
+        self.batch_id = batch_id or (
+            os.path.basename(checkpoint) if checkpoint else uuid.uuid4().hex
+        )
+
+        self._counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        self._failures: List[Dict[str, Any]] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._iterator: Optional[Iterator[Dict[str, Any]]] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._iterator is None:
+            self._iterator = self._run()
+        return self._iterator
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Run any remaining items and return the totals.
+
+        Returns:
+            Dictionary with operation, batch_id, total, succeeded, failed,
+            skipped, duration_s and up to MAX_SUMMARY_FAILURES failures
+        """
+        for _ in self:
+            pass
+
+        duration = (self._finished or time.perf_counter()) - (self._started or time.perf_counter())
+        return {
+            "operation": self.operation,
+            "batch_id": self.batch_id,
+            "total": sum(self._counts.values()),
+            **self._counts,
+            "duration_s": round(duration, 3),
+            "failures": list(self._failures),
+        }
+
+    def _run(self) -> Iterator[Dict[str, Any]]:
+        self._started = time.perf_counter()
+        completed = self._load_checkpoint()
+        checkpoint = self._open_checkpoint()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="app-core-bulk") as pool:
+                pending = set()
+                for index, item in enumerate(self.items):
+                    if index in completed:
+                        yield self._record({"index": index, "status": "skipped"}, None)
+                        continue
+
+                    pending.add(pool.submit(self._run_one, index, item))
+                    # Keep the input lazy: at most 2x concurrency items submitted
+                    if len(pending) >= self.concurrency * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            yield self._record(future.result(), checkpoint)
+
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield self._record(future.result(), checkpoint)
+        finally:
+            if checkpoint:
+                checkpoint.close()
+            self._finished = time.perf_counter()
+
+    def _run_one(self, index: int, item: Any) -> Dict[str, Any]:
+        try:
+            result = self.fn(item, f"{self.batch_id}:{index}")
+            return {"index": index, "status": "succeeded", "result": result}
+        except Exception as e:
+            return {"index": index, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+    def _record(self, outcome: Dict[str, Any], checkpoint) -> Dict[str, Any]:
+        status = outcome["status"]
+        self._counts[status] += 1
+        monitor.increment("bulk.items", tags={"operation": self.operation, "status": status})
+
+        if status == "failed" and len(self._failures) < MAX_SUMMARY_FAILURES:
+            self._failures.append({"index": outcome["index"], "error": outcome["error"]})
+
+        if checkpoint and status == "succeeded":
+            result_id = (outcome.get("result") or {}).get("id")
+            checkpoint.write(json.dumps({"index": outcome["index"], "id": result_id}) + "\n")
+            checkpoint.flush()
+        return outcome
+
+    def _open_checkpoint(self):
+        if not self.checkpoint:
+            return None
+        f = open(self.checkpoint, "a+", encoding="utf-8")
+        # Terminate a torn last line so new records start on their own line
+        if f.tell():
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        return f
+
+    def _load_checkpoint(self) -> Set[int]:
+        """Indexes of items that succeeded in previous runs (failures are retried)."""
+        completed: Set[int] = set()
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return completed
+
+        with open(self.checkpoint, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    completed.add(json.loads(line)["index"])
+                except (ValueError, KeyError):
+                    # Torn last line from an interrupted write
+                    continue
+        return completed
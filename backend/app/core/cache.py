@@ -19,29 +19,54 @@ Usage:
     # Clear all cache
     cache.clear()
 
+    # From async code (Redis calls run in a thread, off the event loop)
+    user = await cache.get_async("user:123")
+
+The in-memory fallback expires entries on read, sweeps out expired entries
+that are never read again (idempotency results, webhook dedupe keys) at most
+every CACHE_MEMORY_SWEEP_INTERVAL_S on write, and evicts the oldest entries
+beyond CACHE_MEMORY_MAX_KEYS.
+
+Within a request (app.core.timing), Redis round trips are timed as "cache";
+in-memory calls take well under a microsecond, so they are only counted.
+
 Environment Variables:
     REDIS_ENABLED: Enable/disable Redis caching (default: false)
     REDIS_URL: Redis connection URL (required if REDIS_ENABLED=true)
+    CACHE_MEMORY_MAX_KEYS: In-memory entries kept before evicting the oldest (default: 100000)
+    CACHE_MEMORY_SWEEP_INTERVAL_S: Min seconds between expired-entry sweeps (default: 60)
 """
 
 import os
+import asyncio
 import json
+import itertools
+import threading
+import time
 from typing import Any, Optional
 from datetime import timedelta
 
+from .timing import record_call, record_time
+
 
 class CacheService:
     """
     Cache service with optional Redis backend.
 
-    Falls back to in-memory dict if Redis is disabled.
-    Safe to use in development without Redis.
+    Falls back to in-memory dict if Redis is disabled (TTL enforced on read,
+    expired entries swept periodically, size bounded). Safe to use in
+    development without Redis.
     """
 
     def __init__(self):
         self.enabled = os.getenv("REDIS_ENABLED", "false").lower() == "true"
         self._redis_client = None
         self._memory_cache = {}  # Fallback in-memory cache
+        self._memory_expiry = {}  # key -> monotonic expiry time
+        self._memory_lock = threading.Lock()  # Serialises set_if_absent()
+        self.memory_max_keys = int(os.getenv("CACHE_MEMORY_MAX_KEYS", "100000"))
+        self._sweep_interval = float(os.getenv("CACHE_MEMORY_SWEEP_INTERVAL_S", "60"))
+        self._next_sweep = time.monotonic() + self._sweep_interval
 
         if self.enabled:
             try:
@@ -76,7 +101,7 @@ class CacheService:
         """
         if self.enabled and self._redis_client:
             try:
-                value = self._redis_client.get(key)
+                value = self._redis_call("get", key)
                 if value:
                     # Try to deserialize JSON
                     try:
@@ -89,6 +114,9 @@ class CacheService:
                 return None
         else:
             # In-memory cache
+            record_call("cache")
+            if self._memory_expired(key):
+                return None
             return self._memory_cache.get(key)
 
     def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
@@ -109,16 +137,52 @@ class CacheService:
                 if not isinstance(value, str):
                     value = json.dumps(value)
 
-                self._redis_client.setex(key, ttl, value)
+                self._redis_call("setex", key, ttl, value)
                 return True
             except Exception as e:
                 print(f"⚠️ Redis set error: {e}")
                 return False
         else:
-            # In-memory cache (no TTL support in simple dict)
+            # In-memory cache (expired on access, swept and bounded here)
+            record_call("cache")
+            now = time.monotonic()
             self._memory_cache[key] = value
+            self._memory_expiry[key] = now + ttl
+            if now >= self._next_sweep or len(self._memory_cache) > self.memory_max_keys:
+                self._memory_evict(now)
             return True
 
+    def set_if_absent(self, key: str, value: Any, ttl: int = 3600) -> Optional[bool]:
+        """
+        Set a value only if the key doesn't exist (atomic, SET NX EX on Redis).
+
+        Use it to claim work across processes, e.g. webhook event IDs.
+
+        Args:
+            key: Cache key
+            value: Value to cache (will be JSON serialized)
+            ttl: Time to live in seconds
+
+        Returns:
+            True if set, False if the key already existed, None on backend error
+        """
+        if self.enabled and self._redis_client:
+            try:
+                if not isinstance(value, str):
+                    value = json.dumps(value)
+                return bool(self._redis_call("set", key, value, nx=True, ex=ttl))
+            except Exception as e:
+                print(f"⚠️ Redis set_if_absent error: {e}")
+                return None
+        else:
+            record_call("cache")
+            with self._memory_lock:
+                if not self._memory_expired(key) and key in self._memory_cache:
+                    return False
+                self._memory_cache[key] = value
+                self._memory_expiry[key] = time.monotonic() + ttl
+                return True
+
     def delete(self, key: str) -> bool:
         """
         Delete value from cache.
@@ -131,15 +195,16 @@ class CacheService:
         """
         if self.enabled and self._redis_client:
             try:
-                self._redis_client.delete(key)
+                self._redis_call("delete", key)
                 return True
             except Exception as e:
                 print(f"⚠️ Redis delete error: {e}")
                 return False
         else:
             # In-memory cache
-            if key in self._memory_cache:
-                del self._memory_cache[key]
+            record_call("cache")
+            self._memory_cache.pop(key, None)
+            self._memory_expiry.pop(key, None)
             return True
 
     def clear(self) -> bool:
@@ -153,14 +218,16 @@ class CacheService:
         """
         if self.enabled and self._redis_client:
             try:
-                self._redis_client.flushdb()
+                self._redis_call("flushdb")
                 return True
             except Exception as e:
                 print(f"⚠️ Redis clear error: {e}")
                 return False
         else:
             # In-memory cache
+            record_call("cache")
             self._memory_cache.clear()
+            self._memory_expiry.clear()
             return True
 
     def exists(self, key: str) -> bool:
@@ -175,12 +242,13 @@ class CacheService:
         """
         if self.enabled and self._redis_client:
             try:
-                return bool(self._redis_client.exists(key))
+                return bool(self._redis_call("exists", key))
             except Exception as e:
                 print(f"⚠️ Redis exists error: {e}")
                 return False
         else:
-            return key in self._memory_cache
+            record_call("cache")
+            return not self._memory_expired(key) and key in self._memory_cache
 
     def get_many(self, keys: list[str]) -> dict[str, Any]:
         """
@@ -216,6 +284,57 @@ class CacheService:
                 success = False
         return success
 
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get() for async callers; a blocking Redis round trip runs in a thread."""
+        if self.enabled and self._redis_client:
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def set_async(self, key: str, value: Any, ttl: int = 3600) -> bool:
+        """set() for async callers; a blocking Redis round trip runs in a thread."""
+        if self.enabled and self._redis_client:
+            return await asyncio.to_thread(self.set, key, value, ttl)
+        return self.set(key, value, ttl)
+
+    async def delete_async(self, key: str) -> bool:
+        """delete() for async callers; a blocking Redis round trip runs in a thread."""
+        if self.enabled and self._redis_client:
+            return await asyncio.to_thread(self.delete, key)
+        return self.delete(key)
+
+    def _redis_call(self, method: str, *args, **kwargs) -> Any:
+        """One Redis round trip, timed as "cache" in the current request (app.core.timing)."""
+        started = time.perf_counter()
+        try:
+            return getattr(self._redis_client, method)(*args, **kwargs)
+        finally:
+            record_time("cache", (time.perf_counter() - started) * 1000)
+
+    def _memory_evict(self, now: float):
+        """Drop expired in-memory entries, then the oldest ones beyond memory_max_keys."""
+        self._next_sweep = now + self._sweep_interval
+        for key, expires_at in list(self._memory_expiry.items()):
+            if expires_at <= now:
+                self._memory_cache.pop(key, None)
+                self._memory_expiry.pop(key, None)
+
+        excess = len(self._memory_cache) - self.memory_max_keys
+        if excess > 0:
+            # Evict a tenth extra so a full cache doesn't evict on every write
+            excess += self.memory_max_keys // 10
+            for key in list(itertools.islice(self._memory_cache, excess)):
+                self._memory_cache.pop(key, None)
+                self._memory_expiry.pop(key, None)
+
+    def _memory_expired(self, key: str) -> bool:
+        """Drop an expired in-memory entry. Returns True if it was expired."""
+        expires_at = self._memory_expiry.get(key)
+        if expires_at is None or expires_at > time.monotonic():
+            return False
+        self._memory_cache.pop(key, None)
+        self._memory_expiry.pop(key, None)
+        return True
+
 
 # Global cache instance
 cache = CacheService()
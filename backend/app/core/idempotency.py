@@ -0,0 +1,188 @@
+"""
+Idempotent operations with a local result cache.
+
+Derives idempotency keys from caller-supplied operation IDs (or, opt-in,
+from request content), returns completed results from CacheService for `ttl`
+seconds, and collapses concurrent duplicates in this process into a single
+call.
+
+Usage:
+    from app.core.idempotency import IdempotencyGuard
+
+    guard = IdempotencyGuard("payment", ttl=300)
+
+    key = guard.key_for("refund.create", params, operation_id="refund-order-123")
+    refund = guard.run(key, lambda: create_refund(params, idempotency_key=key))
+
+    # Async callers
+    refund = await guard.run_async(key, lambda: create_refund_async(params, idempotency_key=key))
+
+Results holding secrets can be cached redacted and completed on a hit:
+
+    intent = guard.run(key, create, redact=strip_secret, restore=fetch_secret)
+
+Cache hits and collapsed duplicates are counted as "<namespace>.idempotency.hit"
+and "<namespace>.idempotency.collapsed" metrics.
+
+Prefer an operation ID (request, cart, order or batch item ID): it is what
+tells a double-click from two customers buying the same thing. Content-derived
+keys treat every request with identical parameters as the same operation, so
+only use them where the parameters identify the subject (a customer, an
+intent being refunded).
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .cache import cache
+from .monitoring import monitor
+
+
+class _InFlight:
+    """Result slot shared by threads waiting on the same key."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class IdempotencyGuard:
+    """
+    Cache-backed idempotency for one family of operations.
+
+    Results are stored in CacheService under "idempotency:<namespace>:<key>".
+    Failed calls are not cached, so a retry with the same key calls again.
+    Callers pass `redact` to keep secrets out of the shared cache and
+    `restore` to put them back when a cached result is returned.
+    """
+
+    def __init__(self, namespace: str, ttl: int = 300):
+        """
+        Args:
+            namespace: Key namespace (e.g. "payment")
+            ttl: Seconds completed results are reused
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+
+    def key_for(self, operation: str, params: Dict[str, Any], operation_id: Optional[str] = None) -> str:
+        """
+        Build an idempotency key.
+
+        Args:
+            operation: Operation name (e.g. "payment_intent.create")
+            params: Request parameters, hashed when no operation_id is given
+            operation_id: Caller-supplied unique ID for this operation (preferred)
+
+        Returns:
+            Key usable as a Stripe Idempotency-Key (< 255 chars)
+        """
+        if operation_id:
+            return f"{operation}:{operation_id}"
+
+        content = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(content.encode()).hexdigest()[:32]
+        return f"{operation}:{digest}"
+
+    def run(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        redact: Optional[Callable[[Any], Any]] = None,
+        restore: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Return the cached result for `key`, or call `fn` once and cache it.
+
+        Concurrent callers with the same key wait for the first one and
+        share its full result; only the redacted result is cached.
+
+        Args:
+            key: Idempotency key (see key_for)
+            fn: Performs the operation
+            redact: Maps a result to the value cached (e.g. without secrets)
+            restore: Maps a cached value back to a result on a hit
+        """
+        cache_key = self._cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            monitor.increment(f"{self.namespace}.idempotency.hit")
+            return restore(cached) if restore else cached
+
+        with self._lock:
+            slot = self._inflight.get(key)
+            owner = slot is None
+            if owner:
+                slot = self._inflight[key] = _InFlight()
+
+        if not owner:
+            monitor.increment(f"{self.namespace}.idempotency.collapsed")
+            slot.event.wait()
+            if slot.error is not None:
+                raise slot.error
+            return slot.result
+
+        try:
+            slot.result = fn()
+            cache.set(cache_key, redact(slot.result) if redact else slot.result, ttl=self.ttl)
+            return slot.result
+        except BaseException as e:
+            slot.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            slot.event.set()
+
+    async def run_async(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        redact: Optional[Callable[[Any], Any]] = None,
+        restore: Optional[Callable[[Any], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Async version of run(); concurrent tasks with the same key share one call.
+
+        `restore` is awaited here.
+        """
+        cache_key = self._cache_key(key)
+        cached = await cache.get_async(cache_key)
+        if cached is not None:
+            monitor.increment(f"{self.namespace}.idempotency.hit")
+            return await restore(cached) if restore else cached
+
+        pending = self._inflight_async.get(key)
+        if pending is not None:
+            monitor.increment(f"{self.namespace}.idempotency.collapsed")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = future
+        try:
+            result = await fn()
+            await cache.set_async(cache_key, redact(result) if redact else result, ttl=self.ttl)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark retrieved so an unawaited future doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def _cache_key(self, key: str) -> str:
+        return f"idempotency:{self.namespace}:{key}"
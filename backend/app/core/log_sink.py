@@ -0,0 +1,342 @@
+"""
+Buffered log file sink.
+
+Writes formatted records straight to a file, for hosts without a log agent,
+instead of piping stdout through the shell. Callers only append to an
+in-memory buffer; a background thread writes it out every
+LOG_FILE_FLUSH_INTERVAL_S or as soon as LOG_FILE_BUFFER_KB is reached, and
+rotates the file by size or age between writes, so logging never waits for
+rotation. Rotated files are gzip-compressed on a second background thread
+and the oldest are deleted beyond LOG_FILE_RETENTION.
+
+Usage:
+    # Selected by get_logger() with LOG_OUTPUT=file
+    LOG_OUTPUT=file LOG_FILE_PATH=/var/log/app/app.log uvicorn app.main:app
+
+    # Or attach directly
+    from app.core.log_sink import get_file_handler
+    logging.getLogger("audit").addHandler(get_file_handler("/var/log/app/audit.log"))
+
+Rotated files are named "<path>.<YYYYmmdd-HHMMSS>[.gz]". Records are flushed
+at interpreter exit (logging.shutdown()); a hard kill loses at most one flush
+interval of records. If the buffer reaches 8x LOG_FILE_BUFFER_KB because the
+disk can't keep up, writers flush synchronously rather than drop records.
+
+The gain over redirecting stdout is not raw throughput (formatting dominates
+and the two measure within noise in benchmarks.core_services) but that disk
+writes, rotation and compression happen off the logging thread.
+
+Several processes (e.g. uvicorn/gunicorn workers) can share one path: before
+each write a handler checks whether the file was rotated by another process
+(inode changed, as logging.handlers.WatchedFileHandler does) and reopens it;
+rotation is serialised through "<path>.lock" (POSIX flock), and a rotated
+file is only compressed ROTATION_GRACE_S after the rename, once the other
+writers have moved to the new file. Without fcntl (Windows) use one path
+per process.
+
+Environment Variables:
+    LOG_FILE_PATH: Log file path (default: logs/app.log)
+    LOG_FILE_BUFFER_KB: Buffered bytes that trigger a write (default: 256)
+    LOG_FILE_FLUSH_INTERVAL_S: Max seconds a record stays buffered (default: 1)
+    LOG_FILE_MAX_MB: Rotate when the file reaches this size, 0 disables (default: 100)
+    LOG_FILE_ROTATE_INTERVAL_S: Rotate after this many seconds, 0 disables (default: 0;
+        86400 for daily files)
+    LOG_FILE_COMPRESS: Gzip rotated files in the background (default: true)
+    LOG_FILE_RETENTION: Rotated files kept, 0 keeps all (default: 14)
+"""
+
+import gzip
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process rotation lock
+    fcntl = None
+
+# Buffer size, as a multiple of the flush threshold, at which writers flush themselves
+BACKPRESSURE_FACTOR = 8
+
+# Seconds between rotation and compression, on top of two flush intervals, so
+# other processes writing the same path notice the rename and reopen first
+ROTATION_GRACE_S = 1.0
+
+_STOP = object()
+
+
+class BufferedFileHandler(logging.Handler):
+    """
+    Logging handler with a write buffer and background flush, rotation and compression.
+
+    Share one instance per file between loggers (see get_file_handler()).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        buffer_bytes: int = 256 * 1024,
+        flush_interval: float = 1.0,
+        max_bytes: int = 100 * 1024 * 1024,
+        rotate_interval: float = 0,
+        compress: bool = True,
+        retention: int = 14
+    ):
+        """
+        Args:
+            path: Log file path (parent directories are created)
+            buffer_bytes: Buffered bytes that trigger a background write
+            flush_interval: Max seconds between writes
+            max_bytes: Rotate at this file size (0 disables)
+            rotate_interval: Rotate this many seconds after opening (0 disables)
+            compress: Gzip rotated files
+            retention: Rotated files kept (0 keeps all)
+        """
+        super().__init__()
+        self.path = os.path.abspath(path)
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.retention = retention
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        # Own lock rather than the handler lock: logging.shutdown() holds that
+        # while calling close(), which waits for the flusher thread
+        self._buffer_lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+        # Only the thread holding _file_lock touches the file
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._file_size = 0
+        self._opened_at = 0.0
+        self._open()
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="app-core-log-flush", daemon=True)
+        self._flusher.start()
+
+        self._rotated: "queue.Queue" = queue.Queue()  # (path, monotonic time it may be compressed)
+        self._compressor = threading.Thread(target=self._compress_loop, name="app-core-log-compress", daemon=True)
+        self._compressor.start()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._buffer_lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            buffered = self._buffered
+
+        if buffered >= self.buffer_bytes:
+            if buffered >= self.buffer_bytes * BACKPRESSURE_FACTOR:
+                # The flusher can't keep up: write in this thread instead of growing
+                self._write(self._take())
+            else:
+                self._wake.set()
+
+    def flush(self):
+        """Write everything buffered so far (blocks until written)."""
+        self._write(self._take(), force_flush=True)
+
+    def close(self):
+        """
+        Flush, stop the background threads and close the file.
+
+        Waits for pending compressions, i.e. up to ROTATION_GRACE_S plus two
+        flush intervals after a rotation.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+        with self._file_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+        self._rotated.put(_STOP)
+        self._compressor.join()
+        super().close()
+
+    def rotate(self):
+        """Rotate now (e.g. from a SIGHUP handler); compression runs in the background."""
+        self.flush()
+        with self._file_lock:
+            self._rotate()
+
+    # Internals
+
+    def _take(self) -> str:
+        """Swap the buffer out and return its contents."""
+        with self._buffer_lock:
+            buffer, self._buffer, self._buffered = self._buffer, [], 0
+        return "".join(buffer)
+
+    def _write(self, chunk: str, force_flush: bool = False):
+        with self._file_lock:
+            if chunk and self._file:
+                try:
+                    self._reopen_if_moved()
+                    self._file.write(chunk)
+                    self._file.flush()
+                    # Size of the shared file, including other processes' writes
+                    self._file_size = os.fstat(self._file.fileno()).st_size
+                except OSError as e:
+                    print(f"⚠️ Log file write failed ({self.path}): {e}", file=sys.stderr)
+            elif force_flush and self._file:
+                self._file.flush()
+
+            if self._should_rotate():
+                self._rotate()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write(self._take())
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8", buffering=max(self.buffer_bytes, 8192))
+        self._file_size = self._file.tell()
+        # Time-based rotation counts from when this process opened the file
+        self._opened_at = time.time()
+
+    def _moved(self) -> bool:
+        """True if self.path no longer is the file we have open (rotated elsewhere)."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self._file.fileno())
+        return (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+
+    def _reopen_if_moved(self):
+        if self._moved():
+            self._file.close()
+            self._open()
+
+    def _should_rotate(self) -> bool:
+        if not self._file_size:
+            return False
+        if self.max_bytes and self._file_size >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+
+    @contextmanager
+    def _rotation_lock(self):
+        """Exclusive lock shared by all processes writing this path."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        """Close, rename and reopen the file. Caller holds _file_lock."""
+        with self._rotation_lock():
+            if self._file and self._moved():
+                # Another process rotated while we waited for the lock
+                self._reopen_if_moved()
+                return
+            if self._file:
+                self._file.close()
+            target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+            suffix = 1
+            while os.path.exists(target) or os.path.exists(target + ".gz"):
+                target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.{suffix}"
+                suffix += 1
+            try:
+                os.replace(self.path, target)
+                self._rotated.put((target, time.monotonic() + self._grace()))
+            except OSError as e:
+                print(f"⚠️ Log file rotation failed ({self.path}): {e}", file=sys.stderr)
+            self._open()
+
+    def _grace(self) -> float:
+        return ROTATION_GRACE_S + 2 * self.flush_interval
+
+    def _compress_loop(self):
+        while True:
+            item = self._rotated.get()
+            if item is _STOP:
+                return
+            path, ready_at = item
+            try:
+                delay = ready_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.compress:
+                    with open(path, "rb") as source, gzip.open(path + ".gz", "wb", compresslevel=6) as target:
+                        shutil.copyfileobj(source, target, 1024 * 1024)
+                    os.remove(path)
+                self._apply_retention()
+            except OSError as e:
+                print(f"⚠️ Log file compression failed ({path}): {e}", file=sys.stderr)
+
+    def _apply_retention(self):
+        if not self.retention:
+            return
+        directory, name = os.path.split(self.path)
+        rotated = sorted(
+            (
+                os.path.join(directory, entry) for entry in os.listdir(directory)
+                if entry.startswith(name + ".") and entry != name + ".lock"
+            ),
+            key=os.path.getmtime,
+        )
+        for path in rotated[:-self.retention]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_handlers: Dict[str, BufferedFileHandler] = {}
+_handlers_lock = threading.Lock()
+
+
+def get_file_handler(path: Optional[str] = None) -> BufferedFileHandler:
+    """
+    Get the shared handler for a log file, configured from the environment.
+
+    Args:
+        path: Log file path (default: LOG_FILE_PATH)
+
+    Returns:
+        BufferedFileHandler (one per path per process)
+    """
+    path = os.path.abspath(path or os.getenv("LOG_FILE_PATH", "logs/app.log"))
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            handler = _handlers[path] = BufferedFileHandler(
+                path,
+                buffer_bytes=int(os.getenv("LOG_FILE_BUFFER_KB", "256")) * 1024,
+                flush_interval=float(os.getenv("LOG_FILE_FLUSH_INTERVAL_S", "1")),
+                max_bytes=int(float(os.getenv("LOG_FILE_MAX_MB", "100")) * 1024 * 1024),
+                rotate_interval=float(os.getenv("LOG_FILE_ROTATE_INTERVAL_S", "0")),
+                compress=os.getenv("LOG_FILE_COMPRESS", "true").lower() == "true",
+                retention=int(os.getenv("LOG_FILE_RETENTION", "14")),
+            )
+        return handler
@@ -12,16 +12,156 @@ Usage:
     logger.info("User created", extra={"user_id": 123, "email": "user@example.com"})
     logger.error("Payment failed", extra={"error": str(e), "amount": 1000})
 
+    # Flight recorder: keep recent records (including suppressed DEBUG) per request
+    with flight_recorder.record():
+        handle_request()  # log_error() / monitor.capture_exception() flush the buffer
+
 Environment Variables:
     LOG_LEVEL: Logging level (DEBUG, INFO, WARN, ERROR) - default: INFO
     LOG_FORMAT: Output format (json or text) - default: json
+    LOG_OUTPUT: Destination (stdout, or file for the buffered file sink in
+        app.core.log_sink, configured with LOG_FILE_*) - default: stdout
     ENV: Environment (dev, staging, prod) - affects defaults
+    LOG_FLIGHT_RECORDER_ENABLED: Buffer records below LOG_LEVEL for error context - default: false
+    LOG_FLIGHT_RECORDER_SIZE: Records kept per request/task buffer - default: 256
 """
 
 import os
 import logging
 import sys
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .timing import record_time
+
+
+class _RingBuffer:
+    """Preallocated ring of LogRecords; records are stored unformatted."""
+
+    __slots__ = ("_items", "_size", "_next", "_flushed")
+
+    def __init__(self, size: int):
+        self._items: List[Optional[logging.LogRecord]] = [None] * size
+        self._size = size
+        self._next = 0  # Total records appended
+        self._flushed = 0  # Watermark of records already flushed
+
+    def append(self, record: logging.LogRecord):
+        # Not locked: concurrent writers to a shared buffer may lose a record,
+        # which is acceptable for diagnostics and keeps the hot path cheap
+        index = self._next
+        self._items[index % self._size] = record
+        self._next = index + 1
+
+    def records(self, start: int = 0) -> List[logging.LogRecord]:
+        end = self._next
+        start = max(start, end - self._size)
+        return [self._items[i % self._size] for i in range(start, end)]
+
+    def take_unflushed(self) -> List[logging.LogRecord]:
+        records = self.records(self._flushed)
+        self._flushed = self._next
+        return records
+
+
+class FlightRecorder:
+    """
+    Ring buffer of recent log records per request or task.
+
+    When enabled, loggers from get_logger() accept DEBUG records but only
+    write records at LOG_LEVEL or above; everything is also kept, unformatted,
+    in the current buffer. On error, flush() writes the suppressed records
+    and snapshot() provides them for the monitoring event.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LOG_FLIGHT_RECORDER_ENABLED", "false").lower() == "true"
+        self.size = int(os.getenv("LOG_FLIGHT_RECORDER_SIZE", "256"))
+        self._current: ContextVar[Optional[_RingBuffer]] = ContextVar("flight_recorder", default=None)
+        self._default = _RingBuffer(self.size)  # Used outside record() blocks
+
+    @contextmanager
+    def record(self, size: Optional[int] = None):
+        """
+        Bind a fresh buffer to the current request or task.
+
+        Tasks created inside the block inherit the buffer (contextvars).
+
+        Args:
+            size: Buffer size (default: LOG_FLIGHT_RECORDER_SIZE)
+
+        Example:
+            async def handler(request):
+                with flight_recorder.record():
+                    return await process(request)
+        """
+        token = self._current.set(_RingBuffer(size or self.size))
+        try:
+            yield
+        finally:
+            self._current.reset(token)
+
+    def append(self, record: logging.LogRecord):
+        """Store a record in the current buffer."""
+        (self._current.get() or self._default).append(record)
+
+    def flush(self) -> int:
+        """
+        Write buffered records that were suppressed by handler levels.
+
+        Each record goes to the handlers of its own logger, bypassing their
+        level. Records are flushed at most once.
+
+        Returns:
+            Number of records written
+        """
+        if not self.enabled:
+            return 0
+
+        written = 0
+        for record in (self._current.get() or self._default).take_unflushed():
+            for handler in logging.getLogger(record.name).handlers:
+                if isinstance(handler, FlightRecorderHandler) or record.levelno >= handler.level:
+                    continue
+                handler.handle(record)
+                written += 1
+        return written
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get the records in the current buffer, oldest first.
+
+        Returns:
+            List of dicts with timestamp, logger, level and message
+        """
+        if not self.enabled:
+            return []
+
+        return [
+            {
+                "timestamp": record.created,
+                "logger": record.name,
+                "level": record.levelname,
+                "message": record.getMessage(),
+            }
+            for record in (self._current.get() or self._default).records()
+        ]
+
+
+class FlightRecorderHandler(logging.Handler):
+    """Handler that appends records to the flight recorder without formatting."""
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Skip filters and the handler lock; the ring buffer append is cheap
+        flight_recorder.append(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        flight_recorder.append(record)
+
+
+flight_recorder = FlightRecorder()
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -47,6 +187,7 @@ def get_logger(name: str) -> logging.Logger:
     # Get configuration from environment
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
     log_format = os.getenv("LOG_FORMAT", "json").lower()
+    log_output = os.getenv("LOG_OUTPUT", "stdout").lower()
     env = os.getenv("ENV", "dev").lower()
 
     # Set log level
@@ -58,10 +199,23 @@ def get_logger(name: str) -> logging.Logger:
         "ERROR": logging.ERROR,
         "CRITICAL": logging.CRITICAL,
     }
-    logger.setLevel(level_map.get(log_level, logging.INFO))
+    level = level_map.get(log_level, logging.INFO)
+
+    # Create handler (file handlers are shared by all loggers writing to that file)
+    if log_output == "file":
+        from .log_sink import get_file_handler
+
+        handler = get_file_handler()
+    else:
+        handler = logging.StreamHandler(sys.stdout)
 
-    # Create handler
-    handler = logging.StreamHandler(sys.stdout)
+    if flight_recorder.enabled:
+        # Accept everything, write only LOG_LEVEL and above, record the rest
+        logger.setLevel(logging.DEBUG)
+        handler.setLevel(level)
+        logger.addHandler(FlightRecorderHandler())
+    else:
+        logger.setLevel(level)
 
     # Choose formatter based on format and environment
     if log_format == "json" or env in ["staging", "prod"]:
@@ -101,7 +255,14 @@ def get_logger(name: str) -> logging.Logger:
 
 
 # Example usage and patterns
-def log_request(logger: logging.Logger, method: str, path: str, status: int, duration_ms: float):
+def log_request(
+    logger: logging.Logger,
+    method: str,
+    path: str,
+    status: int,
+    duration_ms: float,
+    context: Optional[dict] = None
+):
     """
     Helper to log HTTP requests consistently.
 
@@ -111,19 +272,21 @@ def log_request(logger: logging.Logger, method: str, path: str, status: int, dur
         path: Request path
         status: HTTP status code
         duration_ms: Request duration in milliseconds
+        context: Additional fields (route, time breakdown, etc.)
 
     Example:
         log_request(logger, "GET", "/api/users/123", 200, 45.2)
     """
-    logger.info(
-        "HTTP request",
-        extra={
-            "method": method,
-            "path": path,
-            "status_code": status,
-            "duration_ms": round(duration_ms, 2),
-        },
-    )
+    extra = {
+        "method": method,
+        "path": path,
+        "status_code": status,
+        "duration_ms": round(duration_ms, 2),
+    }
+    if context:
+        extra.update(context)
+
+    logger.info("HTTP request", extra=extra)
 
 
 def log_db_query(logger: logging.Logger, query: str, duration_ms: float, rows: Optional[int] = None):
@@ -138,7 +301,15 @@ def log_db_query(logger: logging.Logger, query: str, duration_ms: float, rows: O
 
     Example:
         log_db_query(logger, "SELECT * FROM users", 23.4, rows=150)
+
+    The query is also aggregated by app.core.query_analyzer (per-request
+    summary, N+1 detection and process-wide top queries).
     """
+    from .query_analyzer import query_analyzer
+
+    query_analyzer.record(query, duration_ms, rows)
+    record_time("db", duration_ms)
+
     extra = {
         "query": query,
         "duration_ms": round(duration_ms, 2),
@@ -171,6 +342,9 @@ def log_error(logger: logging.Logger, error: Exception, context: Optional[dict]
     if context:
         extra.update(context)
 
+    # Write the suppressed records leading up to the error first
+    flight_recorder.flush()
+
     logger.error("Exception occurred", extra=extra, exc_info=True)
 
 
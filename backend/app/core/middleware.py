@@ -0,0 +1,127 @@
+"""
+Request timing middleware (ASGI).
+
+Ties cache, logging and monitoring together per HTTP request: opens a
+monitor.trace() span, binds the log flight recorder and the DB query
+analyzer to the request, and measures how its latency splits between
+cache.*, log_db_query()-reported queries, payment.* calls and our own code
+(see app.core.timing).
+
+Per request it emits one log_request() record carrying the breakdown, adds a
+Server-Timing response header (visible in browser dev tools) and records an
+"http.request.duration" distribution tagged by route, method and status class.
+
+Usage:
+    from fastapi import FastAPI
+    from app.core.middleware import RequestTimingMiddleware
+
+    app = FastAPI()
+    app.add_middleware(RequestTimingMiddleware)
+
+    # Any other ASGI app
+    app = RequestTimingMiddleware(app)
+
+Metrics, DB query summaries and the tracing transaction are named after the
+matched route template (scope["route"], as FastAPI sets it), so /users/1 and
+/users/2 share one series. Requests that matched no route (404s, or
+frameworks that don't expose it) are grouped as "unmatched"; the raw path
+only goes into the log record.
+
+Environment Variables:
+    SERVER_TIMING_ENABLED: Add the Server-Timing response header (default: true)
+"""
+
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .logger import flight_recorder, get_logger, log_error, log_request
+from .monitoring import monitor
+from .query_analyzer import query_analyzer
+from .timing import RequestTiming
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# Route label for requests without a matched route template
+UNMATCHED = "unmatched"
+
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware timing each HTTP request and its use of app.core services.
+
+    Non-HTTP scopes (lifespan, websocket) are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: Optional[bool] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        Args:
+            app: ASGI application to wrap
+            server_timing: Add the Server-Timing header (default: SERVER_TIMING_ENABLED)
+            logger: Logger for request records (default: "app.http")
+        """
+        self.app = app
+        self.server_timing = (
+            server_timing if server_timing is not None
+            else os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+        )
+        self.logger = logger or get_logger("app.http")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+        timing = RequestTiming()
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        # The route is only known once the router ran: name things on the way out
+        with timing.bind(), flight_recorder.record(), query_analyzer.request(f"{method} {UNMATCHED}") as queries:
+            with monitor.trace("http.request") as transaction:
+                try:
+                    await self.app(scope, receive, send_with_timing)
+                except Exception as e:
+                    log_error(self.logger, e, {"method": method, "path": path})
+                    raise
+                finally:
+                    duration_ms = timing.elapsed_ms()
+                    route = _route(scope)
+                    queries.name = f"{method} {route}"
+                    if transaction is not None:
+                        transaction.name = f"{method} {route}"
+                    monitor.distribution(
+                        "http.request.duration",
+                        duration_ms,
+                        tags={"route": route, "method": method, "status": f"{status // 100}xx"},
+                    )
+                    log_request(
+                        self.logger, method, path, status, duration_ms,
+                        context={"route": route, **timing.breakdown()},
+                    )
+
+
+def _route(scope: Scope) -> str:
+    """Matched route template (e.g. "/users/{user_id}"), or UNMATCHED."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED
@@ -20,16 +20,67 @@ Usage:
     with monitor.trace("database_query"):
         result = db.query(...)
 
+    # Metrics (kept in-process, forwarded to Sentry when enabled)
+    monitor.increment("orders.created")
+    monitor.distribution("checkout.duration", 182.5)
+
+    # Slow operations and blocked event loops
+    await monitor.start_loop_monitor()  # From inside the running loop
+    monitor.start_watchdog()
+    monitor.get_slow_operations()  # Worst offenders, slowest first
+
+    # Memory: tracemalloc snapshots, growth between them, RSS/GC gauges
+    monitor.take_memory_snapshot()
+    ...
+    monitor.take_memory_snapshot()
+    monitor.memory_growth(limit=10)
+    monitor.start_memory_monitor(interval=60)
+
 Environment Variables:
     SENTRY_ENABLED: Enable/disable Sentry (default: false)
     SENTRY_DSN: Sentry DSN (required if SENTRY_ENABLED=true)
     SENTRY_ENVIRONMENT: Environment name (dev, staging, prod)
     SENTRY_TRACES_SAMPLE_RATE: Performance monitoring sample rate (0.0-1.0)
+    SLOW_OPERATION_THRESHOLD_MS: trace() duration reported as slow (default: 1000)
+    SLOW_OPERATION_BUFFER_SIZE: Number of worst offenders kept (default: 50)
+    LOOP_LAG_THRESHOLD_MS: Event loop scheduling delay reported as lag (default: 100)
+    WATCHDOG_ENABLED: Start the stuck-span watchdog thread at import (default: false)
+    WATCHDOG_INTERVAL_MS: Watchdog check interval (default: 250)
+    MEMORY_TRACE_FRAMES: Frames kept per tracemalloc allocation (default: 1)
+    MEMORY_TRACEMALLOC: Take tracemalloc snapshots in the memory monitor (default: false)
+    MEMORY_MONITOR_ENABLED: Start the periodic memory monitor at import (default: false)
+    MEMORY_MONITOR_INTERVAL_S: Memory monitor interval (default: 60)
+    MEMORY_LEAK_THRESHOLD_MB: RSS growth over the window that triggers an alert, 0 disables (default: 100)
+    MEMORY_LEAK_WINDOW_S: Window for the leak alert (default: 3600)
 """
 
 import os
-from typing import Any, Optional, Dict
+import sys
+import gc
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+import traceback
+import tracemalloc
+import weakref
+from bisect import bisect_left
+from typing import Any, Optional, Dict, List, Tuple
+from collections import deque
 from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .logger import flight_recorder
+
+# Upper bounds (ms) of distribution histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+Span = Tuple[str, float]  # (operation, start perf_counter)
+
+# Open trace() spans of the current context, outermost first; each asyncio
+# task has its own (inherited from the task that created it)
+_span_stack: ContextVar[Tuple[Span, ...]] = ContextVar("monitor_spans", default=())
 
 
 class MonitoringService:
@@ -42,6 +93,41 @@ class MonitoringService:
     def __init__(self):
         self.enabled = os.getenv("SENTRY_ENABLED", "false").lower() == "true"
         self._sentry = None
+        # asyncio task (or thread id outside tasks) -> its open trace() spans,
+        # so the profiler and watchdog can see spans of other threads and tasks
+        self._active_spans: Dict[Any, Tuple[Span, ...]] = {}
+        # thread id -> event loop whose tasks opened spans on that thread;
+        # weak so closed loops (and ids of finished threads) drop out
+        self._thread_loops: "weakref.WeakValueDictionary[int, asyncio.AbstractEventLoop]" = (
+            weakref.WeakValueDictionary()
+        )
+
+        # In-process metrics: (name, tags) -> value / aggregate
+        self._metrics_lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._distributions: Dict[Tuple, Dict[str, Any]] = {}
+
+        # Slow operation detection
+        self.slow_threshold_ms = float(os.getenv("SLOW_OPERATION_THRESHOLD_MS", "1000"))
+        self.loop_lag_threshold_ms = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+        self._slow_buffer_size = int(os.getenv("SLOW_OPERATION_BUFFER_SIZE", "50"))
+        self._slow_heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._slow_lock = threading.Lock()
+        self._slow_seq = itertools.count()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._loop_thread_id: Optional[int] = None
+        self._loop_heartbeat: Optional[float] = None
+        self._loop_interval = 0.0
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+
+        # Memory instrumentation
+        self.memory_trace_frames = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+        self._memory_snapshots: deque = deque(maxlen=2)  # (timestamp, snapshot)
+        self._memory_lock = threading.Lock()
+        self._memory_monitor: Optional[threading.Thread] = None
+        self._memory_stop = threading.Event()
 
         if self.enabled:
             try:
@@ -72,6 +158,11 @@ class MonitoringService:
         else:
             print("ℹ️ Sentry monitoring disabled.")
 
+        if os.getenv("WATCHDOG_ENABLED", "false").lower() == "true":
+            self.start_watchdog()
+        if os.getenv("MEMORY_MONITOR_ENABLED", "false").lower() == "true":
+            self.start_memory_monitor()
+
     def capture_exception(
         self,
         exception: Exception,
@@ -95,6 +186,9 @@ class MonitoringService:
             except PaymentError as e:
                 monitor.capture_exception(e, context={"user_id": 123, "amount": 1000})
         """
+        # Write suppressed log records leading up to the error (no-op if already flushed)
+        flight_recorder.flush()
+
         if not self.enabled or not self._sentry:
             # In development, just print the error
             print(f"❌ Exception: {type(exception).__name__}: {exception}")
@@ -109,6 +203,10 @@ class MonitoringService:
                 for key, value in context.items():
                     scope.set_context(key, {"value": value})
 
+            records = flight_recorder.snapshot()
+            if records:
+                scope.set_context("flight_recorder", {"records": records})
+
             event_id = self._sentry.capture_exception(exception)
             return event_id
 
@@ -233,16 +331,584 @@ class MonitoringService:
             with monitor.trace("api_call"):
                 response = requests.post(url, data=payload)
         """
-        if not self.enabled or not self._sentry:
-            # No-op if monitoring disabled
-            yield
+        owner = _span_owner()
+        if isinstance(owner, asyncio.Task):
+            self._thread_loops[threading.get_ident()] = owner.get_loop()
+        outer = self._active_spans.get(owner)
+        span = (operation, time.perf_counter())
+        stack = _span_stack.get() + (span,)
+        token = _span_stack.set(stack)
+        self._active_spans[owner] = stack
+        try:
+            if not self.enabled or not self._sentry:
+                # No-op if monitoring disabled
+                yield
+                return
+
+            transaction = self._sentry.start_transaction(op=operation, name=operation)
+            try:
+                yield transaction
+            finally:
+                transaction.finish()
+        finally:
+            try:
+                _span_stack.reset(token)
+            except ValueError:
+                # Closed from another context (e.g. a generator resumed elsewhere)
+                pass
+            if outer is None:
+                self._active_spans.pop(owner, None)
+            else:
+                self._active_spans[owner] = outer
+
+            duration_ms = (time.perf_counter() - span[1]) * 1000
+            if duration_ms >= self.slow_threshold_ms:
+                self._report_slow("slow_operation", operation, duration_ms)
+
+    def active_operation(self, thread_id: Optional[int] = None) -> Optional[str]:
+        """
+        Get the innermost open trace() operation.
+
+        Without a thread, this is the span of the calling task (or thread).
+        For another thread that runs an event loop, it is the span of the task
+        the loop is executing right now, not of tasks suspended in an await.
+
+        Args:
+            thread_id: Thread identifier (default: current task or thread)
+
+        Returns:
+            Operation name, or None if not inside trace()
+
+        Example:
+            with monitor.trace("checkout"):
+                monitor.active_operation()  # "checkout"
+        """
+        if thread_id is None:
+            stack = _span_stack.get()
+            return stack[-1][0] if stack else None
+
+        stack = None
+        loop = self._thread_loops.get(thread_id)
+        if loop is not None and loop.is_closed():
+            # Closed but not yet collected; the thread id may be reused
+            self._thread_loops.pop(thread_id, None)
+            loop = None
+        task = _running_task(loop) if loop is not None else None
+        if task is not None:
+            stack = self._active_spans.get(task)
+        if not stack:
+            stack = self._active_spans.get(thread_id)
+        return stack[-1][0] if stack else None
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, str]] = None):
+        """
+        Increment a counter metric.
+
+        Args:
+            name: Metric name (dot-separated, e.g. "payment.retries")
+            value: Amount to add (default: 1)
+            tags: Metric tags
+
+        Example:
+            monitor.increment("cache.miss", tags={"backend": "redis"})
+        """
+        key = _metric_key(name, tags)
+        with self._metrics_lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._forward_metric("incr", name, value, None, tags)
+
+    def gauge(self, name: str, value: float, tags: Optional[Dict[str, str]] = None):
+        """
+        Set a gauge metric to its current value.
+
+        Args:
+            name: Metric name
+            value: Current value
+            tags: Metric tags
+
+        Example:
+            monitor.gauge("queue.depth", len(queue))
+        """
+        key = _metric_key(name, tags)
+        with self._metrics_lock:
+            self._gauges[key] = value
+        self._forward_metric("gauge", name, value, None, tags)
+
+    def distribution(
+        self,
+        name: str,
+        value: float,
+        unit: str = "millisecond",
+        tags: Optional[Dict[str, str]] = None
+    ):
+        """
+        Record a value in a distribution (histogram) metric.
+
+        Args:
+            name: Metric name
+            value: Observed value (bucketed by HISTOGRAM_BUCKETS_MS)
+            unit: Value unit (default: millisecond)
+            tags: Metric tags
+
+        Example:
+            monitor.distribution("http.request.duration", 45.2, tags={"route": "/api/users"})
+        """
+        key = _metric_key(name, tags)
+        bucket = bisect_left(HISTOGRAM_BUCKETS_MS, value)
+        with self._metrics_lock:
+            dist = self._distributions.get(key)
+            if dist is None:
+                dist = self._distributions[key] = {
+                    "count": 0, "sum": 0.0, "min": value, "max": value, "unit": unit,
+                    "buckets": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+                }
+            dist["count"] += 1
+            dist["sum"] += value
+            dist["min"] = min(dist["min"], value)
+            dist["max"] = max(dist["max"], value)
+            dist["buckets"][bucket] += 1
+        self._forward_metric("distribution", name, value, unit, tags)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get a snapshot of in-process metrics.
+
+        Returns:
+            Dictionary with "counters", "gauges" and "distributions", keyed by
+            "name" or "name{tag=value,...}"
+        """
+        with self._metrics_lock:
+            return {
+                "counters": {_format_metric_key(k): v for k, v in self._counters.items()},
+                "gauges": {_format_metric_key(k): v for k, v in self._gauges.items()},
+                "distributions": {
+                    _format_metric_key(k): dict(v, buckets=list(v["buckets"]))
+                    for k, v in self._distributions.items()
+                },
+            }
+
+    def reset_metrics(self):
+        """Clear all in-process metrics."""
+        with self._metrics_lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._distributions.clear()
+
+    def _forward_metric(self, kind: str, name: str, value: float, unit: Optional[str], tags: Optional[Dict]):
+        metrics = getattr(self._sentry, "metrics", None) if self.enabled else None
+        if metrics is None:
             return
 
-        transaction = self._sentry.start_transaction(op=operation, name=operation)
         try:
-            yield transaction
+            kwargs = {"tags": tags or {}}
+            if unit:
+                kwargs["unit"] = unit
+            getattr(metrics, kind)(name, value, **kwargs)
+        except Exception:
+            # Metrics are best-effort; never break the caller
+            pass
+
+    def get_slow_operations(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the worst slow operations seen so far, slowest first.
+
+        Includes slow trace() spans, event loop lag and stuck spans or loops
+        caught by the watchdog (with the stack of the stuck thread).
+
+        Args:
+            limit: Maximum number of entries (default: all kept)
+
+        Returns:
+            List of dicts with kind, operation, duration_ms, timestamp and stack
+        """
+        with self._slow_lock:
+            entries = [entry for _, _, entry in sorted(self._slow_heap, reverse=True)]
+        return entries[:limit] if limit else entries
+
+    def clear_slow_operations(self):
+        """Empty the slow operation buffer."""
+        with self._slow_lock:
+            self._slow_heap.clear()
+
+    def _report_slow(self, kind: str, operation: str, duration_ms: float, stack: Optional[List[str]] = None):
+        entry = {
+            "kind": kind,
+            "operation": operation,
+            "duration_ms": round(duration_ms, 2),
+            "timestamp": time.time(),
+            "stack": stack,
+        }
+        item = (duration_ms, next(self._slow_seq), entry)
+        with self._slow_lock:
+            if len(self._slow_heap) < self._slow_buffer_size:
+                heapq.heappush(self._slow_heap, item)
+            elif self._slow_buffer_size and duration_ms > self._slow_heap[0][0]:
+                heapq.heapreplace(self._slow_heap, item)
+
+        self.increment(f"monitoring.{kind}", tags={"operation": operation})
+        self.add_breadcrumb(
+            f"{kind}: {operation} ({duration_ms:.0f} ms)",
+            category="performance",
+            level="warning",
+            data={"duration_ms": round(duration_ms, 2)},
+        )
+
+    async def start_loop_monitor(self, interval: float = 0.25) -> asyncio.Task:
+        """
+        Start measuring event loop lag from inside the running loop.
+
+        A heartbeat task sleeps for `interval` and records how late it woke up
+        as the "event_loop.lag" distribution. Lag above LOOP_LAG_THRESHOLD_MS
+        is reported as a slow operation. Start the watchdog too to capture the
+        loop thread's stack while it is still blocked.
+
+        Args:
+            interval: Heartbeat interval in seconds
+
+        Returns:
+            The heartbeat task
+
+        Example:
+            @app.on_event("startup")
+            async def startup():
+                await monitor.start_loop_monitor()
+        """
+        if self._loop_task and not self._loop_task.done():
+            return self._loop_task
+
+        self._loop_interval = interval
+        self._loop_task = asyncio.get_running_loop().create_task(self._loop_heartbeat_task(interval))
+        return self._loop_task
+
+    def stop_loop_monitor(self):
+        """Cancel the event loop heartbeat task."""
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+        self._loop_heartbeat = None
+        self._loop_thread_id = None
+
+    async def _loop_heartbeat_task(self, interval: float):
+        self._loop_thread_id = threading.get_ident()
+        try:
+            while True:
+                started = time.perf_counter()
+                self._loop_heartbeat = started
+                await asyncio.sleep(interval)
+                lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+                self.distribution("event_loop.lag", lag_ms)
+                if lag_ms >= self.loop_lag_threshold_ms:
+                    self._report_slow("loop_lag", "event_loop", lag_ms)
         finally:
-            transaction.finish()
+            self._loop_heartbeat = None
+
+    def start_watchdog(self, interval: Optional[float] = None) -> bool:
+        """
+        Start the watchdog thread.
+
+        The watchdog captures the stack of any thread whose trace() span has
+        been open longer than SLOW_OPERATION_THRESHOLD_MS, and of the event loop
+        thread when its heartbeat is overdue by LOOP_LAG_THRESHOLD_MS. Each stall
+        is reported once, while it is still happening.
+
+        A span opened in an asyncio task is only reported as stuck while that
+        task is blocking the loop (the loop monitor's heartbeat is overdue and
+        the task is the one running); a task waiting in an await is not stuck.
+
+        Args:
+            interval: Check interval in seconds (default: WATCHDOG_INTERVAL_MS)
+
+        Returns:
+            True if started, False if already running
+        """
+        if self._watchdog and self._watchdog.is_alive():
+            return False
+
+        if interval is None:
+            interval = float(os.getenv("WATCHDOG_INTERVAL_MS", "250")) / 1000
+
+        self._watchdog_stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watchdog_loop, args=(interval,), name="app-core-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        return True
+
+    def stop_watchdog(self):
+        """Stop the watchdog thread."""
+        if self._watchdog:
+            self._watchdog_stop.set()
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _watchdog_loop(self, interval: float):
+        reported_spans = set()
+        reported_heartbeat = None
+
+        while not self._watchdog_stop.wait(interval):
+            now = time.perf_counter()
+            frames = None
+
+            open_spans = set()
+            for owner, stack in list(self._active_spans.items()):
+                if isinstance(owner, asyncio.Task):
+                    if not self._blocking_loop(owner, now):
+                        open_spans.update(id(span) for span in stack)
+                        continue
+                    thread_id = self._loop_thread_id
+                else:
+                    thread_id = owner
+                for span in stack:
+                    open_spans.add(id(span))
+                    elapsed_ms = (now - span[1]) * 1000
+                    if elapsed_ms < self.slow_threshold_ms or id(span) in reported_spans:
+                        continue
+                    if frames is None:
+                        frames = sys._current_frames()
+                    reported_spans.add(id(span))
+                    self._report_slow("stuck_operation", span[0], elapsed_ms, _format_stack(frames.get(thread_id)))
+            reported_spans &= open_spans
+
+            heartbeat = self._loop_heartbeat
+            if heartbeat is not None and heartbeat != reported_heartbeat:
+                overdue_ms = (now - heartbeat - self._loop_interval) * 1000
+                if overdue_ms >= self.loop_lag_threshold_ms:
+                    if frames is None:
+                        frames = sys._current_frames()
+                    reported_heartbeat = heartbeat
+                    self._report_slow("loop_blocked", "event_loop", overdue_ms, _format_stack(frames.get(self._loop_thread_id)))
+
+    def _blocking_loop(self, task: asyncio.Task, now: float) -> bool:
+        """True if `task` is running on the monitored loop and the loop's heartbeat is overdue."""
+        heartbeat = self._loop_heartbeat
+        loop_task = self._loop_task
+        if heartbeat is None or loop_task is None or loop_task.get_loop() is not task.get_loop():
+            return False
+        overdue_ms = (now - heartbeat - self._loop_interval) * 1000
+        return overdue_ms >= self.loop_lag_threshold_ms and _running_task(task.get_loop()) is task
+
+    def take_memory_snapshot(self) -> Dict[str, Any]:
+        """
+        Take a tracemalloc snapshot, starting tracemalloc if needed.
+
+        Only allocations made after tracing started are visible, so take a
+        first snapshot early and compare later ones with memory_growth().
+        Tracing keeps MEMORY_TRACE_FRAMES frames per allocation (default 1)
+        to keep its overhead low.
+
+        Returns:
+            Dictionary with traced and peak traced bytes
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_trace_frames)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        with self._memory_lock:
+            self._memory_snapshots.append((time.time(), snapshot))
+
+        traced, peak = tracemalloc.get_traced_memory()
+        self.gauge("memory.traced_bytes", traced)
+        return {"traced_bytes": traced, "peak_traced_bytes": peak, "snapshots": len(self._memory_snapshots)}
+
+    def memory_growth(self, limit: int = 10, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """
+        Compare the two most recent snapshots and return the top growth.
+
+        Args:
+            limit: Number of entries to return
+            group_by: tracemalloc grouping ("lineno", "filename" or "traceback")
+
+        Returns:
+            List of dicts (location, size_diff, size, count_diff, count), largest growth first
+
+        Example:
+            monitor.take_memory_snapshot()
+            run_workload()
+            monitor.take_memory_snapshot()
+            for entry in monitor.memory_growth(limit=5):
+                print(entry["location"], entry["size_diff"])
+        """
+        with self._memory_lock:
+            if len(self._memory_snapshots) < 2:
+                return []
+            (_, previous), (_, current) = self._memory_snapshots
+
+        stats = current.compare_to(previous, group_by)
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+            if stat.size_diff > 0
+        ]
+
+    def collect_memory_stats(self) -> Dict[str, Any]:
+        """
+        Collect process memory and GC statistics and record them as gauges.
+
+        Returns:
+            Dictionary with rss_bytes, per-generation GC object counts and
+            collection counts, and traced bytes when tracemalloc is running
+        """
+        stats: Dict[str, Any] = {"rss_bytes": _current_rss_bytes()}
+        for generation, count in enumerate(gc.get_count()):
+            stats[f"gc_gen{generation}_count"] = count
+        for generation, gen_stats in enumerate(gc.get_stats()):
+            stats[f"gc_gen{generation}_collections"] = gen_stats["collections"]
+            stats[f"gc_gen{generation}_collected"] = gen_stats["collected"]
+        if tracemalloc.is_tracing():
+            stats["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+
+        for name, value in stats.items():
+            if value is not None:
+                self.gauge(f"memory.{name}", value)
+        return stats
+
+    def start_memory_monitor(
+        self,
+        interval: Optional[float] = None,
+        trace_allocations: Optional[bool] = None,
+        leak_threshold_mb: Optional[float] = None,
+        window: Optional[float] = None
+    ) -> bool:
+        """
+        Start a thread that periodically collects memory stats.
+
+        If RSS grows by more than `leak_threshold_mb` within `window` seconds,
+        a warning is sent through capture_message() with the top allocation
+        growth (when tracing allocations). The window restarts after each alert.
+
+        Args:
+            interval: Seconds between collections (default: MEMORY_MONITOR_INTERVAL_S)
+            trace_allocations: Also take tracemalloc snapshots (default: MEMORY_TRACEMALLOC)
+            leak_threshold_mb: Alert threshold, 0 disables (default: MEMORY_LEAK_THRESHOLD_MB)
+            window: Alert window in seconds (default: MEMORY_LEAK_WINDOW_S)
+
+        Returns:
+            True if started, False if already running
+        """
+        if self._memory_monitor and self._memory_monitor.is_alive():
+            return False
+
+        if interval is None:
+            interval = float(os.getenv("MEMORY_MONITOR_INTERVAL_S", "60"))
+        if trace_allocations is None:
+            trace_allocations = os.getenv("MEMORY_TRACEMALLOC", "false").lower() == "true"
+        if leak_threshold_mb is None:
+            leak_threshold_mb = float(os.getenv("MEMORY_LEAK_THRESHOLD_MB", "100"))
+        if window is None:
+            window = float(os.getenv("MEMORY_LEAK_WINDOW_S", "3600"))
+
+        self._memory_stop.clear()
+        self._memory_monitor = threading.Thread(
+            target=self._memory_monitor_loop,
+            args=(interval, trace_allocations, leak_threshold_mb * 1024 * 1024, window),
+            name="app-core-memory-monitor",
+            daemon=True,
+        )
+        self._memory_monitor.start()
+        return True
+
+    def stop_memory_monitor(self):
+        """Stop the periodic memory monitor."""
+        if self._memory_monitor:
+            self._memory_stop.set()
+            self._memory_monitor.join()
+            self._memory_monitor = None
+
+    def _memory_monitor_loop(self, interval: float, trace_allocations: bool, threshold_bytes: float, window: float):
+        history: deque = deque()  # (timestamp, rss_bytes)
+
+        while True:
+            if trace_allocations:
+                self.take_memory_snapshot()
+            stats = self.collect_memory_stats()
+
+            rss = stats["rss_bytes"]
+            now = time.time()
+            if rss is not None and threshold_bytes > 0:
+                history.append((now, rss))
+                while history and now - history[0][0] > window:
+                    history.popleft()
+
+                growth = rss - min(value for _, value in history)
+                if growth > threshold_bytes:
+                    self.capture_message(
+                        "Memory growth threshold exceeded",
+                        level="warning",
+                        extra={
+                            "rss_bytes": rss,
+                            "growth_bytes": growth,
+                            "window_s": window,
+                            "top_growth": self.memory_growth(limit=10) if trace_allocations else [],
+                        },
+                    )
+                    history.clear()
+                    history.append((now, rss))
+
+            if self._memory_stop.wait(interval):
+                return
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+
+        # Peak rather than current RSS: kilobytes on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except Exception:
+        return None
+
+
+def _metric_key(name: str, tags: Optional[Dict[str, str]]) -> Tuple:
+    return (name, tuple(sorted(tags.items())) if tags else ())
+
+
+def _format_metric_key(key: Tuple) -> str:
+    name, tags = key
+    if not tags:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in tags) + "}"
+
+
+def _span_owner() -> Any:
+    """The running asyncio task, or the thread id outside one."""
+    # _get_running_loop() returns None instead of raising: trace() is hot
+    loop = asyncio._get_running_loop()
+    task = asyncio.current_task(loop) if loop is not None else None
+    return task if task is not None else threading.get_ident()
+
+
+def _running_task(loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Task]:
+    """Task `loop` is executing right now (None while idle); callable from any thread."""
+    if loop.is_closed():
+        return None
+    try:
+        return asyncio.current_task(loop)
+    except RuntimeError:
+        return None
+
+
+def _format_stack(frame) -> Optional[List[str]]:
+    if frame is None:
+        return None
+    return [line.rstrip() for line in traceback.format_stack(frame)]
 
 
 # Global monitoring instance
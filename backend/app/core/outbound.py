@@ -0,0 +1,235 @@
+"""
+Outbound API call layer.
+
+Wraps calls to external APIs with bounded exponential backoff (full jitter)
+for retryable errors, honours Retry-After, and paces requests with a
+client-side token bucket. Retries, throttle waits and final failures are
+reported as metrics through monitor.
+
+Usage:
+    from app.core.outbound import OutboundCaller
+
+    calls = OutboundCaller("stripe", max_retries=3, rate_limit=25)
+
+    # Sync
+    intent = calls.call("payment_intent.create", stripe.PaymentIntent.create, amount=1000)
+
+    # Async
+    body = await calls.call_async("payment_intent.create", client.post, "/v1/payment_intents")
+
+Retryable errors: HTTP 409/429/5xx (read from `http_status` or `status_code`),
+connection errors and timeouts, unless the response says `Stripe-Should-Retry: false`.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from .monitoring import monitor
+
+RETRYABLE_STATUS = frozenset({409, 429, 500, 502, 503, 504})
+
+# Exception class names (anywhere in the MRO) treated as transient network failures
+RETRYABLE_EXCEPTION_NAMES = frozenset({
+    "APIConnectionError",  # stripe
+    "TransportError",  # httpx: connect/read/write errors and timeouts
+    "ConnectionError",
+    "TimeoutError",
+})
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by sync and async callers.
+
+    Tokens are reserved up front (the balance may go negative), so each caller
+    knows exactly how long to wait and waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token.
+
+        Returns:
+            Seconds the caller must wait before proceeding (0 if a token was available)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns seconds waited."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Wait (without blocking the loop) until a token is available. Returns seconds waited."""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class OutboundCaller:
+    """
+    Retry and rate-limit policy for calls to one external API.
+
+    Share one instance per API account so all callers draw from the same
+    token bucket.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_retries: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 8.0,
+        rate_limit: float = 0,
+        burst: Optional[float] = None
+    ):
+        """
+        Args:
+            name: API name, used as metric prefix ("stripe" -> "stripe.retries")
+            max_retries: Retries after the first attempt
+            base_delay: First backoff ceiling in seconds (doubles per retry)
+            max_delay: Max backoff in seconds; longer Retry-After values fail fast
+            rate_limit: Requests per second, 0 disables client-side limiting
+            burst: Token bucket capacity (default: rate_limit)
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+
+    def call(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call `fn` with rate limiting and retries.
+
+        Args:
+            operation: Operation name for metrics (e.g. "refund.create")
+            fn: Function performing one attempt
+
+        Returns:
+            Result of `fn`
+
+        Raises:
+            The last exception if the call is not retryable or retries are exhausted
+        """
+        attempt = 0
+        while True:
+            if self.bucket:
+                self._record_wait(operation, self.bucket.acquire())
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(operation, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, operation: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await `fn` with rate limiting and retries. See call().
+        """
+        attempt = 0
+        while True:
+            if self.bucket:
+                self._record_wait(operation, await self.bucket.acquire_async())
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(operation, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _record_wait(self, operation: str, waited: float):
+        if waited:
+            monitor.distribution(f"{self.name}.throttle_wait", waited * 1000, tags={"operation": operation})
+
+    def _next_delay(self, operation: str, error: Exception, attempt: int) -> Optional[float]:
+        """Delay before the next attempt, or None to give up (failure is recorded)."""
+        tags = {"operation": operation}
+        retryable, retry_after = classify_error(error)
+
+        delay = None
+        if retryable and attempt < self.max_retries:
+            if retry_after is not None:
+                delay = retry_after if retry_after <= self.max_delay else None
+            else:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+        if delay is None:
+            monitor.increment(f"{self.name}.failures", tags=tags)
+            return None
+
+        monitor.increment(f"{self.name}.retries", tags=tags)
+        return delay
+
+
+def classify_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    Decide whether an error is worth retrying.
+
+    Args:
+        error: Exception raised by an attempt
+
+    Returns:
+        (retryable, retry_after_seconds or None)
+    """
+    headers = getattr(error, "headers", None) or {}
+    should_retry = _header(headers, "Stripe-Should-Retry")
+    retry_after = _parse_retry_after(_header(headers, "Retry-After"))
+
+    if should_retry is not None and should_retry.lower() == "false":
+        return False, None
+    if should_retry is not None and should_retry.lower() == "true":
+        return True, retry_after
+
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS, retry_after
+
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & RETRYABLE_EXCEPTION_NAMES), retry_after
+
+
+def _header(headers: Any, name: str) -> Optional[str]:
+    try:
+        value = headers.get(name)
+        if value is None:
+            value = headers.get(name.lower())
+        return value
+    except AttributeError:
+        return None
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -2,7 +2,8 @@
 Payment processing abstraction.
 
 Provides payment functionality with optional Stripe backend.
-Works in test mode without real Stripe account.
+Works in test mode without real Stripe account: calls then go to a stateful
+simulator with optional latency and fault injection (see app.core.stripe_simulator).
 
 Usage:
     from app.core.payment import payment
@@ -16,17 +17,59 @@ Usage:
     # Refund payment
     refund = payment.create_refund(payment_intent_id="pi_xxx", amount=500)
 
+    # Reads are cached briefly and invalidated by webhooks; fresh=True bypasses the cache
+    intent = payment.retrieve_payment_intent("pi_xxx")
+    customer = payment.retrieve_customer("cus_xxx", fresh=True)
+
+    # Stream objects for reconciliation (constant memory, next page prefetched)
+    for refund in payment.iter_refunds(created_gte=day_start, created_lt=day_end):
+        reconcile(refund)
+
+    # Bulk operations: bounded concurrency, streamed outcomes, resumable checkpoint
+    run = payment.bulk_refund(intent_ids, checkpoint="/var/tmp/campaign-42.jsonl")
+    for outcome in run:
+        ...
+    summary = run.summary()
+
+    # Creates are idempotent per operation_id (order, cart or request ID): repeats
+    # within STRIPE_IDEMPOTENCY_TTL_S return the same result without calling Stripe
+    intent = payment.create_payment_intent(amount=1000, operation_id="order-123")
+
 Environment Variables:
     STRIPE_ENABLED: Enable/disable Stripe (default: false)
     STRIPE_SECRET_KEY: Stripe API secret key (required if STRIPE_ENABLED=true)
     STRIPE_PUBLISHABLE_KEY: Stripe publishable key (for frontend)
     STRIPE_WEBHOOK_SECRET: Webhook signing secret (optional)
+    STRIPE_API_BASE: API base URL for the stripe library, e.g. a local simulator (optional)
+    STRIPE_MAX_RETRIES: Retries for 409/429/5xx and network errors (default: 3)
+    STRIPE_RETRY_BASE_DELAY_MS: First backoff ceiling, doubles per retry (default: 250)
+    STRIPE_RETRY_MAX_DELAY_MS: Max backoff / Retry-After honoured (default: 8000)
+    STRIPE_RATE_LIMIT_RPS: Client-side requests per second, 0 disables (default: 25)
+    STRIPE_RATE_LIMIT_BURST: Token bucket burst size (default: STRIPE_RATE_LIMIT_RPS)
+    STRIPE_IDEMPOTENCY_TTL_S: Seconds repeated creates return the cached result (default: 300)
+    STRIPE_IDEMPOTENCY_FROM_CONTENT: Derive keys from request content when no
+        operation_id is given (default: false, such calls get a random key that
+        only makes our own retries safe). Payment intents without a customer
+        always get a random key: identical content there means different buyers
+    STRIPE_INTENT_CACHE_TTL_S: Payment intent read cache TTL, 0 disables (default: 30)
+    STRIPE_CUSTOMER_CACHE_TTL_S: Customer read cache TTL, 0 disables (default: 300)
+    STRIPE_BULK_CONCURRENCY: Default concurrency of bulk_* operations (default: 8)
 """
 
 import os
-from typing import Any, Dict, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from enum import Enum
 
+from .bulk import BulkRun
+from .cache import cache
+from .idempotency import IdempotencyGuard
+from .monitoring import monitor
+from .outbound import OutboundCaller
+from .stripe_simulator import stripe_simulator
+from .timing import timed
+
 
 class PaymentStatus(str, Enum):
     """Payment status enum."""
@@ -41,13 +84,14 @@ class PaymentService:
     """
     Payment service with optional Stripe backend.
 
-    Falls back to test mode if Stripe is disabled.
+    Falls back to test mode (app.core.stripe_simulator) if Stripe is disabled.
     """
 
     def __init__(self):
         self.enabled = os.getenv("STRIPE_ENABLED", "false").lower() == "true"
         self._stripe = None
         self._test_mode = not self.enabled
+        self.bulk_concurrency = int(os.getenv("STRIPE_BULK_CONCURRENCY", "8"))
 
         if self.enabled:
             try:
@@ -58,6 +102,8 @@ class PaymentService:
                     raise ValueError("STRIPE_SECRET_KEY not set but STRIPE_ENABLED=true")
 
                 stripe.api_key = secret_key
+                if os.getenv("STRIPE_API_BASE"):
+                    stripe.api_base = os.getenv("STRIPE_API_BASE")
                 self._stripe = stripe
 
                 # Determine if using test or live keys
@@ -76,12 +122,18 @@ class PaymentService:
         else:
             print("ℹ️ Stripe payments disabled. Using test mode.")
 
+        if self._test_mode:
+            # Stateful simulator with the stripe module's interface
+            self._stripe = stripe_simulator
+
+    @timed("payment")
     def create_payment_intent(
         self,
         amount: int,
         currency: str = "usd",
         metadata: Optional[Dict[str, Any]] = None,
-        customer_id: Optional[str] = None
+        customer_id: Optional[str] = None,
+        operation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a payment intent.
@@ -91,6 +143,9 @@ class PaymentService:
             currency: Currency code (usd, eur, etc.)
             metadata: Additional metadata (order_id, user_id, etc.)
             customer_id: Stripe customer ID (optional)
+            operation_id: Unique ID of this operation (e.g. order ID) used for the
+                idempotency key; repeats are not detected without it
+                (see STRIPE_IDEMPOTENCY_FROM_CONTENT)
 
         Returns:
             Payment intent object
@@ -102,77 +157,100 @@ class PaymentService:
                 metadata={"order_id": "123", "user_id": "456"}
             )
         """
-        if self._test_mode:
-            # Test mode - simulate success
-            return {
-                "id": f"pi_test_{os.urandom(12).hex()}",
-                "amount": amount,
-                "currency": currency,
-                "status": "succeeded",
-                "client_secret": "test_secret",
-                "metadata": metadata or {},
-                "test_mode": True
-            }
+        params = {
+            "amount": amount,
+            "currency": currency,
+            "metadata": metadata or {},
+        }
 
-        try:
-            params = {
-                "amount": amount,
-                "currency": currency,
-                "metadata": metadata or {},
-            }
-
-            if customer_id:
-                params["customer"] = customer_id
-
-            intent = self._stripe.PaymentIntent.create(**params)
-            return {
-                "id": intent.id,
-                "amount": intent.amount,
-                "currency": intent.currency,
-                "status": intent.status,
-                "client_secret": intent.client_secret,
-                "metadata": intent.metadata,
-                "test_mode": False
-            }
+        if customer_id:
+            params["customer"] = customer_id
 
-        except Exception as e:
-            raise PaymentError(f"Failed to create payment intent: {str(e)}")
+        def create(idempotency_key: str) -> Dict[str, Any]:
+            try:
+                intent = stripe_calls.call(
+                    "payment_intent.create",
+                    self._stripe.PaymentIntent.create,
+                    idempotency_key=idempotency_key,
+                    **params
+                )
+                result = _payment_intent_dict(intent, include_secret=True)
+                return payment_cache.store_created("payment_intent", result)
 
-    def retrieve_payment_intent(self, payment_intent_id: str) -> Dict[str, Any]:
+            except Exception as e:
+                raise PaymentError(f"Failed to create payment intent: {str(e)}")
+
+        def read_secret(payment_intent_id: str) -> str:
+            try:
+                intent = stripe_calls.call(
+                    "payment_intent.retrieve", self._stripe.PaymentIntent.retrieve, payment_intent_id
+                )
+                return intent["client_secret"]
+            except Exception as e:
+                raise PaymentError(f"Failed to retrieve payment intent: {str(e)}")
+
+        return _idempotent("payment_intent.create", params, operation_id, create, read_secret)
+
+    @timed("payment")
+    def retrieve_payment_intent(self, payment_intent_id: str, fresh: bool = False) -> Dict[str, Any]:
         """
         Retrieve a payment intent by ID.
 
+        Served from a short-TTL cache invalidated by payment_intent.*
+        webhooks (see app.core.webhooks).
+
         Args:
             payment_intent_id: Payment intent ID
+            fresh: Bypass the cache and read from Stripe (read-your-writes)
 
         Returns:
             Payment intent object
         """
-        if self._test_mode:
-            return {
-                "id": payment_intent_id,
-                "status": "succeeded",
-                "test_mode": True
-            }
+        if not fresh:
+            cached = payment_cache.get("payment_intent", payment_intent_id)
+            if cached is not None:
+                return cached
 
         try:
-            intent = self._stripe.PaymentIntent.retrieve(payment_intent_id)
-            return {
-                "id": intent.id,
-                "amount": intent.amount,
-                "currency": intent.currency,
-                "status": intent.status,
-                "metadata": intent.metadata,
-                "test_mode": False
-            }
+            intent = stripe_calls.call(
+                "payment_intent.retrieve", self._stripe.PaymentIntent.retrieve, payment_intent_id
+            )
+            return payment_cache.store("payment_intent", _payment_intent_dict(intent))
         except Exception as e:
             raise PaymentError(f"Failed to retrieve payment intent: {str(e)}")
 
+    @timed("payment")
+    def retrieve_customer(self, customer_id: str, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Retrieve a customer by ID.
+
+        Served from a short-TTL cache invalidated by customer.* webhooks.
+
+        Args:
+            customer_id: Stripe customer ID
+            fresh: Bypass the cache and read from Stripe (read-your-writes)
+
+        Returns:
+            Customer object
+        """
+        if not fresh:
+            cached = payment_cache.get("customer", customer_id)
+            if cached is not None:
+                return cached
+
+        try:
+            customer = stripe_calls.call("customer.retrieve", self._stripe.Customer.retrieve, customer_id)
+            return payment_cache.store("customer", _customer_dict(customer))
+        except Exception as e:
+            raise PaymentError(f"Failed to retrieve customer: {str(e)}")
+
+    @timed("payment")
     def create_customer(
         self,
         email: str,
         name: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        operation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a Stripe customer.
@@ -181,6 +259,9 @@ class PaymentService:
             email: Customer email
             name: Customer name (optional)
             metadata: Additional metadata
+            operation_id: Unique ID of this operation (e.g. user ID) used for the
+                idempotency key; repeats are not detected without it
+                (see STRIPE_IDEMPOTENCY_FROM_CONTENT)
 
         Returns:
             Customer object
@@ -192,41 +273,36 @@ class PaymentService:
                 metadata={"user_id": "123"}
             )
         """
-        if self._test_mode:
-            return {
-                "id": f"cus_test_{os.urandom(12).hex()}",
-                "email": email,
-                "name": name,
-                "metadata": metadata or {},
-                "test_mode": True
-            }
+        params = {
+            "email": email,
+            "metadata": metadata or {},
+        }
 
-        try:
-            params = {
-                "email": email,
-                "metadata": metadata or {},
-            }
-
-            if name:
-                params["name"] = name
-
-            customer = self._stripe.Customer.create(**params)
-            return {
-                "id": customer.id,
-                "email": customer.email,
-                "name": customer.name,
-                "metadata": customer.metadata,
-                "test_mode": False
-            }
+        if name:
+            params["name"] = name
 
-        except Exception as e:
-            raise PaymentError(f"Failed to create customer: {str(e)}")
+        def create(idempotency_key: str) -> Dict[str, Any]:
+            try:
+                customer = stripe_calls.call(
+                    "customer.create",
+                    self._stripe.Customer.create,
+                    idempotency_key=idempotency_key,
+                    **params
+                )
+                return payment_cache.store_created("customer", _customer_dict(customer))
 
+            except Exception as e:
+                raise PaymentError(f"Failed to create customer: {str(e)}")
+
+        return _idempotent("customer.create", params, operation_id, create)
+
+    @timed("payment")
     def create_refund(
         self,
         payment_intent_id: str,
         amount: Optional[int] = None,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        operation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a refund for a payment.
@@ -235,6 +311,9 @@ class PaymentService:
             payment_intent_id: Payment intent ID to refund
             amount: Amount to refund (None for full refund)
             reason: Refund reason (optional)
+            operation_id: Unique ID of this operation (e.g. support ticket ID) used for
+                the idempotency key; repeats are not detected
+                without it (see STRIPE_IDEMPOTENCY_FROM_CONTENT)
 
         Returns:
             Refund object
@@ -250,39 +329,199 @@ class PaymentService:
                 reason="Customer request"
             )
         """
-        if self._test_mode:
-            return {
-                "id": f"re_test_{os.urandom(12).hex()}",
-                "payment_intent": payment_intent_id,
-                "amount": amount,
-                "status": "succeeded",
-                "reason": reason,
-                "test_mode": True
-            }
+        params = {
+            "payment_intent": payment_intent_id,
+        }
 
-        try:
-            params = {
-                "payment_intent": payment_intent_id,
-            }
-
-            if amount:
-                params["amount"] = amount
-
-            if reason:
-                params["reason"] = reason
-
-            refund = self._stripe.Refund.create(**params)
-            return {
-                "id": refund.id,
-                "payment_intent": refund.payment_intent,
-                "amount": refund.amount,
-                "status": refund.status,
-                "reason": refund.reason,
-                "test_mode": False
-            }
+        if amount:
+            params["amount"] = amount
 
-        except Exception as e:
-            raise PaymentError(f"Failed to create refund: {str(e)}")
+        if reason:
+            params["reason"] = reason
+
+        def create(idempotency_key: str) -> Dict[str, Any]:
+            try:
+                refund = stripe_calls.call(
+                    "refund.create",
+                    self._stripe.Refund.create,
+                    idempotency_key=idempotency_key,
+                    **params
+                )
+                return _refund_dict(refund)
+
+            except Exception as e:
+                raise PaymentError(f"Failed to create refund: {str(e)}")
+
+        return _idempotent("refund.create", params, operation_id, create)
+
+    def bulk_refund(
+        self,
+        refunds: Iterable[Union[str, Dict[str, Any]]],
+        concurrency: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        batch_id: Optional[str] = None
+    ) -> BulkRun:
+        """
+        Refund many payments with bounded concurrency.
+
+        Calls share the Stripe rate limiter and are idempotent per item, so an
+        interrupted batch can be resumed from its checkpoint safely.
+
+        Args:
+            refunds: Payment intent IDs or dicts with payment_intent_id and
+                optional amount, reason and operation_id
+            concurrency: Max refunds in flight (default: STRIPE_BULK_CONCURRENCY)
+            checkpoint: JSONL progress file; completed items are skipped on re-run
+            batch_id: Prefix of per-item operation IDs (see app.core.bulk)
+
+        Returns:
+            BulkRun - iterate for per-item outcomes, summary() for totals
+
+        Example:
+            run = payment.bulk_refund(intent_ids, checkpoint="/var/tmp/campaign-42.jsonl")
+            for outcome in run:
+                ...
+            print(run.summary())
+        """
+        def refund_one(item: Union[str, Dict[str, Any]], operation_id: str) -> Dict[str, Any]:
+            if isinstance(item, str):
+                item = {"payment_intent_id": item}
+            return self.create_refund(
+                payment_intent_id=item["payment_intent_id"],
+                amount=item.get("amount"),
+                reason=item.get("reason"),
+                operation_id=item.get("operation_id") or operation_id,
+            )
+
+        return BulkRun(
+            "refund.create", refunds, refund_one,
+            concurrency or self.bulk_concurrency, checkpoint, batch_id
+        )
+
+    def bulk_create_customers(
+        self,
+        customers: Iterable[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        checkpoint: Optional[str] = None,
+        batch_id: Optional[str] = None
+    ) -> BulkRun:
+        """
+        Create many customers with bounded concurrency. See bulk_refund().
+
+        Args:
+            customers: Dicts with email and optional name, metadata and operation_id
+            concurrency: Max creates in flight (default: STRIPE_BULK_CONCURRENCY)
+            checkpoint: JSONL progress file; completed items are skipped on re-run
+            batch_id: Prefix of per-item operation IDs (see app.core.bulk)
+
+        Returns:
+            BulkRun - iterate for per-item outcomes, summary() for totals
+        """
+        def create_one(item: Dict[str, Any], operation_id: str) -> Dict[str, Any]:
+            return self.create_customer(
+                email=item["email"],
+                name=item.get("name"),
+                metadata=item.get("metadata"),
+                operation_id=item.get("operation_id") or operation_id,
+            )
+
+        return BulkRun(
+            "customer.create", customers, create_one,
+            concurrency or self.bulk_concurrency, checkpoint, batch_id
+        )
+
+    def iter_payment_intents(
+        self,
+        created_gte: Optional[int] = None,
+        created_lt: Optional[int] = None,
+        page_size: int = 100,
+        prefetch: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream payment intents, newest first, with cursor pagination.
+
+        Only the current and the next (prefetched) page are held in memory.
+
+        Args:
+            created_gte: Only objects created at or after this Unix timestamp
+            created_lt: Only objects created before this Unix timestamp
+            page_size: Objects per API request (max 100)
+            prefetch: Fetch the next page in the background while iterating
+
+        Yields:
+            Payment intent objects (retrieve shape plus "created")
+
+        Example:
+            for intent in payment.iter_payment_intents(created_gte=day_start, created_lt=day_end):
+                reconcile(intent)
+        """
+        return self._iter_objects("payment_intent", created_gte, created_lt, page_size, prefetch)
+
+    def iter_refunds(
+        self,
+        created_gte: Optional[int] = None,
+        created_lt: Optional[int] = None,
+        page_size: int = 100,
+        prefetch: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream refunds, newest first. See iter_payment_intents().
+
+        Yields:
+            Refund objects (create shape plus "created")
+        """
+        return self._iter_objects("refund", created_gte, created_lt, page_size, prefetch)
+
+    def iter_customers(
+        self,
+        created_gte: Optional[int] = None,
+        created_lt: Optional[int] = None,
+        page_size: int = 100,
+        prefetch: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream customers, newest first. See iter_payment_intents().
+
+        Yields:
+            Customer objects (create shape plus "created")
+        """
+        return self._iter_objects("customer", created_gte, created_lt, page_size, prefetch)
+
+    def _iter_objects(
+        self,
+        kind: str,
+        created_gte: Optional[int],
+        created_lt: Optional[int],
+        page_size: int,
+        prefetch: bool
+    ) -> Iterator[Dict[str, Any]]:
+        page_size = max(1, min(page_size, 100))
+
+        resource = {
+            "payment_intent": self._stripe.PaymentIntent,
+            "refund": self._stripe.Refund,
+            "customer": self._stripe.Customer,
+        }[kind]
+        shape = _LIST_SHAPES[kind]
+        created = {}
+        if created_gte is not None:
+            created["gte"] = created_gte
+        if created_lt is not None:
+            created["lt"] = created_lt
+
+        def fetch_page(starting_after: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+            params: Dict[str, Any] = {"limit": page_size}
+            if created:
+                params["created"] = created
+            if starting_after:
+                params["starting_after"] = starting_after
+            try:
+                page = stripe_calls.call(f"{kind}.list", resource.list, **params)
+            except Exception as e:
+                raise PaymentError(f"Failed to list {kind}s: {str(e)}")
+            return [dict(shape(obj), created=obj["created"]) for obj in page["data"]], page["has_more"]
+
+        return _paginate(fetch_page, prefetch)
 
     def verify_webhook_signature(self, payload: bytes, signature: str, secret: Optional[str] = None) -> bool:
         """
@@ -307,22 +546,26 @@ class PaymentService:
                     raise HTTPException(400, "Invalid signature")
 
                 # Process webhook...
-        """
-        if self._test_mode:
-            # In test mode, always return True
-            return True
 
+            Prefer app.core.webhooks.webhooks.ingest(), which also parses,
+            dedupes and dispatches the event.
+        """
         webhook_secret = secret or os.getenv("STRIPE_WEBHOOK_SECRET")
         if not webhook_secret:
+            if self._test_mode:
+                # In test mode without a secret, accept unsigned webhooks
+                return True
             print("⚠️ STRIPE_WEBHOOK_SECRET not set, cannot verify webhook")
             return False
 
+        # Verified locally (HMAC, constant time) without parsing the payload
+        from .webhooks import WebhookError, verify_signature
+
         try:
-            self._stripe.Webhook.construct_event(
-                payload, signature, webhook_secret
-            )
+            tolerance = int(os.getenv("STRIPE_WEBHOOK_TOLERANCE_S", "300"))
+            verify_signature(payload, signature, webhook_secret, tolerance)
             return True
-        except Exception as e:
+        except WebhookError as e:
             print(f"⚠️ Webhook signature verification failed: {e}")
             return False
 
@@ -332,5 +575,231 @@ class PaymentError(Exception):
     pass
 
 
+class PaymentReadCache:
+    """
+    Short-TTL read-through cache for payment intents and customers.
+
+    Shared by PaymentService and AsyncPaymentService. Creates write through,
+    and app.core.webhooks feeds payment_intent.* / customer.* events into
+    apply_event(), which drops the object so the next read sees Stripe's
+    current state rather than waiting for the TTL.
+    """
+
+    def __init__(self):
+        self.ttls = {
+            "payment_intent": int(os.getenv("STRIPE_INTENT_CACHE_TTL_S", "30")),
+            "customer": int(os.getenv("STRIPE_CUSTOMER_CACHE_TTL_S", "300")),
+        }
+
+    def get(self, kind: str, object_id: str) -> Optional[Dict[str, Any]]:
+        """Cached object or None. kind is "payment_intent" or "customer"."""
+        if not self.ttls[kind]:
+            return None
+        return self._count(kind, cache.get(f"payment:{kind}:{object_id}"))
+
+    def store(self, kind: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache an object in retrieve shape and return it."""
+        if self.ttls[kind]:
+            cache.set(f"payment:{kind}:{obj['id']}", obj, ttl=self.ttls[kind])
+        return obj
+
+    def store_created(self, kind: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache a create result (without client_secret) and return it unchanged."""
+        self.store(kind, _without_secret(obj))
+        return obj
+
+    def invalidate(self, kind: str, object_id: str):
+        """Drop a cached object."""
+        cache.delete(f"payment:{kind}:{object_id}")
+
+    # Async variants for AsyncPaymentService (Redis calls stay off the event loop)
+
+    async def get_async(self, kind: str, object_id: str) -> Optional[Dict[str, Any]]:
+        """get() for async callers."""
+        if not self.ttls[kind]:
+            return None
+        return self._count(kind, await cache.get_async(f"payment:{kind}:{object_id}"))
+
+    async def store_async(self, kind: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """store() for async callers."""
+        if self.ttls[kind]:
+            await cache.set_async(f"payment:{kind}:{obj['id']}", obj, ttl=self.ttls[kind])
+        return obj
+
+    async def store_created_async(self, kind: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """store_created() for async callers."""
+        await self.store_async(kind, _without_secret(obj))
+        return obj
+
+    def apply_event(self, event: Dict[str, Any]):
+        """
+        Invalidate the cached object a webhook event is about.
+
+        Registered on app.core.webhooks for payment_intent.* and customer.*.
+        The event's snapshot is not stored: events can arrive out of order
+        (a late payment_intent.created after .succeeded), so the next read
+        fetches the current state instead.
+        """
+        obj = event.get("data", {}).get("object", {})
+        kind = obj.get("object")
+        if kind in self.ttls and obj.get("id"):
+            self.invalidate(kind, obj["id"])
+
+    def _count(self, kind: str, cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        outcome = "hit" if cached is not None else "miss"
+        monitor.increment(f"payment.read_cache.{outcome}", tags={"kind": kind})
+        return cached
+
+
+def _without_secret(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in obj.items() if key != "client_secret"}
+
+
+# Listing
+
+def _paginate(
+    fetch_page: Callable[[Optional[str]], Tuple[List[Dict[str, Any]], bool]],
+    prefetch: bool
+) -> Iterator[Dict[str, Any]]:
+    """Yield objects page by page, fetching page N+1 in the background while N is consumed."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="app-core-paginate") if prefetch else None
+    try:
+        items, has_more = fetch_page(None)
+        while True:
+            if not has_more or not items:
+                yield from items
+                return
+
+            cursor = items[-1]["id"]
+            next_page = executor.submit(fetch_page, cursor) if executor else None
+            yield from items
+            items, has_more = next_page.result() if next_page else fetch_page(cursor)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Idempotency shared by PaymentService and AsyncPaymentService
+
+def _idempotency_key(operation: str, params: Dict[str, Any], operation_id: Optional[str]) -> Tuple[str, bool]:
+    """Return (key, reuse_results). Random keys still make our own retries safe."""
+    if operation_id:
+        return payment_idempotency.key_for(operation, params, operation_id), True
+    # Two anonymous intents for the same amount are two buyers, never a repeat
+    anonymous_intent = operation == "payment_intent.create" and not params.get("customer")
+    if IDEMPOTENCY_FROM_CONTENT and not anonymous_intent:
+        return payment_idempotency.key_for(operation, params), True
+    return uuid.uuid4().hex, False
+
+
+def _idempotent(
+    operation: str,
+    params: Dict[str, Any],
+    operation_id: Optional[str],
+    create: Callable[[str], Dict[str, Any]],
+    read_secret: Optional[Callable[[str], str]] = None
+) -> Dict[str, Any]:
+    """
+    Run a create under the payment idempotency guard.
+
+    Results are cached without client_secret; for creates that return one,
+    `read_secret(object_id)` reads it again from Stripe on a cache hit.
+    """
+    key, reuse = _idempotency_key(operation, params, operation_id)
+    if not reuse:
+        return create(key)
+
+    def restore(cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {**cached, "client_secret": read_secret(cached["id"])}
+
+    return payment_idempotency.run(
+        key, lambda: create(key), redact=_without_secret, restore=restore if read_secret else None
+    )
+
+
+async def _idempotent_async(
+    operation: str,
+    params: Dict[str, Any],
+    operation_id: Optional[str],
+    create: Callable[[str], Awaitable[Dict[str, Any]]],
+    read_secret: Optional[Callable[[str], Awaitable[str]]] = None
+) -> Dict[str, Any]:
+    """Async version of _idempotent()."""
+    key, reuse = _idempotency_key(operation, params, operation_id)
+    if not reuse:
+        return await create(key)
+
+    async def restore(cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {**cached, "client_secret": await read_secret(cached["id"])}
+
+    return await payment_idempotency.run_async(
+        key, lambda: create(key), redact=_without_secret, restore=restore if read_secret else None
+    )
+
+
+# Response shapes shared by PaymentService and AsyncPaymentService.
+# Stripe objects and decoded API JSON both support item access; only
+# simulator objects carry test_mode.
+
+def _payment_intent_dict(intent: Any, include_secret: bool = False) -> Dict[str, Any]:
+    result = {
+        "id": intent["id"],
+        "amount": intent["amount"],
+        "currency": intent["currency"],
+        "status": intent["status"],
+        "metadata": intent["metadata"],
+        "test_mode": intent.get("test_mode", False)
+    }
+    if include_secret:
+        result["client_secret"] = intent["client_secret"]
+    return result
+
+
+def _customer_dict(customer: Any) -> Dict[str, Any]:
+    return {
+        "id": customer["id"],
+        "email": customer["email"],
+        "name": customer["name"],
+        "metadata": customer["metadata"],
+        "test_mode": customer.get("test_mode", False)
+    }
+
+
+def _refund_dict(refund: Any) -> Dict[str, Any]:
+    return {
+        "id": refund["id"],
+        "payment_intent": refund["payment_intent"],
+        "amount": refund["amount"],
+        "status": refund["status"],
+        "reason": refund["reason"],
+        "test_mode": refund.get("test_mode", False)
+    }
+
+
+_LIST_SHAPES = {
+    "payment_intent": _payment_intent_dict,
+    "refund": _refund_dict,
+    "customer": _customer_dict,
+}
+
+
+# Retry/rate-limit policy shared by PaymentService and AsyncPaymentService,
+# so both draw from one token bucket per Stripe account
+stripe_calls = OutboundCaller(
+    "stripe",
+    max_retries=int(os.getenv("STRIPE_MAX_RETRIES", "3")),
+    base_delay=float(os.getenv("STRIPE_RETRY_BASE_DELAY_MS", "250")) / 1000,
+    max_delay=float(os.getenv("STRIPE_RETRY_MAX_DELAY_MS", "8000")) / 1000,
+    rate_limit=float(os.getenv("STRIPE_RATE_LIMIT_RPS", "25")),
+    burst=float(os.getenv("STRIPE_RATE_LIMIT_BURST", "0")) or None,
+)
+
+# Completed create results are reused for the TTL (see app.core.idempotency)
+payment_idempotency = IdempotencyGuard("payment", ttl=int(os.getenv("STRIPE_IDEMPOTENCY_TTL_S", "300")))
+IDEMPOTENCY_FROM_CONTENT = os.getenv("STRIPE_IDEMPOTENCY_FROM_CONTENT", "false").lower() == "true"
+
+# Read-through cache for intents and customers, updated by webhooks
+payment_cache = PaymentReadCache()
+
 # Global payment instance
 payment = PaymentService()
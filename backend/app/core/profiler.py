@@ -0,0 +1,336 @@
+"""
+Statistical sampling profiler.
+
+Samples the Python stacks of all threads from a background thread at a fixed
+rate, tags each sample with the active monitor.trace() operation (for an
+event loop thread, that of the task running at that moment) and exports
+collapsed stacks (flamegraph.pl / speedscope compatible) or speedscope JSON.
+Daemon threads idling in a wait (the watchdog, webhook workers, the log
+flusher) are not sampled, so they don't dilute the profile.
+Works without any external profiler installed - controlled via environment variables.
+
+Usage:
+    from app.core.profiler import profiler
+
+    # Profile a block on demand
+    with profiler.profile():
+        process_batch()
+
+    profiler.export_collapsed("/tmp/batch.folded")
+    profiler.export_speedscope("/tmp/batch.speedscope.json")
+
+    # Continuous profiling (PROFILER_ENABLED=true starts it at import)
+    profiler.export_collapsed()  # Written to PROFILER_OUTPUT_DIR
+    print(profiler.stats())
+
+Environment Variables:
+    PROFILER_ENABLED: Start continuous profiling at import (default: false)
+    PROFILER_HZ: Sampling frequency in Hz (default: 99)
+    PROFILER_MAX_OVERHEAD: Max fraction of time spent sampling (default: 0.01)
+    PROFILER_MAX_DEPTH: Max frames recorded per stack (default: 128)
+    PROFILER_OUTPUT_DIR: Directory for exports without explicit path (default: system temp dir)
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import CodeType
+from typing import Any, Dict, Optional, Tuple
+
+from .monitoring import monitor
+
+# Sample key: (trace operation or None, root-first tuple of code objects)
+StackKey = Tuple[Optional[str], Tuple[CodeType, ...]]
+
+# Innermost frames of a thread parked waiting for work: (file name, function)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+
+class SamplingProfiler:
+    """
+    Thread-based sampling profiler.
+
+    Disabled (not sampling) unless started explicitly or PROFILER_ENABLED=true.
+    The sampling interval backs off automatically whenever the time spent
+    walking stacks would exceed PROFILER_MAX_OVERHEAD of wall time.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+        self.hz = float(os.getenv("PROFILER_HZ", "99"))
+        self.max_overhead = float(os.getenv("PROFILER_MAX_OVERHEAD", "0.01"))
+        self.max_depth = int(os.getenv("PROFILER_MAX_DEPTH", "128"))
+        self.output_dir = os.getenv("PROFILER_OUTPUT_DIR", tempfile.gettempdir())
+
+        self._samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._base_interval = 1.0 / self.hz
+        self._interval = self._base_interval
+        self._avg_cost = 0.0
+        self._sampling_time = 0.0
+        self._sample_rounds = 0
+        self._started_at: Optional[float] = None
+        self._elapsed = 0.0
+
+        if self.enabled:
+            self.start()
+            print(f"✅ Sampling profiler enabled ({self.hz:g} Hz)")
+        else:
+            print("ℹ️ Sampling profiler disabled.")
+
+    @property
+    def running(self) -> bool:
+        """True while the sampler thread is active."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start sampling in a background thread.
+
+        Returns:
+            True if started, False if already running
+        """
+        if self.running:
+            return False
+
+        self._stop_event.clear()
+        self._interval = self._base_interval
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="app-core-profiler", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self) -> bool:
+        """
+        Stop sampling. Collected samples are kept until reset().
+
+        Returns:
+            True if stopped, False if not running
+        """
+        if not self.running:
+            return False
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._elapsed += time.perf_counter() - self._started_at
+        self._started_at = None
+        return True
+
+    def reset(self):
+        """Discard all collected samples and statistics."""
+        with self._lock:
+            self._samples.clear()
+            self._sampling_time = 0.0
+            self._sample_rounds = 0
+            self._elapsed = 0.0
+            if self._started_at is not None:
+                self._started_at = time.perf_counter()
+
+    @contextmanager
+    def profile(self):
+        """
+        Context manager for on-demand profiling.
+
+        Leaves the profiler running if it was already started (continuous mode).
+
+        Example:
+            with profiler.profile():
+                rebuild_search_index()
+            profiler.export_speedscope("/tmp/reindex.json")
+        """
+        started = self.start()
+        try:
+            yield self
+        finally:
+            if started:
+                self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get sampler statistics.
+
+        Returns:
+            Dictionary with sample counts, effective rate and measured overhead
+        """
+        elapsed = self._elapsed
+        if self._started_at is not None:
+            elapsed += time.perf_counter() - self._started_at
+
+        with self._lock:
+            total_samples = sum(self._samples.values())
+            unique_stacks = len(self._samples)
+
+        return {
+            "running": self.running,
+            "samples": total_samples,
+            "unique_stacks": unique_stacks,
+            "rounds": self._sample_rounds,
+            "elapsed_s": round(elapsed, 3),
+            "configured_hz": self.hz,
+            "effective_hz": round(1.0 / self._interval, 2),
+            "overhead": round(self._sampling_time / elapsed, 5) if elapsed else 0.0,
+        }
+
+    def export_collapsed(self, path: Optional[str] = None) -> str:
+        """
+        Write samples in collapsed-stack format ("frame;frame;frame count").
+
+        The trace() operation, if any, is the root frame of each stack, so
+        flamegraphs group samples by operation.
+
+        Args:
+            path: Output file (default: timestamped file in PROFILER_OUTPUT_DIR)
+
+        Returns:
+            Path of the written file
+        """
+        path = path or self._default_path("folded")
+        lines = []
+        for (operation, codes), count in self._snapshot().items():
+            frames = [f"[{operation}]"] if operation else []
+            frames.extend(_frame_name(code) for code in codes)
+            lines.append(f"{';'.join(frames)} {count}")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+            if lines:
+                f.write("\n")
+        return path
+
+    def export_speedscope(self, path: Optional[str] = None) -> str:
+        """
+        Write samples as a speedscope (https://speedscope.app) sampled profile.
+
+        Args:
+            path: Output file (default: timestamped file in PROFILER_OUTPUT_DIR)
+
+        Returns:
+            Path of the written file
+        """
+        path = path or self._default_path("speedscope.json")
+        frames = []
+        frame_index: Dict[Any, int] = {}
+
+        def index_of(key, frame):
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append(frame)
+            return frame_index[key]
+
+        samples = []
+        weights = []
+        for (operation, codes), count in self._snapshot().items():
+            stack = []
+            if operation:
+                stack.append(index_of(("op", operation), {"name": f"[{operation}]"}))
+            for code in codes:
+                stack.append(index_of(code, {
+                    "name": code.co_name,
+                    "file": code.co_filename,
+                    "line": code.co_firstlineno,
+                }))
+            samples.append(stack)
+            weights.append(count)
+
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "app.core.profiler",
+            "exporter": "app.core.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": "all threads",
+                "unit": "none",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        return path
+
+    def _default_path(self, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.output_dir, f"profile-{os.getpid()}-{stamp}.{extension}")
+
+    def _snapshot(self) -> Dict[StackKey, int]:
+        with self._lock:
+            return dict(self._samples)
+
+    def _run(self):
+        own_thread = threading.get_ident()
+        max_interval = 1.0  # Never drop below 1 Hz
+
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            self._sample(own_thread)
+            cost = time.perf_counter() - started
+
+            self._sampling_time += cost
+            self._sample_rounds += 1
+            self._avg_cost = cost if self._sample_rounds == 1 else 0.9 * self._avg_cost + 0.1 * cost
+
+            # Overhead guard: keep avg_cost / interval under max_overhead
+            needed = self._avg_cost / self.max_overhead
+            if needed > self._interval:
+                self._interval = min(needed, max_interval)
+            elif self._interval > self._base_interval:
+                self._interval = max(self._base_interval, needed, self._interval * 0.9)
+
+            self._stop_event.wait(self._interval)
+
+    def _sample(self, own_thread: int):
+        daemons = {thread.ident for thread in threading.enumerate() if thread.daemon}
+        batch = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            # Background threads (watchdog, webhook workers, log flusher...) waiting for work
+            if thread_id in daemons and _is_idle(frame):
+                continue
+
+            codes = []
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+                depth += 1
+            codes.reverse()
+
+            batch.append((monitor.active_operation(thread_id), tuple(codes)))
+
+        with self._lock:
+            self._samples.update(batch)
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def _frame_name(code: CodeType) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+# Global profiler instance
+profiler = SamplingProfiler()
@@ -0,0 +1,239 @@
+"""
+Database query analysis.
+
+Aggregates the queries reported through log_db_query() per request and
+process-wide: query count, total DB time and normalised fingerprints
+(literals stripped). Flags N+1 patterns and emits one summary record per
+request instead of one log line per query.
+
+Usage:
+    from app.core import get_logger, log_db_query
+    from app.core.query_analyzer import query_analyzer
+
+    logger = get_logger(__name__)
+
+    with query_analyzer.request("GET /api/orders"):
+        for order in orders:
+            log_db_query(logger, f"SELECT * FROM items WHERE order_id = {order.id}", 1.2)
+    # -> one "Database queries" record, flagged as N+1 with the fingerprint
+    #    "select * from items where order_id = ?"
+
+    query_analyzer.top_queries(by="total_ms", limit=10)
+
+Environment Variables:
+    DB_QUERY_ANALYSIS_ENABLED: Enable/disable query aggregation (default: true)
+    DB_N_PLUS_ONE_THRESHOLD: Same fingerprint repeated more than this per request is N+1 (default: 10)
+    DB_QUERY_MAX_FINGERPRINTS: Fingerprints tracked process-wide (default: 1000)
+"""
+
+import heapq
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .logger import get_logger
+from .monitoring import monitor
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """
+    Normalise a query so that queries differing only in literals match.
+
+    Args:
+        query: SQL query (or description)
+
+    Returns:
+        Lower-cased query with comments removed, literals replaced by "?",
+        IN lists and multi-row VALUES collapsed and whitespace squeezed
+
+    Example:
+        fingerprint("SELECT * FROM users WHERE id IN (1, 2, 3) AND name = 'x'")
+        # "select * from users where id in (?) and name = ?"
+    """
+    normalised = _COMMENT_RE.sub(" ", query)
+    normalised = _STRING_RE.sub("?", normalised)
+    normalised = _NUMBER_RE.sub("?", normalised)
+    normalised = _IN_LIST_RE.sub("in (?)", normalised)
+    normalised = _VALUES_RE.sub(r"\1", normalised)
+    return _WHITESPACE_RE.sub(" ", normalised).strip().lower()
+
+
+class _RequestQueries:
+    """Queries recorded within one request."""
+
+    __slots__ = ("name", "count", "total_ms", "fingerprints")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints: Dict[str, List[float]] = {}  # fingerprint -> [count, total_ms]
+
+
+class QueryAnalyzer:
+    """
+    Per-request and process-wide query aggregation.
+
+    Fed by log_db_query(); queries outside a request() block only update the
+    process-wide statistics.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("DB_QUERY_ANALYSIS_ENABLED", "true").lower() == "true"
+        self.n_plus_one_threshold = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+        self.max_fingerprints = int(os.getenv("DB_QUERY_MAX_FINGERPRINTS", "1000"))
+        self._current: ContextVar[Optional[_RequestQueries]] = ContextVar("query_analyzer", default=None)
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._logger = get_logger("app.db")
+
+    def record(self, query: str, duration_ms: float, rows: Optional[int] = None):
+        """
+        Record one executed query. Called by log_db_query().
+
+        Args:
+            query: SQL query (or description)
+            duration_ms: Query duration in milliseconds
+            rows: Number of rows affected (optional)
+        """
+        if not self.enabled:
+            return
+
+        fp = fingerprint(query)
+
+        current = self._current.get()
+        if current is not None:
+            current.count += 1
+            current.total_ms += duration_ms
+            entry = current.fingerprints.get(fp)
+            if entry is None:
+                current.fingerprints[fp] = [1, duration_ms]
+            else:
+                entry[0] += 1
+                entry[1] += duration_ms
+
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    self._evict()
+                stats = self._stats[fp] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0}
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            if duration_ms > stats["max_ms"]:
+                stats["max_ms"] = duration_ms
+            if rows:
+                stats["rows"] += rows
+
+    @contextmanager
+    def request(self, name: str):
+        """
+        Aggregate queries for one request and emit a summary when it ends.
+
+        Emits a single "Database queries" record (WARNING if an N+1 pattern
+        was detected) plus db.* metrics through monitor.
+
+        Args:
+            name: Request or task name (e.g. "GET /api/orders")
+        """
+        queries = _RequestQueries(name)
+        token = self._current.set(queries)
+        try:
+            yield queries
+        finally:
+            self._current.reset(token)
+            self._summarise(queries)
+
+    def current_request(self) -> Optional[Dict[str, Any]]:
+        """
+        Get query count and DB time so far for the current request.
+
+        Returns:
+            Dictionary with query_count and db_time_ms, or None outside request()
+        """
+        current = self._current.get()
+        if current is None:
+            return None
+        return {"query_count": current.count, "db_time_ms": round(current.total_ms, 2)}
+
+    def top_queries(self, by: str = "total_ms", limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the top fingerprints seen by this process.
+
+        Args:
+            by: Sort key - "total_ms", "count", "max_ms" or "avg_ms"
+            limit: Number of entries
+
+        Returns:
+            List of dicts with fingerprint, count, total_ms, avg_ms, max_ms and rows
+        """
+        with self._lock:
+            entries = [
+                dict(stats, fingerprint=fp, avg_ms=stats["total_ms"] / stats["count"])
+                for fp, stats in self._stats.items()
+            ]
+
+        entries.sort(key=lambda entry: entry[by], reverse=True)
+        for entry in entries[:limit]:
+            for key in ("total_ms", "avg_ms", "max_ms"):
+                entry[key] = round(entry[key], 2)
+        return entries[:limit]
+
+    def reset(self):
+        """Clear process-wide statistics."""
+        with self._lock:
+            self._stats.clear()
+
+    def _evict(self):
+        # Keep at most half so eviction cost is amortised: the leaders by
+        # count, total and max time, so rare slow queries survive frequent
+        # cheap ones
+        per_key = max(1, self.max_fingerprints // 6)
+        keep = set()
+        for key in ("count", "total_ms", "max_ms"):
+            keep.update(heapq.nlargest(per_key, self._stats, key=lambda fp: self._stats[fp][key]))
+        self._stats = {fp: self._stats[fp] for fp in keep}
+
+    def _summarise(self, queries: _RequestQueries):
+        if not queries.count:
+            return
+
+        tags = {"request": queries.name}
+        monitor.distribution("db.query_count", queries.count, unit="none", tags=tags)
+        monitor.distribution("db.time", queries.total_ms, tags=tags)
+
+        n_plus_one = [
+            {"fingerprint": fp, "count": int(count), "total_ms": round(total_ms, 2)}
+            for fp, (count, total_ms) in queries.fingerprints.items()
+            if count > self.n_plus_one_threshold
+        ]
+        extra = {
+            "request": queries.name,
+            "query_count": queries.count,
+            "db_time_ms": round(queries.total_ms, 2),
+            "unique_queries": len(queries.fingerprints),
+        }
+
+        if n_plus_one:
+            n_plus_one.sort(key=lambda entry: entry["count"], reverse=True)
+            extra["n_plus_one"] = n_plus_one
+            monitor.increment("db.n_plus_one", tags=tags)
+            self._logger.warning("Database queries (N+1 detected)", extra=extra)
+        else:
+            self._logger.info("Database queries", extra=extra)
+
+
+# Global query analyzer instance
+query_analyzer = QueryAnalyzer()
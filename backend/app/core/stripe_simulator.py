@@ -0,0 +1,772 @@
+"""
+Stateful Stripe simulator.
+
+Backs PaymentService and AsyncPaymentService in test mode. Created payment
+intents, customers and refunds are stored and can be retrieved and listed,
+payment intents follow Stripe's state transitions, refunds are checked against
+what is left to refund, and every change emits the matching webhook event.
+Latency, 5xx errors and 429s are injected from a seeded random generator, so
+load tests of the payment path (throughput, retries, rate limiting) are
+meaningful and repeatable offline.
+
+Requests go through the same retry/rate-limit layer as real Stripe calls,
+so set STRIPE_RATE_LIMIT_RPS=0 to measure the simulator without client pacing.
+
+Usage:
+    from app.core.stripe_simulator import stripe_simulator, StripeSimulator
+
+    # In-process: PaymentService/AsyncPaymentService use it when STRIPE_ENABLED=false
+    intent = payment.create_payment_intent(amount=1000)  # stored, confirmed, events emitted
+    payment.retrieve_payment_intent(intent["id"], fresh=True)["status"]  # "succeeded"
+
+    # Explicit flows (stripe-module style resources)
+    intent = stripe_simulator.PaymentIntent.create(amount=1000, currency="usd", confirm=False)
+    stripe_simulator.PaymentIntent.confirm(intent["id"])
+
+    # Custom profile for a load test
+    sim = StripeSimulator(seed=7, latency_ms=120, latency_p99_ms=900, error_rate=0.01, rate_limit_rate=0.02)
+
+    # Local HTTP API: point STRIPE_API_BASE at it (AsyncPaymentService, or
+    # PaymentService with the stripe library)
+    base_url = stripe_simulator.serve(port=12111)
+    ...
+    stripe_simulator.shutdown()
+
+Supported API: POST/GET /v1/payment_intents[/{id}[/confirm|/cancel]],
+/v1/customers[/{id}] and /v1/refunds[/{id}], with idempotency keys and list
+pagination (limit, starting_after, created[gte|lt]). Besides the objects
+created in this process (the latest MAX_STORED_OBJECTS per type), lists
+(and retrieves) include a deterministic synthetic history of
+STRIPE_TEST_DATASET_SIZE objects per type. Events are only delivered to
+app.core.webhooks when STRIPE_SIM_WEBHOOKS=true.
+
+Object and event IDs carry a random run ID that changes on every reset(), so
+events from a new run are never mistaken for already processed ones by the
+webhook dedupe (which may outlive the process in Redis).
+
+Payment intent transitions:
+    requires_confirmation -> succeeded | requires_payment_method (declined)
+    requires_payment_method -> succeeded | requires_payment_method (declined)
+    requires_confirmation | requires_payment_method -> canceled
+
+Environment Variables:
+    STRIPE_SIM_SEED: Random seed for latency, faults and declines (default: 1)
+    STRIPE_SIM_LATENCY_MS: Median latency per request, log-normal (default: 0)
+    STRIPE_SIM_LATENCY_P99_MS: p99 latency (default: 4x the median)
+    STRIPE_SIM_ERROR_RATE: Fraction of requests failing with HTTP 500 (default: 0)
+    STRIPE_SIM_RATE_LIMIT_RATE: Fraction of requests rejected with HTTP 429 (default: 0)
+    STRIPE_SIM_DECLINE_RATE: Fraction of confirmations declined (default: 0)
+    STRIPE_SIM_AUTO_CONFIRM: Confirm payment intents on create unless the
+        request says confirm=false (default: true)
+    STRIPE_SIM_WEBHOOKS: Deliver events to app.core.webhooks, running the app's
+        handlers (default: false)
+    STRIPE_TEST_DATASET_SIZE: Synthetic objects per type (default: 1000)
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+# z-score of the 99th percentile, to derive the log-normal sigma from p99/median
+_Z_P99 = 2.3263
+
+# Idempotency keys remembered (Stripe keeps them for 24 hours)
+MAX_IDEMPOTENCY_KEYS = 100_000
+
+# Created objects kept per type; the oldest are forgotten beyond this
+MAX_STORED_OBJECTS = 100_000
+
+# Recent events kept for events()
+MAX_EVENTS = 1000
+
+_RESOURCES = {"payment_intents": "payment_intent", "customers": "customer", "refunds": "refund"}
+_PREFIXES = {"payment_intent": "pi_sim_", "customer": "cus_sim_", "refund": "re_sim_"}
+_CONFIRMABLE = ("requires_confirmation", "requires_payment_method")
+
+
+class SimulatedStripeError(Exception):
+    """
+    Error response from the simulator.
+
+    Carries http_status and headers like Stripe's errors, so the retry layer
+    treats it the same way.
+    """
+
+    def __init__(self, message: str, http_status: int, error_type: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.http_status = http_status
+        self.error_type = error_type
+        self.code = code
+        retryable = http_status == 429 or http_status >= 500
+        self.headers = {"Stripe-Should-Retry": "true" if retryable else "false"}
+
+    def body(self) -> Dict[str, Any]:
+        error = {"type": self.error_type, "message": str(self)}
+        if self.code:
+            error["code"] = self.code
+        return {"error": error}
+
+
+class _Resource:
+    """stripe-module style access (PaymentIntent.create(...)) to one resource."""
+
+    def __init__(self, simulator: "StripeSimulator", path: str):
+        self._simulator = simulator
+        self._path = path
+
+    def create(self, idempotency_key: Optional[str] = None, **params) -> Dict[str, Any]:
+        return self._simulator.call("POST", self._path, params, idempotency_key)
+
+    def retrieve(self, object_id: str) -> Dict[str, Any]:
+        return self._simulator.call("GET", f"{self._path}/{object_id}")
+
+    def list(self, **params) -> Dict[str, Any]:
+        return self._simulator.call("GET", self._path, params)
+
+    def confirm(self, object_id: str, idempotency_key: Optional[str] = None, **params) -> Dict[str, Any]:
+        return self._simulator.call("POST", f"{self._path}/{object_id}/confirm", params, idempotency_key)
+
+    def cancel(self, object_id: str, idempotency_key: Optional[str] = None, **params) -> Dict[str, Any]:
+        return self._simulator.call("POST", f"{self._path}/{object_id}/cancel", params, idempotency_key)
+
+
+class StripeSimulator:
+    """
+    In-memory Stripe API with seeded latency and fault injection.
+
+    Thread-safe. All randomness comes from one generator seeded with `seed`,
+    so a run with the same seed and request order sees the same latencies,
+    faults and declines.
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        latency_p99_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        decline_rate: Optional[float] = None,
+        auto_confirm: Optional[bool] = None,
+        dataset_size: Optional[int] = None,
+        webhook_sink: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ):
+        """
+        Args:
+            seed: Random seed (default: STRIPE_SIM_SEED)
+            latency_ms: Median request latency (default: STRIPE_SIM_LATENCY_MS)
+            latency_p99_ms: p99 request latency (default: STRIPE_SIM_LATENCY_P99_MS)
+            error_rate: Fraction of HTTP 500 responses (default: STRIPE_SIM_ERROR_RATE)
+            rate_limit_rate: Fraction of HTTP 429 responses (default: STRIPE_SIM_RATE_LIMIT_RATE)
+            decline_rate: Fraction of declined confirmations (default: STRIPE_SIM_DECLINE_RATE)
+            auto_confirm: Confirm intents on create by default (default: STRIPE_SIM_AUTO_CONFIRM)
+            dataset_size: Synthetic objects per type (default: STRIPE_TEST_DATASET_SIZE)
+            webhook_sink: Called with each event (default: none, or app.core.webhooks
+                when STRIPE_SIM_WEBHOOKS=true)
+        """
+        self.seed = seed if seed is not None else int(os.getenv("STRIPE_SIM_SEED", "1"))
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("STRIPE_SIM_LATENCY_MS", "0"))
+        self.latency_p99_ms = latency_p99_ms or float(os.getenv("STRIPE_SIM_LATENCY_P99_MS", "0")) or self.latency_ms * 4
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("STRIPE_SIM_ERROR_RATE", "0"))
+        self.rate_limit_rate = (
+            rate_limit_rate if rate_limit_rate is not None else float(os.getenv("STRIPE_SIM_RATE_LIMIT_RATE", "0"))
+        )
+        self.decline_rate = decline_rate if decline_rate is not None else float(os.getenv("STRIPE_SIM_DECLINE_RATE", "0"))
+        self.auto_confirm = (
+            auto_confirm if auto_confirm is not None
+            else os.getenv("STRIPE_SIM_AUTO_CONFIRM", "true").lower() == "true"
+        )
+        self.dataset_size = dataset_size if dataset_size is not None else int(os.getenv("STRIPE_TEST_DATASET_SIZE", "1000"))
+
+        if webhook_sink is None and os.getenv("STRIPE_SIM_WEBHOOKS", "false").lower() == "true":
+            webhook_sink = _deliver_to_webhooks
+        self.webhook_sink = webhook_sink
+
+        # stripe-module style resources, so the simulator can stand in for `stripe`
+        self.PaymentIntent = _Resource(self, "/v1/payment_intents")
+        self.Customer = _Resource(self, "/v1/customers")
+        self.Refund = _Resource(self, "/v1/refunds")
+
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.reset()
+
+    def reset(self):
+        """Drop all objects, events and counters and reseed the generator."""
+        with self._lock:
+            self._rng = random.Random(self.seed)
+            self._objects: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in _PREFIXES}
+            # Creation order per kind, for newest-first listing; _position maps
+            # an ID to its creation number, _dropped counts forgotten objects
+            self._order: Dict[str, List[str]] = {kind: [] for kind in _PREFIXES}
+            self._position: Dict[str, Dict[str, int]] = {kind: {} for kind in _PREFIXES}
+            self._dropped: Dict[str, int] = {kind: 0 for kind in _PREFIXES}
+            self._refunded: Dict[str, int] = {}
+            self._idempotency: "OrderedDict[str, Tuple[str, str, Dict[str, Any]]]" = OrderedDict()
+            self._events: deque = deque(maxlen=MAX_EVENTS)
+            self._sequence = 0
+            # Unique per run, so IDs never repeat across resets or restarts
+            self._run_id = uuid.uuid4().hex[:10]
+            self._datasets = {kind: SyntheticDataset(kind, self.dataset_size) for kind in SyntheticDataset.PREFIXES}
+            self._counts = {"requests": 0, "errors_injected": 0, "rate_limited": 0, "declined": 0, "events": 0}
+
+    def call(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Handle one API request in the calling thread, sleeping for the sampled latency.
+
+        Returns:
+            Response object (dict)
+
+        Raises:
+            SimulatedStripeError: Injected fault or API error (4xx)
+        """
+        delay, fault = self._sample()
+        if delay:
+            time.sleep(delay)
+        return self._respond(fault, method, path, params, idempotency_key)
+
+    async def call_async(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async version of call(); latency is awaited, not slept."""
+        delay, fault = self._sample()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(fault, method, path, params, idempotency_key)
+
+    def events(self, event_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recent events (up to MAX_EVENTS), oldest first, optionally of one type."""
+        with self._lock:
+            return [event for event in self._events if event_type in (None, event["type"])]
+
+    def stats(self) -> Dict[str, Any]:
+        """Request and fault counters and stored objects per type."""
+        with self._lock:
+            return {**self._counts, "objects": {kind: len(objects) for kind, objects in self._objects.items()}}
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Serve the API over local HTTP in a background thread.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+
+        Returns:
+            Base URL to use as STRIPE_API_BASE
+        """
+        if self._server is None:
+            self._server = ThreadingHTTPServer((host, port), _handler_for(self))
+            self._server.daemon_threads = True
+            threading.Thread(
+                target=self._server.serve_forever, name="app-core-stripe-sim", daemon=True
+            ).start()
+        bound_host, bound_port = self._server.server_address[:2]
+        return f"http://{bound_host}:{bound_port}"
+
+    def shutdown(self):
+        """Stop the HTTP server started by serve()."""
+        if self._server is not None:
+            server, self._server = self._server, None
+            server.shutdown()
+            server.server_close()
+
+    # Request handling
+
+    def _sample(self) -> Tuple[float, Optional[SimulatedStripeError]]:
+        """Draw latency (seconds) and an injected fault for one request."""
+        with self._lock:
+            self._counts["requests"] += 1
+            delay = 0.0
+            if self.latency_ms > 0:
+                sigma = math.log(max(self.latency_p99_ms, self.latency_ms) / self.latency_ms) / _Z_P99
+                delay = self._rng.lognormvariate(math.log(self.latency_ms), sigma) / 1000
+
+            roll = self._rng.random()
+            if roll < self.rate_limit_rate:
+                self._counts["rate_limited"] += 1
+                return delay, SimulatedStripeError(
+                    "Too many requests hit the API too quickly.", 429, "invalid_request_error", "rate_limit"
+                )
+            if roll < self.rate_limit_rate + self.error_rate:
+                self._counts["errors_injected"] += 1
+                return delay, SimulatedStripeError("An unknown error occurred (simulated).", 500, "api_error")
+            return delay, None
+
+    def _respond(
+        self,
+        fault: Optional[SimulatedStripeError],
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        idempotency_key: Optional[str]
+    ) -> Dict[str, Any]:
+        if fault is not None:
+            raise fault
+
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            result = self._handle(method, path, params or {}, idempotency_key, events)
+
+        # Delivered outside the lock: handlers may call back into the simulator
+        if self.webhook_sink:
+            for event in events:
+                self.webhook_sink(event)
+        return result
+
+    def _handle(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        idempotency_key: Optional[str],
+        events: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        # Object IDs arrive percent-encoded, one path segment each
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if len(parts) < 2 or parts[0] != "v1" or parts[1] not in _RESOURCES:
+            raise SimulatedStripeError(f"Unrecognized request URL ({method}: {path})", 404, "invalid_request_error")
+        kind = _RESOURCES[parts[1]]
+
+        if method == "GET":
+            if len(parts) == 2:
+                return self._list(kind, params)
+            if len(parts) == 3:
+                return _copy(self._get(kind, parts[2]))
+        elif method == "POST":
+            if idempotency_key:
+                fingerprint = json.dumps(params, sort_keys=True, default=str)
+                stored = self._idempotency.get(idempotency_key)
+                if stored is not None:
+                    if stored[:2] != (path, fingerprint):
+                        raise SimulatedStripeError(
+                            "Keys for idempotent requests can only be used with the same parameters "
+                            "they were first used with.",
+                            400, "idempotency_error"
+                        )
+                    return _copy(stored[2])
+
+            result = self._mutate(kind, parts[2:], params, events)
+
+            if idempotency_key:
+                self._idempotency[idempotency_key] = (path, fingerprint, _copy(result))
+                if len(self._idempotency) > MAX_IDEMPOTENCY_KEYS:
+                    self._idempotency.popitem(last=False)
+            return result
+
+        raise SimulatedStripeError(f"Unrecognized request URL ({method}: {path})", 404, "invalid_request_error")
+
+    def _mutate(self, kind: str, rest: List[str], params: Dict[str, Any], events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not rest:
+            create = {
+                "payment_intent": self._create_payment_intent,
+                "customer": self._create_customer,
+                "refund": self._create_refund,
+            }[kind]
+            return _copy(create(params, events))
+
+        if kind == "payment_intent" and len(rest) == 2 and rest[1] in ("confirm", "cancel"):
+            intent = self._get(kind, rest[0])
+            if rest[1] == "confirm":
+                self._confirm(intent, events)
+            else:
+                self._cancel(intent, params, events)
+            return _copy(intent)
+
+        raise SimulatedStripeError("Unrecognized request URL (POST)", 404, "invalid_request_error")
+
+    # Objects
+
+    def _create_payment_intent(self, params: Dict[str, Any], events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        amount = _int_param(params, "amount", required=True)
+        if amount < 1:
+            raise SimulatedStripeError("Amount must be at least 1", 400, "invalid_request_error", "amount_too_small")
+        if params.get("customer"):
+            self._get("customer", params["customer"])
+
+        intent = self._store("payment_intent", {
+            "amount": amount,
+            "currency": str(params.get("currency", "usd")).lower(),
+            "customer": params.get("customer"),
+            "metadata": dict(params.get("metadata") or {}),
+            "status": "requires_confirmation",
+        })
+        intent["client_secret"] = f"{intent['id']}_secret_{self._rng.getrandbits(64):016x}"
+        events.append(self._event("payment_intent.created", intent))
+
+        if _bool_param(params, "confirm", self.auto_confirm):
+            self._confirm(intent, events)
+        return intent
+
+    def _confirm(self, intent: Dict[str, Any], events: List[Dict[str, Any]]):
+        if intent["status"] not in _CONFIRMABLE:
+            raise _unexpected_state(intent, "confirm")
+
+        if self._rng.random() < self.decline_rate:
+            self._counts["declined"] += 1
+            intent["status"] = "requires_payment_method"
+            intent["last_payment_error"] = {"type": "card_error", "code": "card_declined", "decline_code": "generic_decline"}
+            events.append(self._event("payment_intent.payment_failed", intent))
+        else:
+            intent["status"] = "succeeded"
+            intent["last_payment_error"] = None
+            events.append(self._event("payment_intent.succeeded", intent))
+
+    def _cancel(self, intent: Dict[str, Any], params: Dict[str, Any], events: List[Dict[str, Any]]):
+        if intent["status"] not in _CONFIRMABLE:
+            raise _unexpected_state(intent, "cancel")
+        intent["status"] = "canceled"
+        intent["cancellation_reason"] = params.get("cancellation_reason")
+        events.append(self._event("payment_intent.canceled", intent))
+
+    def _create_customer(self, params: Dict[str, Any], events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        customer = self._store("customer", {
+            "email": params.get("email"),
+            "name": params.get("name"),
+            "metadata": dict(params.get("metadata") or {}),
+        })
+        events.append(self._event("customer.created", customer))
+        return customer
+
+    def _create_refund(self, params: Dict[str, Any], events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not params.get("payment_intent"):
+            raise SimulatedStripeError("Missing required param: payment_intent.", 400, "invalid_request_error", "parameter_missing")
+        intent = self._get("payment_intent", params["payment_intent"])
+        if intent["status"] != "succeeded":
+            raise SimulatedStripeError(
+                f"This PaymentIntent ({intent['id']}) does not have a successful charge to refund.",
+                400, "invalid_request_error", "charge_not_refundable"
+            )
+
+        remaining = intent["amount"] - self._refunded.get(intent["id"], 0)
+        if remaining <= 0:
+            raise SimulatedStripeError(
+                f"Charge for {intent['id']} has already been refunded.", 400, "invalid_request_error", "charge_already_refunded"
+            )
+        amount = _int_param(params, "amount") or remaining
+        if amount > remaining:
+            raise SimulatedStripeError(
+                f"Refund amount ({amount}) is greater than unrefunded amount on charge ({remaining})",
+                400, "invalid_request_error", "amount_too_large"
+            )
+
+        self._refunded[intent["id"]] = self._refunded.get(intent["id"], 0) + amount
+        refund = self._store("refund", {
+            "payment_intent": intent["id"],
+            "amount": amount,
+            "currency": intent["currency"],
+            "reason": params.get("reason"),
+            "metadata": dict(params.get("metadata") or {}),
+            "status": "succeeded",
+        })
+        events.append(self._event("refund.created", refund))
+        return refund
+
+    def _store(self, kind: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        self._sequence += 1
+        obj = {
+            "id": f"{_PREFIXES[kind]}{self._run_id}_{self._sequence:012d}",
+            "object": kind,
+            "created": int(time.time()),
+            "livemode": False,
+            "test_mode": True,
+            **fields,
+        }
+        self._objects[kind][obj["id"]] = obj
+        self._position[kind][obj["id"]] = self._dropped[kind] + len(self._order[kind])
+        self._order[kind].append(obj["id"])
+        if len(self._order[kind]) > MAX_STORED_OBJECTS:
+            self._forget_oldest(kind)
+        return obj
+
+    def _forget_oldest(self, kind: str):
+        """Drop the oldest tenth of stored objects of a kind (amortised, like a bounded cache)."""
+        count = max(1, MAX_STORED_OBJECTS // 10)
+        for object_id in self._order[kind][:count]:
+            self._objects[kind].pop(object_id, None)
+            self._position[kind].pop(object_id, None)
+            self._refunded.pop(object_id, None)
+        del self._order[kind][:count]
+        self._dropped[kind] += count
+
+    def _get(self, kind: str, object_id: str) -> Dict[str, Any]:
+        obj = self._objects[kind].get(object_id)
+        if obj is not None:
+            return obj
+
+        # Synthetic history objects become stored (mutable) on first access
+        obj = self._datasets[kind].get(object_id)
+        if obj is None:
+            raise _no_such(kind, object_id)
+        self._objects[kind][object_id] = obj
+        return obj
+
+    def _list(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        limit = max(1, min(_int_param(params, "limit") or 10, 100))
+        created = params.get("created") or {}
+        gte = _int_param(created, "gte")
+        lt = _int_param(created, "lt")
+        starting_after = params.get("starting_after")
+        dataset = self._datasets[kind]
+
+        data: List[Dict[str, Any]] = []
+        order = self._order[kind]
+        positions = self._position[kind]
+        synthetic_cursor = None
+        if starting_after and starting_after not in positions:
+            # Cursor is in the synthetic history, which follows all stored objects
+            if dataset.get(starting_after) is None:
+                raise _no_such(kind, starting_after)
+            synthetic_cursor, position = starting_after, -1
+        elif starting_after:
+            position = positions[starting_after] - self._dropped[kind] - 1
+        else:
+            position = len(order) - 1
+
+        # Stored objects, newest first
+        while position >= 0 and len(data) < limit:
+            obj = self._objects[kind][order[position]]
+            position -= 1
+            if (gte is None or obj["created"] >= gte) and (lt is None or obj["created"] < lt):
+                data.append(_copy(obj))
+
+        if len(data) < limit:
+            page, has_more = dataset.page(synthetic_cursor, gte, lt, limit - len(data))
+            data.extend(_copy(self._objects[kind].get(obj["id"], obj)) for obj in page)
+        else:
+            has_more = position >= 0 or bool(dataset.page(synthetic_cursor, gte, lt, 1)[0])
+
+        return {"object": "list", "url": f"/v1/{kind}s", "data": data, "has_more": has_more}
+
+    def _event(self, event_type: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        self._counts["events"] += 1
+        event = {
+            "id": f"evt_sim_{self._run_id}_{self._counts['events']:012d}",
+            "object": "event",
+            "type": event_type,
+            "created": int(time.time()),
+            "livemode": False,
+            "data": {"object": _copy(obj)},
+        }
+        self._events.append(event)
+        return event
+
+
+# Synthetic history
+
+_SYNTHETIC_INTENT_STATUSES = ("succeeded",) * 8 + ("canceled", "requires_payment_method")
+
+
+def _splitmix64(value: int) -> int:
+    """Cheap deterministic 64-bit hash (splitmix64 finaliser)."""
+    value = (value + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+class SyntheticDataset:
+    """
+    Deterministic, virtual list of test-mode objects for listing APIs.
+
+    Object i is generated from its index on demand (newest first, one per
+    SYNTHETIC_INTERVAL_S), so datasets of millions of objects cost no memory
+    and created-range filters seek in O(1).
+    """
+
+    BASE_CREATED = 1_700_000_000
+    SYNTHETIC_INTERVAL_S = 60
+    PREFIXES = {"payment_intent": "pi_test_", "refund": "re_test_", "customer": "cus_test_"}
+    KIND_SALT = {"payment_intent": 0, "refund": 1, "customer": 2}
+
+    def __init__(self, kind: str, size: int):
+        self.kind = kind
+        self.size = size
+        self.prefix = self.PREFIXES[kind]
+
+    def created(self, index: int) -> int:
+        return self.BASE_CREATED - index * self.SYNTHETIC_INTERVAL_S
+
+    def get(self, object_id: str) -> Optional[Dict[str, Any]]:
+        """Object with this ID, or None if it is not part of the dataset."""
+        suffix = object_id[len(self.prefix):]
+        if not object_id.startswith(self.prefix) or not suffix.isdigit() or int(suffix) >= self.size:
+            return None
+        return self.object(int(suffix))
+
+    def object(self, index: int) -> Dict[str, Any]:
+        """Build object `index`; the same index always yields the same object."""
+        h = _splitmix64(index * 3 + self.KIND_SALT[self.kind])
+        base = {
+            "id": f"{self.prefix}{index:012d}",
+            "object": self.kind,
+            "created": self.created(index),
+            "livemode": False,
+            "test_mode": True,
+        }
+
+        if self.kind == "payment_intent":
+            return {
+                **base,
+                "amount": 100 + h % 99_900,
+                "currency": ("usd", "usd", "usd", "eur", "gbp")[(h >> 20) % 5],
+                "status": _SYNTHETIC_INTENT_STATUSES[(h >> 24) % 10],
+                "metadata": {"order_id": f"order_{index}"},
+            }
+        if self.kind == "refund":
+            return {
+                **base,
+                "payment_intent": f"pi_test_{(h >> 8) % (self.size * 10):012d}",
+                "amount": 100 + h % 9_900,
+                "status": "failed" if (h >> 40) % 10 == 0 else "succeeded",
+                "reason": (None, "requested_by_customer", "duplicate")[(h >> 44) % 3],
+            }
+        return {
+            **base,
+            "email": f"customer{index}@example.com",
+            "name": f"Test Customer {index}",
+            "metadata": {"user_id": str(index)},
+        }
+
+    def page(
+        self,
+        starting_after: Optional[str],
+        created_gte: Optional[int],
+        created_lt: Optional[int],
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Return (objects, has_more) like a Stripe list call.
+
+        Raises:
+            SimulatedStripeError: resource_missing if starting_after is not in the dataset
+        """
+        start, end = 0, self.size
+        if created_lt is not None:
+            start = max(start, (self.BASE_CREATED - created_lt) // self.SYNTHETIC_INTERVAL_S + 1)
+        if created_gte is not None:
+            end = min(end, (self.BASE_CREATED - created_gte) // self.SYNTHETIC_INTERVAL_S + 1)
+        if starting_after:
+            if self.get(starting_after) is None:
+                raise _no_such(self.kind, starting_after)
+            start = max(start, int(starting_after[len(self.prefix):]) + 1)
+
+        stop = min(end, start + limit)
+        return [self.object(i) for i in range(start, stop)], stop < end
+
+
+# Helpers
+
+def _copy(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot an object so callers never share mutable state with the store."""
+    return json.loads(json.dumps(obj))
+
+
+def _int_param(params: Dict[str, Any], name: str, required: bool = False) -> Optional[int]:
+    value = params.get(name)
+    if value is None or value == "":
+        if required:
+            raise SimulatedStripeError(f"Missing required param: {name}.", 400, "invalid_request_error", "parameter_missing")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise SimulatedStripeError(f"Invalid integer: {value}", 400, "invalid_request_error", "parameter_invalid_integer")
+
+
+def _bool_param(params: Dict[str, Any], name: str, default: bool) -> bool:
+    value = params.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.lower() == "true"
+    return bool(value)
+
+
+def _no_such(kind: str, object_id: str) -> SimulatedStripeError:
+    return SimulatedStripeError(f"No such {kind}: '{object_id}'", 404, "invalid_request_error", "resource_missing")
+
+
+def _unexpected_state(intent: Dict[str, Any], action: str) -> SimulatedStripeError:
+    return SimulatedStripeError(
+        f"You cannot {action} this PaymentIntent because it has a status of {intent['status']}.",
+        400, "invalid_request_error", "payment_intent_unexpected_state"
+    )
+
+
+def _decode_form(pairs: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Decode Stripe form encoding (metadata[key]=value, created[gte]=...) into dicts."""
+    params: Dict[str, Any] = {}
+    for name, value in pairs:
+        target, keys = params, name.replace("]", "").split("[")
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return params
+
+
+def _deliver_to_webhooks(event: Dict[str, Any]):
+    # Imported lazily: app.core.webhooks depends on app.core.payment, which uses the simulator
+    from .webhooks import webhooks
+
+    webhooks.submit(event)
+
+
+def _handler_for(simulator: StripeSimulator):
+    class StripeSimulatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            self._dispatch("GET", url.path, _decode_form(parse_qsl(url.query)))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else ""
+            url = urlsplit(self.path)
+            self._dispatch("POST", url.path, _decode_form(parse_qsl(body)))
+
+        def _dispatch(self, method: str, path: str, params: Dict[str, Any]):
+            try:
+                status, headers, result = 200, {}, simulator.call(
+                    method, path, params, self.headers.get("Idempotency-Key")
+                )
+            except SimulatedStripeError as e:
+                status, headers, result = e.http_status, e.headers, e.body()
+
+            body = json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StripeSimulatorHandler
+
+
+# Global simulator used by the payment services in test mode
+stripe_simulator = StripeSimulator()
@@ -0,0 +1,174 @@
+"""
+Per-request time budget.
+
+Attributes the time of a request to the services it used. Service entry
+points are decorated with @timed("<category>") (payment.*), Redis cache
+round trips and log_db_query() report their time with record_time(), and
+in-memory cache calls are only counted, with record_call(). Nothing is
+recorded outside a RequestTiming.bind() block, where the decorators cost one
+context variable lookup plus the wrapper call (~0.15 us), so only wrap calls
+that take far longer than that.
+
+Usage:
+    from app.core.timing import RequestTiming
+
+    timing = RequestTiming()
+    with timing.bind():
+        handle_request()
+
+    timing.breakdown()      # {"cache_ms": 0.8, "cache_calls": 3, ..., "app_ms": 41.2, "total_ms": 44.9}
+    timing.server_timing()  # 'cache;dur=0.8;desc="3 calls", ..., total;dur=44.9'
+
+Only the outermost timed call is counted: cache lookups made inside a
+payment call are part of the payment time, so the categories plus "app"
+add up to the total. Concurrent timed calls in one request (asyncio.gather)
+each count in full, in which case "app" is clamped at zero.
+"""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+_current: ContextVar[Optional["RequestTiming"]] = ContextVar("request_timing", default=None)
+# Category of the timed call in progress in this context, if any
+_inside: ContextVar[Optional[str]] = ContextVar("request_timing_inside", default=None)
+
+
+class RequestTiming:
+    """Calls and milliseconds per category for one request."""
+
+    __slots__ = ("started", "categories")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.categories: Dict[str, list] = {}  # category -> [calls, total ms]
+
+    @contextmanager
+    def bind(self):
+        """Attribute timed calls in this context (and tasks it creates) to this request."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add(self, category: str, duration_ms: float, calls: int = 1):
+        """Add time spent in a category."""
+        entry = self.categories.get(category)
+        if entry is None:
+            self.categories[category] = [calls, duration_ms]
+        else:
+            entry[0] += calls
+            entry[1] += duration_ms
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started."""
+        return (time.perf_counter() - self.started) * 1000
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Flat breakdown for log records.
+
+        Returns:
+            {"<category>_ms", "<category>_calls", ..., "app_ms", "total_ms"}
+        """
+        total_ms = self.elapsed_ms()
+        result: Dict[str, Any] = {}
+        spent = 0.0
+        for category, (calls, duration_ms) in self.categories.items():
+            result[f"{category}_ms"] = round(duration_ms, 2)
+            result[f"{category}_calls"] = calls
+            spent += duration_ms
+        result["app_ms"] = round(max(0.0, total_ms - spent), 2)
+        result["total_ms"] = round(total_ms, 2)
+        return result
+
+    def server_timing(self) -> str:
+        """Server-Timing header value with one metric per category plus app and total."""
+        total_ms = self.elapsed_ms()
+        parts = []
+        spent = 0.0
+        for category, (calls, duration_ms) in self.categories.items():
+            parts.append(f'{category};dur={duration_ms:.2f};desc="{calls} calls"')
+            spent += duration_ms
+        parts.append(f"app;dur={max(0.0, total_ms - spent):.2f}")
+        parts.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(parts)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """The RequestTiming bound to the current context, or None."""
+    return _current.get()
+
+
+def record_time(category: str, duration_ms: float):
+    """
+    Attribute already measured time to the current request.
+
+    Used for work timed by the caller, e.g. log_db_query(). Ignored outside
+    a request or inside another timed call.
+    """
+    timing = _current.get()
+    if timing is not None and _inside.get() is None:
+        timing.add(category, duration_ms)
+
+
+def record_call(category: str):
+    """
+    Count a call too cheap to be worth timing (e.g. an in-memory cache hit).
+
+    It shows up in "<category>_calls" and the Server-Timing description with
+    no time of its own. Ignored outside a request or inside another timed call.
+    """
+    timing = _current.get()
+    if timing is not None and _inside.get() is None:
+        timing.add(category, 0.0)
+
+
+def timed(category: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator attributing a function's (or coroutine's) time to `category`.
+
+    Example:
+        class CacheService:
+            @timed("cache")
+            def get(self, key): ...
+    """
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                timing = _current.get()
+                if timing is None or _inside.get() is not None:
+                    return await fn(*args, **kwargs)
+
+                token = _inside.set(category)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    timing.add(category, (time.perf_counter() - started) * 1000)
+                    _inside.reset(token)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timing = _current.get()
+            if timing is None or _inside.get() is not None:
+                return fn(*args, **kwargs)
+
+            token = _inside.set(category)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing.add(category, (time.perf_counter() - started) * 1000)
+                _inside.reset(token)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,455 @@
+"""
+Stripe webhook ingestion.
+
+Verifies the Stripe-Signature HMAC locally (constant time, timestamp
+tolerance), parses the payload once, drops already handled event IDs via the
+cache and hands events to a bounded worker pool that preserves ordering per
+Stripe object. Handlers are registered by event type; payment_intent.* and
+customer.* events also invalidate the payment read cache.
+
+Deliveries are acknowledged only once their handlers ran: ingest() waits for
+the worker and returns "failed" if a handler raised, so the endpoint answers
+non-2xx and Stripe redelivers (nothing is lost on restart, as Stripe keeps
+retrying unacknowledged events).
+
+Dedupe uses two cache keys per event. A short-lived "processing" claim
+(STRIPE_WEBHOOK_PROCESSING_TTL_S) is taken before the handlers run; a
+redelivery arriving while it is held gets "in_progress" (answer non-2xx,
+Stripe retries later), and if the process dies mid-event the claim simply
+expires. The long-lived "done" marker (STRIPE_WEBHOOK_DEDUPE_TTL_S) is only
+written after the handlers succeeded. Events submitted in-process with submit()
+have no redelivery; they are retried STRIPE_WEBHOOK_MAX_ATTEMPTS times and
+then kept in dead_letters() for replay_dead_letters(). Handlers can run more
+than once per event and must be idempotent.
+
+Usage:
+    from app.core.webhooks import webhooks, WebhookError
+
+    @webhooks.on("payment_intent.succeeded")
+    def fulfil_order(event):
+        intent = event["data"]["object"]
+        ...
+
+    @webhooks.on("customer.*")
+    def sync_customer(event):
+        ...
+
+    # In FastAPI endpoint
+    @app.post("/webhooks/stripe")
+    async def stripe_webhook(request: Request):
+        try:
+            result = await webhooks.ingest_async(await request.body(), request.headers.get("stripe-signature"))
+        except WebhookError:
+            raise HTTPException(400, "Invalid signature")
+        if result["status"] in ("rejected", "in_progress"):
+            raise HTTPException(503, "Busy")  # Stripe retries later
+        if result["status"] == "failed":
+            raise HTTPException(500, "Handler failed")  # Stripe redelivers
+        return {"received": True}
+
+Environment Variables:
+    STRIPE_WEBHOOK_SECRET: Webhook signing secret (required to verify)
+    STRIPE_WEBHOOK_TOLERANCE_S: Max signature age in seconds (default: 300)
+    STRIPE_WEBHOOK_WORKERS: Worker threads (default: 4)
+    STRIPE_WEBHOOK_QUEUE_SIZE: Pending events per worker before rejecting (default: 1000)
+    STRIPE_WEBHOOK_DEDUPE_TTL_S: How long handled event IDs are remembered (default: 259200, 3 days)
+    STRIPE_WEBHOOK_PROCESSING_TTL_S: How long an event being handled blocks redeliveries;
+        keep it above the slowest handler run (default: 60)
+    STRIPE_WEBHOOK_MAX_ATTEMPTS: Handler attempts for submit()ted events before
+        dead-lettering (default: 3)
+    STRIPE_WEBHOOK_DEAD_LETTER_SIZE: Dead-lettered events kept in memory (default: 1000)
+"""
+
+import os
+import asyncio
+import hmac
+import json
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from hashlib import sha256
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cache import cache
+from .logger import get_logger, log_error
+from .monitoring import monitor
+from .payment import PaymentError, payment_cache
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+_STOP = object()
+
+
+class WebhookError(PaymentError):
+    """Invalid webhook signature or payload."""
+    pass
+
+
+class _Delivery:
+    """Outcome slot for a submit() that waits for its handlers."""
+
+    __slots__ = ("done", "status")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.status: Optional[str] = None
+
+
+def parse_signature_header(header: str) -> Tuple[int, List[str]]:
+    """
+    Parse a Stripe-Signature header ("t=...,v1=...,v1=...").
+
+    Returns:
+        (timestamp, list of v1 signatures)
+
+    Raises:
+        WebhookError: If the header has no timestamp or v1 signature
+    """
+    timestamp = None
+    signatures = []
+    for item in (header or "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            try:
+                timestamp = int(value)
+            except ValueError:
+                raise WebhookError("Invalid timestamp in Stripe-Signature header")
+        elif key == "v1":
+            signatures.append(value)
+
+    if timestamp is None or not signatures:
+        raise WebhookError("Stripe-Signature header missing timestamp or v1 signature")
+    return timestamp, signatures
+
+
+def compute_signature(payload: bytes, timestamp: int, secret: str) -> str:
+    """Compute the v1 signature Stripe sends for `payload` at `timestamp`."""
+    signed = str(timestamp).encode() + b"." + payload
+    return hmac.new(secret.encode(), signed, sha256).hexdigest()
+
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance: int = 300) -> None:
+    """
+    Verify a Stripe-Signature header without parsing the payload.
+
+    Args:
+        payload: Raw request body
+        header: Stripe-Signature header value
+        secret: Webhook signing secret (whsec_...)
+        tolerance: Max age of the signature in seconds (0 disables the check)
+
+    Raises:
+        WebhookError: If no signature matches or the timestamp is too old
+    """
+    timestamp, signatures = parse_signature_header(header)
+    expected = compute_signature(payload, timestamp, secret)
+
+    # Check every candidate so timing doesn't reveal which one matched
+    matched = False
+    for signature in signatures:
+        matched |= hmac.compare_digest(expected, signature)
+    if not matched:
+        raise WebhookError("No signatures found matching the expected signature for payload")
+
+    if tolerance and abs(time.time() - timestamp) > tolerance:
+        raise WebhookError("Timestamp outside the tolerance zone")
+
+
+class WebhookProcessor:
+    """
+    Webhook verification, dedupe and dispatch.
+
+    Events for the same Stripe object always go to the same worker, so they
+    are handled in the order they were received.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        tolerance: Optional[int] = None,
+        dedupe_ttl: Optional[int] = None
+    ):
+        self.workers = workers or int(os.getenv("STRIPE_WEBHOOK_WORKERS", "4"))
+        self.queue_size = queue_size or int(os.getenv("STRIPE_WEBHOOK_QUEUE_SIZE", "1000"))
+        self.tolerance = tolerance if tolerance is not None else int(os.getenv("STRIPE_WEBHOOK_TOLERANCE_S", "300"))
+        self.dedupe_ttl = dedupe_ttl or int(os.getenv("STRIPE_WEBHOOK_DEDUPE_TTL_S", "259200"))
+        self.processing_ttl = int(os.getenv("STRIPE_WEBHOOK_PROCESSING_TTL_S", "60"))
+        self.max_attempts = max(1, int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "3")))
+        self.retry_delay = 0.5  # Seconds before the second attempt, doubling after
+        self._dead_letters: deque = deque(maxlen=int(os.getenv("STRIPE_WEBHOOK_DEAD_LETTER_SIZE", "1000")))
+
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._queues: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._logger = get_logger("app.webhooks")
+
+    def on(self, event_type: str) -> Callable[[Handler], Handler]:
+        """
+        Decorator registering a handler for an event type.
+
+        Args:
+            event_type: Exact type ("payment_intent.succeeded"), prefix
+                wildcard ("payment_intent.*") or "*" for all events
+        """
+        def decorator(handler: Handler) -> Handler:
+            self.register(event_type, handler)
+            return handler
+        return decorator
+
+    def register(self, event_type: str, handler: Handler):
+        """Register a handler for an event type (see on())."""
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def construct_event(self, payload: bytes, header: str, secret: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Verify the signature and parse the payload (once).
+
+        Args:
+            payload: Raw request body
+            header: Stripe-Signature header value
+            secret: Webhook secret (default: STRIPE_WEBHOOK_SECRET)
+
+        Returns:
+            Parsed event dict
+
+        Raises:
+            WebhookError: Invalid signature, stale timestamp, missing secret or bad JSON
+        """
+        webhook_secret = secret or os.getenv("STRIPE_WEBHOOK_SECRET")
+        if not webhook_secret:
+            raise WebhookError("STRIPE_WEBHOOK_SECRET not set, cannot verify webhook")
+
+        try:
+            verify_signature(payload, header, webhook_secret, self.tolerance)
+        except WebhookError:
+            monitor.increment("webhook.invalid_signature")
+            raise
+
+        try:
+            event = json.loads(payload)
+        except ValueError as e:
+            raise WebhookError(f"Invalid webhook payload: {e}")
+        if not isinstance(event, dict) or "id" not in event or "type" not in event:
+            raise WebhookError("Invalid webhook payload: not a Stripe event")
+        return event
+
+    def ingest(self, payload: bytes, header: str, secret: Optional[str] = None, block: bool = False) -> Dict[str, Any]:
+        """
+        Verify, dedupe and handle a webhook delivery, waiting for the handlers.
+
+        Args:
+            payload: Raw request body
+            header: Stripe-Signature header value
+            secret: Webhook secret (default: STRIPE_WEBHOOK_SECRET)
+            block: Wait for queue space instead of rejecting when full
+
+        Returns:
+            {"id", "type", "status"} with status "processed", "duplicate",
+            "failed" (a handler raised), "in_progress" (another delivery of
+            the event is being handled) or "rejected" (queue full); answer
+            non-2xx for the last three so Stripe redelivers
+
+        Raises:
+            WebhookError: If the delivery is not a validly signed Stripe event
+        """
+        event = self.construct_event(payload, header, secret)
+        status = self.submit(event, block=block, wait=True)
+        return {"id": event["id"], "type": event["type"], "status": status}
+
+    async def ingest_async(
+        self,
+        payload: bytes,
+        header: str,
+        secret: Optional[str] = None,
+        block: bool = False
+    ) -> Dict[str, Any]:
+        """ingest() for async endpoints: waits in a thread, not on the event loop."""
+        return await asyncio.to_thread(self.ingest, payload, header, secret, block)
+
+    def submit(self, event: Dict[str, Any], block: bool = False, wait: bool = False) -> str:
+        """
+        Queue an already verified event.
+
+        Args:
+            event: Parsed Stripe event
+            block: Wait for queue space instead of rejecting when full
+            wait: Wait for the handlers and report their outcome (one attempt;
+                the caller's redelivery is the retry). Otherwise failed events
+                are retried and dead-lettered (see dead_letters())
+
+        Returns:
+            "processed" or "failed" (wait=True), "queued", "duplicate",
+            "in_progress" or "rejected"
+        """
+        monitor.increment("webhook.received", tags={"type": event["type"]})
+
+        unclaimed = self._claim(event["id"])
+        if unclaimed:
+            monitor.increment(f"webhook.{unclaimed}")
+            return unclaimed
+
+        self._ensure_started()
+        delivery = _Delivery() if wait else None
+        worker = zlib.crc32(_ordering_key(event).encode()) % self.workers
+        try:
+            self._queues[worker].put((event, time.perf_counter(), delivery), block=block)
+        except queue.Full:
+            self._release(event["id"])
+            monitor.increment("webhook.rejected")
+            return "rejected"
+
+        if delivery is None:
+            return "queued"
+        delivery.done.wait()
+        return delivery.status
+
+    def dispatch(self, event: Dict[str, Any]) -> int:
+        """
+        Run the handlers registered for an event, in the calling thread.
+
+        Returns:
+            Number of handlers run
+
+        Raises:
+            The first handler exception (remaining handlers still run)
+        """
+        event_type = event["type"]
+        handlers = self._handlers.get(event_type, []) + self._handlers.get("*", [])
+        prefix = event_type.rsplit(".", 1)[0] + ".*" if "." in event_type else None
+        if prefix:
+            handlers += self._handlers.get(prefix, [])
+
+        first_error = None
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                monitor.increment("webhook.handler_error", tags={"type": event_type})
+                log_error(self._logger, e, {"event_id": event["id"], "event_type": event_type})
+                first_error = first_error or e
+        if first_error:
+            raise first_error
+        return len(handlers)
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """submit()ted events whose handlers kept failing, oldest first."""
+        return list(self._dead_letters)
+
+    def replay_dead_letters(self) -> Dict[str, int]:
+        """
+        Resubmit dead-lettered events (e.g. after fixing a handler).
+
+        Returns:
+            Count of events per submit() status
+        """
+        counts: Dict[str, int] = {}
+        while self._dead_letters:
+            status = self.submit(self._dead_letters.popleft(), block=True)
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def join(self):
+        """Block until every queued event has been handled."""
+        for q in list(self._queues):
+            q.join()
+
+    def stop(self):
+        """Finish queued events and stop the workers. They restart on next submit()."""
+        with self._lock:
+            queues, threads = self._queues, self._threads
+            self._queues, self._threads = [], []
+        for q in queues:
+            q.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per worker and registered event types."""
+        return {
+            "workers": len(self._threads),
+            "queued": [q.qsize() for q in self._queues],
+            "dead_letters": len(self._dead_letters),
+            "handlers": sorted(self._handlers),
+        }
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+            threads = [
+                threading.Thread(target=self._worker, args=(q,), name=f"app-core-webhook-{i}", daemon=True)
+                for i, q in enumerate(queues)
+            ]
+            for thread in threads:
+                thread.start()
+            self._queues, self._threads = queues, threads
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            try:
+                if item is _STOP:
+                    return
+                event, queued_at, delivery = item
+                monitor.distribution("webhook.queue_wait", (time.perf_counter() - queued_at) * 1000)
+                if delivery is not None:
+                    delivery.status = self._handle(event, attempts=1)
+                    delivery.done.set()
+                elif self._handle(event, attempts=self.max_attempts) == "failed":
+                    self._dead_letters.append(event)
+                    monitor.increment("webhook.dead_letter", tags={"type": event["type"]})
+                    self._logger.error(f"Webhook event {event['id']} ({event['type']}) dead-lettered")
+            finally:
+                q.task_done()
+
+    def _handle(self, event: Dict[str, Any], attempts: int) -> str:
+        """Dispatch with retries; mark the event done, or release it so a redelivery is processed."""
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                self.dispatch(event)
+            except Exception:
+                # Already logged by dispatch()
+                continue
+            cache.set(f"webhook:done:{event['id']}", 1, ttl=self.dedupe_ttl)
+            self._release(event["id"])
+            return "processed"
+        self._release(event["id"])
+        return "failed"
+
+    def _claim(self, event_id: str) -> Optional[str]:
+        """Take the processing claim. Returns None if taken, else "in_progress" or "duplicate"."""
+        # Atomic across processes with Redis; a cache error counts as claimed
+        # (handling twice beats dropping the event)
+        if cache.set_if_absent(f"webhook:processing:{event_id}", 1, ttl=self.processing_ttl) is False:
+            return "in_progress"
+        # Checked after claiming, so a delivery finishing in between is seen
+        if cache.exists(f"webhook:done:{event_id}"):
+            self._release(event_id)
+            return "duplicate"
+        return None
+
+    def _release(self, event_id: str):
+        cache.delete(f"webhook:processing:{event_id}")
+
+
+def _ordering_key(event: Dict[str, Any]) -> str:
+    obj = event.get("data", {}).get("object", {})
+    return str(obj.get("id") or event["id"])
+
+
+# Global webhook processor
+webhooks = WebhookProcessor()
+
+# Drop cached intents/customers when Stripe reports a change
+webhooks.register("payment_intent.*", payment_cache.apply_event)
+webhooks.register("customer.*", payment_cache.apply_event)
@@ -0,0 +1,424 @@
+"""
+app.core service benchmarks.
+
+Measures cache operations per backend, log records per second per formatter
+and handler mode (including stdout redirected to a file vs the buffered file
+sink), monitor.trace() overhead, payment calls against the
+in-process Stripe simulator, RequestTimingMiddleware overhead per request and
+`import app.core` time. Needs no network:
+backends that are not available locally (Redis, Sentry, python-json-logger
+for the JSON formatter) are reported as skipped.
+
+Usage (from backend/):
+    python -m benchmarks.core_services
+    python -m benchmarks.core_services cache logging
+
+Results are flat {"<group>.<case>.<metric>": value} dictionaries. Metric
+names end in "_per_s" (higher is better) or "_us"/"_ms" (lower is better),
+which is how benchmarks.suite compares them against the baseline.
+
+Environment Variables:
+    BENCH_REDIS_URL: Redis to benchmark (default: REDIS_URL, skipped if unreachable)
+    BENCH_SCALE: Multiplier for iteration counts (default: 1.0)
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Measure the services, not client-side pacing
+os.environ.setdefault("STRIPE_RATE_LIMIT_RPS", "0")
+
+from app.core.cache import CacheService  # noqa: E402
+from app.core.logger import flight_recorder, get_logger  # noqa: E402
+from app.core.monitoring import monitor  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCALE = float(os.getenv("BENCH_SCALE", "1.0"))
+REPEATS = 3
+
+
+def measure(fn: Callable[[int], Any], iterations: int) -> float:
+    """
+    Best-of-REPEATS seconds per iteration of fn(iterations).
+
+    fn runs the whole loop itself so per-call overhead of the harness is not
+    counted.
+    """
+    iterations = max(1, int(iterations * SCALE))
+    best = float("inf")
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(iterations)
+        best = min(best, time.perf_counter() - started)
+    return best / iterations
+
+
+def _env(**values: str):
+    """Set environment variables, returning the previous values for _restore_env()."""
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    return previous
+
+
+def _restore_env(previous: Dict[str, Optional[str]]):
+    for name, value in previous.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+# Cache
+
+def _memory_cache() -> Optional[CacheService]:
+    previous = _env(REDIS_ENABLED="false")
+    try:
+        return CacheService()
+    finally:
+        _restore_env(previous)
+
+
+def _redis_cache() -> Optional[CacheService]:
+    url = os.getenv("BENCH_REDIS_URL") or os.getenv("REDIS_URL")
+    if not url:
+        return None
+    previous = _env(REDIS_ENABLED="true", REDIS_URL=url)
+    try:
+        service = CacheService()
+    finally:
+        _restore_env(previous)
+    return service if service.enabled else None
+
+
+# name -> factory returning a CacheService, or None when unavailable
+CACHE_BACKENDS: Dict[str, Callable[[], Optional[CacheService]]] = {
+    "memory": _memory_cache,
+    "redis": _redis_cache,
+}
+
+
+def bench_cache() -> Dict[str, Any]:
+    """get/set/exists and 100-key batch operations per backend."""
+    results: Dict[str, Any] = {}
+    value = {"id": 123, "email": "user@example.com", "roles": ["admin", "billing"]}
+    batch = {f"bench:batch:{i}": value for i in range(100)}
+    batch_keys = list(batch)
+
+    for name, factory in CACHE_BACKENDS.items():
+        service = factory()
+        if service is None:
+            results[f"cache.{name}.skipped"] = True
+            continue
+
+        # Remote backends are ~1000x slower per op; keep their runs short
+        iterations = 20_000 if name == "memory" else 500
+
+        def set_loop(n):
+            for i in range(n):
+                service.set(f"bench:key:{i % 1000}", value, ttl=60)
+
+        def get_loop(n):
+            for i in range(n):
+                service.get(f"bench:key:{i % 1000}")
+
+        def miss_loop(n):
+            for i in range(n):
+                service.get(f"bench:missing:{i % 1000}")
+
+        def exists_loop(n):
+            for i in range(n):
+                service.exists(f"bench:key:{i % 1000}")
+
+        def set_many_loop(n):
+            for _ in range(n):
+                service.set_many(batch, ttl=60)
+
+        def get_many_loop(n):
+            for _ in range(n):
+                service.get_many(batch_keys)
+
+        results[f"cache.{name}.set_per_s"] = round(1 / measure(set_loop, iterations))
+        results[f"cache.{name}.get_per_s"] = round(1 / measure(get_loop, iterations))
+        results[f"cache.{name}.get_miss_per_s"] = round(1 / measure(miss_loop, iterations))
+        results[f"cache.{name}.exists_per_s"] = round(1 / measure(exists_loop, iterations))
+        results[f"cache.{name}.set_many_keys_per_s"] = round(100 / measure(set_many_loop, iterations // 100))
+        results[f"cache.{name}.get_many_keys_per_s"] = round(100 / measure(get_many_loop, iterations // 100))
+
+        for i in range(1000):
+            service.delete(f"bench:key:{i}")
+        for key in batch_keys:
+            service.delete(key)
+
+    return results
+
+
+# Logging
+
+def _bench_logger(
+    name: str,
+    log_format: str,
+    recorder: bool,
+    output: str = "null",
+    directory: Optional[str] = None
+) -> logging.Logger:
+    """Configure a fresh get_logger() logger writing to `output` (see LOG_HANDLER_MODES)."""
+    settings = {"LOG_FORMAT": log_format, "LOG_LEVEL": "INFO", "LOG_OUTPUT": "stdout"}
+    if output == "file":
+        settings.update(LOG_OUTPUT="file", LOG_FILE_PATH=os.path.join(directory, f"{name}.log"))
+    previous = _env(**settings)
+    recorder_enabled = flight_recorder.enabled
+    flight_recorder.enabled = recorder
+    try:
+        logger = get_logger(name)
+    finally:
+        flight_recorder.enabled = recorder_enabled
+        _restore_env(previous)
+
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler):
+            if output == "stdout_file":
+                handler.setStream(open(os.path.join(directory, f"{name}.log"), "w", encoding="utf-8"))
+            else:
+                handler.setStream(_NullStream())
+    return logger
+
+
+def _close_logger(logger: logging.Logger):
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler.stream, _NullStream):
+            handler.stream.close()
+        elif not isinstance(handler, logging.StreamHandler):
+            handler.close()
+
+
+class _NullStream(io.TextIOBase):
+    """Discards output, so handler cost is measured without terminal I/O."""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+# handler mode -> (flight recorder enabled, output), where output is
+#   null:        formatting and handler cost only
+#   stdout_file: stdout StreamHandler redirected to a file (what the shell pipe does)
+#   file:        buffered file sink (LOG_OUTPUT=file), including its final flush
+LOG_HANDLER_MODES = {
+    "stream": (False, "null"),
+    "flight_recorder": (True, "null"),
+    "stdout_file": (False, "stdout_file"),
+    "file": (False, "file"),
+}
+
+# LOG_FORMAT -> check that get_logger() really uses that formatter here
+# (without python-json-logger, "json" falls back to the text formatter)
+LOG_FORMATS: Dict[str, Callable[[], bool]] = {
+    "json": lambda: importlib.util.find_spec("pythonjsonlogger") is not None,
+    "text": lambda: True,
+}
+
+
+def bench_logging() -> Dict[str, Any]:
+    """Records/s per formatter and handler mode; DEBUG records suppressed or recorded."""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-logs-") as directory:
+        for log_format, available in LOG_FORMATS.items():
+            if not available():
+                results[f"logging.{log_format}.skipped"] = True
+                continue
+            for mode, (recorder, output) in LOG_HANDLER_MODES.items():
+                logger = _bench_logger(f"bench.logging.{log_format}.{mode}", log_format, recorder, output, directory)
+                handler = logger.handlers[-1]
+
+                def info_loop(n):
+                    for i in range(n):
+                        logger.info("Benchmark record", extra={"i": i, "user_id": 123})
+                    handler.flush()
+
+                def debug_loop(n):
+                    for i in range(n):
+                        logger.debug("Suppressed record", extra={"i": i})
+
+                prefix = f"logging.{log_format}.{mode}"
+                results[f"{prefix}.formatter"] = type(handler.formatter).__name__
+                results[f"{prefix}.records_per_s"] = round(1 / measure(info_loop, 20_000))
+                if output == "null":
+                    # Suppressed records never reach the output
+                    results[f"{prefix}.debug_records_per_s"] = round(1 / measure(debug_loop, 50_000))
+                _close_logger(logger)
+    return results
+
+
+# Tracing
+
+def bench_trace() -> Dict[str, Any]:
+    """Overhead of one monitor.trace() span over an empty loop body."""
+    def empty_loop(n):
+        for _ in range(n):
+            pass
+
+    def trace_loop(n):
+        for _ in range(n):
+            with monitor.trace("bench"):
+                pass
+
+    baseline = measure(empty_loop, 200_000)
+    overhead_us = max(0.0, measure(trace_loop, 100_000) - baseline) * 1e6
+    mode = "enabled" if monitor.enabled and monitor._sentry else "disabled"
+    return {f"trace.{mode}.overhead_us": round(overhead_us, 3)}
+
+
+def bench_trace_enabled() -> Dict[str, Any]:
+    """trace() with Sentry initialised, in a child process (sentry_sdk.init is global)."""
+    try:
+        import sentry_sdk  # noqa: F401
+    except ImportError:
+        return {"trace.enabled.skipped": True}
+
+    env = dict(
+        os.environ,
+        SENTRY_ENABLED="true",
+        # Discard port: nothing listens, so no events leave the host
+        SENTRY_DSN="http://bench@127.0.0.1:9/1",
+        SENTRY_TRACES_SAMPLE_RATE="1.0",
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.core_services", "--json", "trace"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# Payment
+
+def bench_payment() -> Dict[str, Any]:
+    """PaymentService calls against a zero-latency simulator (service overhead only)."""
+    from app.core.payment import payment
+    from app.core.stripe_simulator import StripeSimulator
+
+    original = payment._stripe
+    payment._stripe = StripeSimulator(seed=1, latency_ms=0, error_rate=0, rate_limit_rate=0, webhook_sink=None)
+    try:
+        intents = []
+
+        def create_loop(n):
+            # No operation_id, so each create gets a random idempotency key
+            # and reaches the simulator
+            for _ in range(n):
+                intents.append(payment.create_payment_intent(amount=1000, metadata={"order": "bench"}))
+
+        def retrieve_cached_loop(n):
+            for i in range(n):
+                payment.retrieve_payment_intent(intents[i % len(intents)]["id"])
+
+        def retrieve_fresh_loop(n):
+            for i in range(n):
+                payment.retrieve_payment_intent(intents[i % len(intents)]["id"], fresh=True)
+
+        return {
+            "payment.create_intent_per_s": round(1 / measure(create_loop, 2_000)),
+            "payment.retrieve_cached_per_s": round(1 / measure(retrieve_cached_loop, 5_000)),
+            "payment.retrieve_fresh_per_s": round(1 / measure(retrieve_fresh_loop, 5_000)),
+        }
+    finally:
+        payment._stripe = original
+
+
+# Middleware
+
+def bench_middleware() -> Dict[str, Any]:
+    """Per-request overhead of RequestTimingMiddleware around a trivial ASGI app."""
+    import asyncio
+
+    from app.core.middleware import RequestTimingMiddleware
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    wrapped = RequestTimingMiddleware(app, server_timing=True, logger=_bench_logger("bench.http", "json", False))
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+    def loop(target):
+        async def requests(n):
+            for _ in range(n):
+                await target(dict(scope), receive, send)
+        return lambda n: asyncio.run(requests(n))
+
+    bare = measure(loop(app), 20_000)
+    timed = measure(loop(wrapped), 20_000)
+    return {
+        "middleware.requests_per_s": round(1 / timed),
+        "middleware.overhead_us": round(max(0.0, timed - bare) * 1e6, 2),
+    }
+
+
+# Import time
+
+def bench_import(runs: int = 5) -> Dict[str, Any]:
+    """Median wall time of `import app.core` in a fresh interpreter."""
+    code = "import time; s = time.perf_counter(); import app.core; print(time.perf_counter() - s)"
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return {"import.app_core_ms": round(statistics.median(samples) * 1000, 2)}
+
+
+BENCHMARKS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "cache": bench_cache,
+    "logging": bench_logging,
+    "trace": bench_trace,
+    "trace_enabled": bench_trace_enabled,
+    "payment": bench_payment,
+    "middleware": bench_middleware,
+    "import": bench_import,
+}
+
+
+def run(names: Optional[list] = None) -> Dict[str, Any]:
+    """
+    Run benchmarks and return their merged results.
+
+    Args:
+        names: Benchmarks to run (keys of BENCHMARKS; default: all)
+    """
+    results: Dict[str, Any] = {}
+    for name in names or BENCHMARKS:
+        results.update(BENCHMARKS[name]())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help=f"Any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--json", action="store_true", help="Print results on one line")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.benchmarks or None)
+    print(json.dumps(results) if args.json else json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
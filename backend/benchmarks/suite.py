@@ -0,0 +1,187 @@
+"""
+Benchmark regression suite.
+
+Runs the app.core service benchmarks and the webhook replay, compares the
+results with a stored baseline and exits non-zero when a metric regressed by
+more than the tolerance. Runs offline on a laptop or in CI.
+
+Usage (from backend/):
+    python -m benchmarks.suite                    # compare with baseline.json
+    python -m benchmarks.suite --update-baseline  # record a new baseline
+    python -m benchmarks.suite cache logging --tolerance 0.5
+    python -m benchmarks.suite --warn-only        # report, never fail
+
+Comparison rules, by metric name:
+    *_per_s          higher is better; regression if below baseline * (1 - tolerance)
+    *_us, *_ms       lower is better; regression if above baseline * (1 + tolerance)
+    boolean metrics  must keep their baseline value (e.g. webhook ordering_ok)
+Other metrics (counts, formatter names) are reported but not compared, and
+metrics missing on either side (skipped backends) are ignored.
+
+Timings are normalised for host speed: every run measures a fixed
+interpreter-bound loop ("calibration.loops_per_s", between suites, fastest
+kept) and baseline timings are scaled by how much faster or
+slower that loop ran than when the baseline was recorded. This absorbs a
+slower runner or a noisy neighbour, not a regression in our code. Baselines
+still belong to one Python version; refresh them when a change is an
+intended trade-off. On shared runners where single runs stay noisy, use
+--warn-only to report regressions without failing.
+
+Environment Variables:
+    BENCH_BASELINE: Baseline file (default: benchmarks/baseline.json)
+    BENCH_TOLERANCE: Allowed relative regression (default: 0.25)
+    BENCH_WARN_ONLY: Report regressions but exit 0 (default: false)
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks import core_services, webhook_replay
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+CALIBRATION = "calibration.loops_per_s"
+
+
+def calibrate() -> int:
+    """Loops per second of fixed dict, string and call work on this host right now."""
+    def loop(n):
+        counts: Dict[str, int] = {}
+        for i in range(n):
+            key = f"key{i & 1023}"
+            counts[key] = counts.get(key, 0) + 1
+
+    return round(1 / core_services.measure(loop, 200_000))
+
+
+def bench_webhooks() -> Dict[str, Any]:
+    result = webhook_replay.run(events=5000)
+    return {
+        "webhook.ingest_per_s": result["ingest_per_s"],
+        "webhook.total_per_s": result["total_per_s"],
+        "webhook.ordering_ok": result["ordering_ok"],
+    }
+
+
+SUITES = {**core_services.BENCHMARKS, "webhooks": bench_webhooks}
+
+
+def run(names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the selected suites (default: all) and merge their results."""
+    calibration = [calibrate()]
+    results: Dict[str, Any] = {}
+    for name in names or SUITES:
+        results.update(SUITES[name]())
+        calibration.append(calibrate())
+    results[CALIBRATION] = max(calibration)
+    return results
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[Tuple[str, Any, Any, str]]:
+    """
+    Compare results with a baseline, normalised by the calibration loop.
+
+    Returns:
+        List of (metric, expected value on this host, current value, reason)
+        for regressions
+    """
+    speed = 1.0
+    if results.get(CALIBRATION) and baseline.get(CALIBRATION):
+        speed = results[CALIBRATION] / baseline[CALIBRATION]
+
+    regressions = []
+    for name, current in sorted(results.items()):
+        expected = baseline.get(name)
+        if expected is None or name == CALIBRATION:
+            continue
+
+        if isinstance(current, bool) or isinstance(expected, bool):
+            if current != expected:
+                regressions.append((name, expected, current, "changed"))
+        elif name.endswith("_per_s"):
+            expected = round(expected * speed, 2)
+            if current < expected * (1 - tolerance):
+                regressions.append((name, expected, current, f"{_change(expected, current):+.0%}"))
+        elif name.endswith(("_us", "_ms")):
+            expected = round(expected / speed, 3)
+            if current > expected * (1 + tolerance):
+                regressions.append((name, expected, current, f"{_change(expected, current):+.0%}"))
+    return regressions
+
+
+def _change(expected: float, current: float) -> float:
+    return (current - expected) / expected if expected else 0.0
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path: str, results: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    """Write a baseline; suites not run this time keep their previous values."""
+    merged = {**(previous or {}), **results}
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": dict(sorted(merged.items())),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("suites", nargs="*", help=f"Any of: {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--baseline", default=os.getenv("BENCH_BASELINE", DEFAULT_BASELINE))
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCH_TOLERANCE", "0.25")))
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument(
+        "--warn-only",
+        action="store_true",
+        default=os.getenv("BENCH_WARN_ONLY", "false").lower() == "true",
+        help="Report regressions without failing",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    results = run(args.suites or None)
+    print(json.dumps(results, indent=2))
+
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results, baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    if CALIBRATION in baseline:
+        print(f"Host speed vs baseline: {results[CALIBRATION] / baseline[CALIBRATION]:.2f}x")
+    regressions = compare(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+        return 0
+
+    print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+    for name, expected, current, reason in regressions:
+        print(f"  {name}: {expected} -> {current} ({reason})", file=sys.stderr)
+    return 0 if args.warn_only else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
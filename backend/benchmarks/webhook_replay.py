@@ -0,0 +1,131 @@
+"""
+Webhook ingestion replay benchmark.
+
+Signs a burst of Stripe-style events (with redeliveries mixed in), pushes
+them through WebhookProcessor.ingest() from concurrent senders (as Stripe
+delivers over several connections) and reports throughput, duplicates
+dropped and whether per-object ordering held. ingest() acknowledges after
+the handlers ran, so each sender owns a set of objects and sends their
+events in order.
+
+Usage (from backend/):
+    python -m benchmarks.webhook_replay
+    python -m benchmarks.webhook_replay --events 10000 --objects 500 --workers 8 --senders 32
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.webhooks import WebhookProcessor, compute_signature
+
+SECRET = "whsec_benchmark"
+
+
+def make_deliveries(events: int, objects: int, duplicate_rate: float, seed: int):
+    """Build signed (payload, header, object_id) deliveries."""
+    rng = random.Random(seed)
+    timestamp = int(time.time())
+    run_id = f"{seed}{timestamp}"
+    sequence = {}
+    deliveries = []
+
+    for i in range(events):
+        object_id = f"pi_bench_{rng.randrange(objects)}"
+        sequence[object_id] = sequence.get(object_id, 0) + 1
+        event = {
+            "id": f"evt_bench_{run_id}_{i}",
+            "type": rng.choice(["payment_intent.created", "payment_intent.succeeded"]),
+            "data": {"object": {"id": object_id, "object": "payment_intent", "seq": sequence[object_id]}},
+        }
+        payload = json.dumps(event).encode()
+        header = f"t={timestamp},v1={compute_signature(payload, timestamp, SECRET)}"
+        deliveries.append((payload, header, object_id))
+        if rng.random() < duplicate_rate:
+            deliveries.append((payload, header, object_id))
+
+    return deliveries
+
+
+def run(
+    events: int = 10000,
+    objects: int = 500,
+    workers: int = 4,
+    duplicate_rate: float = 0.05,
+    seed: int = 1,
+    senders: int = 16
+):
+    """
+    Replay a burst of events and return measurements.
+
+    Returns:
+        Dictionary with deliveries, handled, duplicates, ingest/total events per second
+        and ordering_ok
+    """
+    processor = WebhookProcessor(workers=workers, queue_size=events * 2)
+    deliveries = make_deliveries(events, objects, duplicate_rate, seed)
+
+    last_seq = {}
+    handled = [0]
+    ordering_ok = [True]
+    lock = threading.Lock()
+
+    @processor.on("payment_intent.*")
+    def handle(event):
+        obj = event["data"]["object"]
+        with lock:
+            if obj["seq"] <= last_seq.get(obj["id"], 0):
+                ordering_ok[0] = False
+            last_seq[obj["id"]] = obj["seq"]
+            handled[0] += 1
+
+    partitions = [[] for _ in range(senders)]
+    for payload, header, object_id in deliveries:
+        partitions[zlib.crc32(object_id.encode()) % senders].append((payload, header))
+
+    statuses = {}
+
+    def send(partition):
+        for payload, header in partition:
+            status = processor.ingest(payload, header, secret=SECRET, block=True)["status"]
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=senders) as pool:
+        list(pool.map(send, partitions))
+    ingested = time.perf_counter() - started
+    processor.join()
+    total = time.perf_counter() - started
+    processor.stop()
+
+    return {
+        "deliveries": len(deliveries),
+        "handled": handled[0],
+        "duplicates": statuses.get("duplicate", 0),
+        "ingest_per_s": round(len(deliveries) / ingested),
+        "total_per_s": round(len(deliveries) / total),
+        "ordering_ok": ordering_ok[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--senders", type=int, default=16)
+    args = parser.parse_args()
+
+    result = run(args.events, args.objects, args.workers, args.duplicate_rate, args.seed, args.senders)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
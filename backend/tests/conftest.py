@@ -0,0 +1,34 @@
+"""
+Shared fixtures.
+
+Everything runs offline: Stripe calls go to the in-process simulator and the
+cache uses the in-memory backend. Services read their configuration at
+import, so the environment is set before any app module is imported.
+"""
+
+import os
+import sys
+
+os.environ.update({
+    "STRIPE_ENABLED": "false",
+    "REDIS_ENABLED": "false",
+    "STRIPE_RATE_LIMIT_RPS": "0",
+    "STRIPE_RETRY_BASE_DELAY_MS": "1",
+    "STRIPE_RETRY_MAX_DELAY_MS": "10",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.core.cache import cache
+from app.core.stripe_simulator import stripe_simulator
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """Start every test with an empty cache and simulator."""
+    cache.clear()
+    stripe_simulator.reset()
+    yield
+    cache.clear()
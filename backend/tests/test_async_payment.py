@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.core.async_payment import _encode_params, _object_path, async_payment
+from app.core.payment import PaymentError
+
+
+def test_create_and_retrieve_through_the_simulator():
+    """Async creates should return the sync shapes and be retrievable by ID"""
+    async def flow():
+        intent = await async_payment.create_payment_intent(amount=1500, metadata={"order_id": "o-1"})
+        fetched = await async_payment.retrieve_payment_intent(intent["id"], fresh=True)
+        return intent, fetched
+
+    intent, fetched = asyncio.run(flow())
+
+    assert intent["client_secret"]
+    assert "client_secret" not in fetched
+    assert (fetched["id"], fetched["amount"], fetched["status"]) == (intent["id"], 1500, "succeeded")
+    assert fetched["metadata"] == {"order_id": "o-1"}
+
+
+def test_params_use_stripe_form_encoding():
+    """Nested params should be flattened the way the Stripe API expects"""
+    params = {"amount": 100, "metadata": {"order_id": "o-1"}, "expand": ["customer"], "confirm": True, "skip": None}
+
+    assert _encode_params(params) == [
+        ("amount", "100"),
+        ("metadata[order_id]", "o-1"),
+        ("expand[0]", "customer"),
+        ("confirm", "true"),
+    ]
+
+
+def test_object_ids_stay_in_their_path_segment():
+    """IDs with path or query characters must not reach another endpoint"""
+    assert _object_path("customers", "../payment_intents?limit=1") == (
+        "/v1/customers/..%2Fpayment_intents%3Flimit%3D1"
+    )
+    with pytest.raises(PaymentError, match="No such customer: '../payment_intents'"):
+        asyncio.run(async_payment.retrieve_customer("../payment_intents", fresh=True))
+    with pytest.raises(PaymentError, match="No such payment_intent: 'pi_1/cancel'"):
+        asyncio.run(async_payment.retrieve_payment_intent("pi_1/cancel", fresh=True))
@@ -0,0 +1,45 @@
+import json
+
+from app.core.payment import payment
+from app.core.stripe_simulator import stripe_simulator
+
+
+def test_resumed_bulk_refund_skips_completed_items_without_duplicate_refunds(tmp_path):
+    """An interrupted batch re-run from its checkpoint should refund every intent exactly once"""
+    intent_ids = [stripe_simulator.PaymentIntent.create(amount=500, currency="usd")["id"] for _ in range(8)]
+    checkpoint = str(tmp_path / "refunds.jsonl")
+
+    # Interrupt after three outcomes; items already in flight still complete
+    # but are not checkpointed
+    outcomes = iter(payment.bulk_refund(intent_ids, concurrency=2, checkpoint=checkpoint))
+    for _ in range(3):
+        next(outcomes)
+    outcomes.close()
+
+    with open(checkpoint) as f:
+        checkpointed = len(f.readlines())
+
+    summary = payment.bulk_refund(intent_ids, concurrency=2, checkpoint=checkpoint).summary()
+
+    assert summary["skipped"] == checkpointed
+    assert summary["succeeded"] == len(intent_ids) - checkpointed
+    assert summary["failed"] == 0
+
+    refunded = [event["data"]["object"]["payment_intent"] for event in stripe_simulator.events("refund.created")]
+    assert sorted(refunded) == sorted(intent_ids)
+
+
+def test_failed_items_are_retried_on_resume(tmp_path):
+    """Only succeeded items are checkpointed, so a failure is attempted again"""
+    intent = stripe_simulator.PaymentIntent.create(amount=500, currency="usd", confirm=False)
+    checkpoint = str(tmp_path / "refunds.jsonl")
+
+    first = payment.bulk_refund([intent["id"]], checkpoint=checkpoint).summary()
+    assert first["failed"] == 1
+
+    stripe_simulator.PaymentIntent.confirm(intent["id"])
+    second = payment.bulk_refund([intent["id"]], checkpoint=checkpoint).summary()
+
+    assert second["succeeded"] == 1
+    with open(checkpoint) as f:
+        assert [json.loads(line)["index"] for line in f] == [0]
@@ -0,0 +1,81 @@
+import glob
+import gzip
+import logging
+import uuid
+
+import pytest
+
+from app.core import log_sink
+from app.core.log_sink import BufferedFileHandler
+
+
+@pytest.fixture(autouse=True)
+def no_rotation_grace(monkeypatch):
+    monkeypatch.setattr(log_sink, "ROTATION_GRACE_S", 0)
+
+
+def file_logger(handler):
+    logger = logging.getLogger(f"test.log_sink.{uuid.uuid4().hex}")
+    logger.propagate = False
+    logger.addHandler(handler)
+    return logger
+
+
+def read_lines(path):
+    lines = []
+    for name in glob.glob(path + "*"):
+        if name.endswith(".lock"):
+            continue
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rt", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+def test_rotates_by_size_and_compresses_without_losing_records(tmp_path):
+    """Every record should end up in the live file or a gzipped rotated file"""
+    path = str(tmp_path / "app.log")
+    handler = BufferedFileHandler(path, buffer_bytes=1024, flush_interval=0.01, max_bytes=4096, retention=0)
+    logger = file_logger(handler)
+
+    for i in range(500):
+        logger.warning("record %05d %s", i, "x" * 80)
+    handler.close()
+
+    rotated = glob.glob(path + ".*")
+    assert len([name for name in rotated if name.endswith(".gz")]) >= 5
+    assert all(name.endswith((".gz", ".lock")) for name in rotated)
+    assert sorted(read_lines(path)) == sorted(f"record {i:05d} {'x' * 80}" for i in range(500))
+
+
+def test_keeps_only_retention_rotated_files(tmp_path):
+    """The oldest rotated files beyond retention should be deleted"""
+    path = str(tmp_path / "app.log")
+    handler = BufferedFileHandler(path, buffer_bytes=1024, flush_interval=0.01, max_bytes=2048, retention=3)
+    logger = file_logger(handler)
+
+    for i in range(500):
+        logger.warning("record %05d %s", i, "x" * 80)
+    handler.close()
+
+    assert len(glob.glob(path + ".*.gz")) == 3
+
+
+def test_reopens_file_rotated_by_another_writer(tmp_path):
+    """A writer sharing the path should follow a rotation done by another one"""
+    path = str(tmp_path / "app.log")
+    first = BufferedFileHandler(path, flush_interval=0.01, max_bytes=0, compress=False)
+    second = BufferedFileHandler(path, flush_interval=0.01, max_bytes=0, compress=False)
+    first_logger, second_logger = file_logger(first), file_logger(second)
+
+    first_logger.warning("before rotation")
+    first.flush()
+    first.rotate()
+    second_logger.warning("after rotation")
+    second.flush()
+    first.close()
+    second.close()
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["after rotation"]
+    assert sorted(read_lines(path)) == ["after rotation", "before rotation"]
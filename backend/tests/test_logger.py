@@ -0,0 +1,62 @@
+import io
+import uuid
+
+import pytest
+
+from app.core.logger import FlightRecorderHandler, flight_recorder, get_logger, log_error
+
+
+@pytest.fixture
+def recorded_logger(monkeypatch):
+    """Logger configured with the flight recorder, writing INFO and above to a buffer."""
+    monkeypatch.setattr(flight_recorder, "enabled", True)
+    logger = get_logger(f"test.flight_recorder.{uuid.uuid4().hex}")
+    output = io.StringIO()
+    for handler in logger.handlers:
+        if not isinstance(handler, FlightRecorderHandler):
+            handler.setStream(output)
+    return logger, output
+
+
+def test_debug_records_are_suppressed_until_an_error(recorded_logger):
+    """DEBUG records should only be written once log_error() flushes the recorder"""
+    logger, output = recorded_logger
+
+    with flight_recorder.record():
+        logger.debug("loaded cart")
+        logger.info("charging card")
+        assert "loaded cart" not in output.getvalue()
+
+        log_error(logger, ValueError("card declined"))
+
+    written = output.getvalue()
+    assert "loaded cart" in written
+    assert written.index("loaded cart") < written.index("Exception occurred")
+    assert written.count("charging card") == 1
+
+
+def test_records_are_flushed_at_most_once(recorded_logger):
+    """A second error should not write the same suppressed records again"""
+    logger, output = recorded_logger
+
+    with flight_recorder.record():
+        logger.debug("step one")
+        log_error(logger, ValueError("first"))
+        log_error(logger, ValueError("second"))
+
+    assert output.getvalue().count("step one") == 1
+
+
+def test_each_request_has_its_own_buffer(recorded_logger):
+    """Records from another request must not leak into this request's flush"""
+    logger, output = recorded_logger
+
+    with flight_recorder.record():
+        logger.debug("other request")
+
+    with flight_recorder.record():
+        logger.debug("this request")
+        assert [entry["message"] for entry in flight_recorder.snapshot()] == ["this request"]
+        log_error(logger, ValueError("boom"))
+
+    assert "other request" not in output.getvalue()
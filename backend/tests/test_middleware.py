@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import uuid
+
+from app.core.logger import log_db_query
+from app.core.middleware import RequestTimingMiddleware
+from app.core.monitoring import monitor
+from app.core.timing import timed
+
+
+class Route:
+    path_format = "/users/{user_id}"
+
+
+@timed("payment")
+async def charge():
+    await asyncio.sleep(0.002)
+
+
+async def app(scope, receive, send):
+    # Routers set the matched route on the scope
+    scope["route"] = Route()
+    log_db_query(logging.getLogger("test.middleware"), "SELECT * FROM users WHERE id = 1", 2.5)
+    await charge()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(middleware, path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_server_timing_header_breaks_down_the_request():
+    """The response should carry payment, db, app and total durations"""
+    middleware = RequestTimingMiddleware(app, server_timing=True, logger=logging.getLogger("test.http"))
+
+    start = call(middleware, f"/users/{uuid.uuid4().hex}")[0]
+
+    headers = dict(start["headers"])
+    metrics = {part.split(";")[0]: part for part in headers[b"server-timing"].decode().split(", ")}
+    assert set(metrics) == {"db", "payment", "app", "total"}
+    assert metrics["db"] == 'db;dur=2.50;desc="1 calls"'
+    assert metrics["payment"].endswith('desc="1 calls"')
+    assert headers[b"content-type"] == b"text/plain"
+
+
+def test_request_metrics_are_named_by_route_template():
+    """Different user IDs should land in one route series"""
+    middleware = RequestTimingMiddleware(app, server_timing=False, logger=logging.getLogger("test.http"))
+    monitor.reset_metrics()
+
+    for _ in range(2):
+        start = call(middleware, f"/users/{uuid.uuid4().hex}")[0]
+        assert b"server-timing" not in dict(start["headers"])
+
+    durations = monitor.get_metrics()["distributions"]
+    series = [key for key in durations if key.startswith("http.request.duration")]
+    assert series == ["http.request.duration{method=GET,route=/users/{user_id},status=2xx}"]
+    assert durations[series[0]]["count"] == 2
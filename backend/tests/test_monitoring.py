@@ -0,0 +1,156 @@
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from app.core.monitoring import MonitoringService
+
+
+@pytest.fixture
+def monitor():
+    monitor = MonitoringService()
+    yield monitor
+    monitor.stop_watchdog()
+
+
+def test_active_operation_is_the_innermost_span(monitor):
+    """Nested trace() blocks should report the innermost operation, then unwind"""
+    with monitor.trace("outer"):
+        with monitor.trace("inner"):
+            assert monitor.active_operation() == "inner"
+        assert monitor.active_operation() == "outer"
+
+    assert monitor.active_operation() is None
+
+
+def test_concurrent_tasks_keep_their_own_spans(monitor):
+    """Interleaved tasks on one loop must not see each other's spans"""
+    seen = {}
+
+    async def handle(name):
+        with monitor.trace(name):
+            await asyncio.sleep(0.01)
+            seen[name] = monitor.active_operation()
+
+    async def main():
+        await asyncio.gather(handle("request.a"), handle("request.b"))
+
+    asyncio.run(main())
+
+    assert seen == {"request.a": "request.a", "request.b": "request.b"}
+
+
+def test_loops_of_finished_threads_are_forgotten(monitor):
+    """Each thread running asyncio.run must not leave its loop in the thread map"""
+    idents = []
+
+    async def handle():
+        with monitor.trace("request"):
+            await asyncio.sleep(0)
+
+    def worker():
+        idents.append(threading.get_ident())
+        asyncio.run(handle())
+
+    for _ in range(5):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert not set(idents) & set(monitor._thread_loops.keys())
+
+
+def test_slow_span_is_reported(monitor):
+    """A span longer than the threshold should be kept as a slow operation"""
+    monitor.slow_threshold_ms = 10
+    with monitor.trace("slow.query"):
+        time.sleep(0.02)
+    with monitor.trace("fast.query"):
+        pass
+
+    slow = monitor.get_slow_operations()
+    assert [entry["operation"] for entry in slow] == ["slow.query"]
+    assert slow[0]["kind"] == "slow_operation"
+
+
+def test_watchdog_captures_stack_of_stuck_thread(monitor):
+    """The watchdog should report a span while it is still open, with the thread's stack"""
+    monitor.slow_threshold_ms = 50
+    release = threading.Event()
+
+    def stuck_worker():
+        with monitor.trace("stuck.job"):
+            release.wait(2)
+
+    worker = threading.Thread(target=stuck_worker)
+    worker.start()
+    monitor.start_watchdog(interval=0.02)
+    try:
+        deadline = time.monotonic() + 2
+        while not monitor.get_slow_operations() and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        release.set()
+        worker.join()
+
+    stuck = [entry for entry in monitor.get_slow_operations() if entry["kind"] == "stuck_operation"]
+    assert [entry["operation"] for entry in stuck] == ["stuck.job"]
+    assert any("stuck_worker" in line for line in stuck[0]["stack"])
+
+
+def test_task_waiting_in_await_is_not_reported_as_stuck(monitor):
+    """A long await does not block the loop, so it is not a stuck operation"""
+    monitor.slow_threshold_ms = 50
+
+    async def main():
+        await monitor.start_loop_monitor(interval=0.01)
+        monitor.start_watchdog(interval=0.01)
+        with monitor.trace("awaiting.io"):
+            await asyncio.sleep(0.2)
+        monitor.stop_loop_monitor()
+
+    asyncio.run(main())
+
+    kinds = {(entry["kind"], entry["operation"]) for entry in monitor.get_slow_operations()}
+    assert ("stuck_operation", "awaiting.io") not in kinds
+    assert ("slow_operation", "awaiting.io") in kinds
+
+
+def test_metrics_are_aggregated_by_name_and_tags(monitor):
+    """Counters add up per tag set and distributions keep count, sum and max"""
+    monitor.increment("orders.created", tags={"plan": "pro"})
+    monitor.increment("orders.created", 2, tags={"plan": "pro"})
+    monitor.distribution("checkout.duration", 10)
+    monitor.distribution("checkout.duration", 30)
+
+    metrics = monitor.get_metrics()
+    assert metrics["counters"]["orders.created{plan=pro}"] == 3
+    duration = metrics["distributions"]["checkout.duration"]
+    assert (duration["count"], duration["sum"], duration["max"]) == (2, 40, 30)
+
+
+def test_memory_growth_points_at_the_allocating_line(monitor):
+    """Allocations kept between two snapshots should be the top growth entry"""
+    monitor.take_memory_snapshot()
+    retained = [bytes(1024) for _ in range(2000)]
+    monitor.take_memory_snapshot()
+    tracemalloc.stop()
+
+    top = monitor.memory_growth(limit=1)[0]
+    assert top["location"].startswith(__file__)
+    assert top["size_diff"] >= 2000 * 1024
+    assert len(retained) == 2000
+
+
+def test_memory_stats_are_recorded_as_gauges(monitor):
+    """collect_memory_stats() should expose RSS and GC counts as memory.* gauges"""
+    stats = monitor.collect_memory_stats()
+
+    gauges = monitor.get_metrics()["gauges"]
+    assert stats["rss_bytes"] > 0
+    assert gauges["memory.rss_bytes"] == stats["rss_bytes"]
+    assert "memory.gc_gen0_collections" in gauges
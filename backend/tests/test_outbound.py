@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.outbound import OutboundCaller, TokenBucket
+from app.core.payment import payment
+from app.core.stripe_simulator import SimulatedStripeError, StripeSimulator
+
+
+def test_retries_simulated_rate_limits_and_server_errors():
+    """Every create should succeed once, despite injected 429s and 500s"""
+    simulator = StripeSimulator(seed=5, error_rate=0.2, rate_limit_rate=0.2, dataset_size=0)
+    caller = OutboundCaller("test", max_retries=10, base_delay=0.001, max_delay=0.01)
+
+    for i in range(20):
+        caller.call("customer.create", simulator.Customer.create, email=f"user{i}@example.com")
+
+    stats = simulator.stats()
+    assert stats["objects"]["customer"] == 20
+    assert stats["rate_limited"] > 0 and stats["errors_injected"] > 0
+
+
+def test_gives_up_after_max_retries():
+    """A persistently failing API should raise after max_retries retries"""
+    simulator = StripeSimulator(seed=1, error_rate=1.0, dataset_size=0)
+    caller = OutboundCaller("test", max_retries=2, base_delay=0.001)
+
+    with pytest.raises(SimulatedStripeError):
+        caller.call("customer.create", simulator.Customer.create, email="user@example.com")
+
+    assert simulator.stats()["requests"] == 3
+
+
+def test_client_errors_are_not_retried():
+    """A 404 should fail on the first attempt"""
+    simulator = StripeSimulator(seed=1, dataset_size=0)
+    caller = OutboundCaller("test", max_retries=3, base_delay=0.001)
+
+    with pytest.raises(SimulatedStripeError) as raised:
+        caller.call("customer.retrieve", simulator.Customer.retrieve, "cus_missing")
+
+    assert raised.value.http_status == 404
+    assert simulator.stats()["requests"] == 1
+
+
+def test_token_bucket_allows_burst_then_waits():
+    """Tokens beyond the burst should be reserved at the refill rate"""
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+
+
+def test_rate_limited_caller_paces_sync_and_async_calls():
+    """Sync and async calls should share one bucket and be paced to the rate"""
+    simulator = StripeSimulator(seed=1, dataset_size=0)
+    caller = OutboundCaller("test", rate_limit=50, burst=1)
+
+    async def create_async(count):
+        await asyncio.gather(*[
+            caller.call_async(
+                "customer.create", simulator.call_async, "POST", "/v1/customers", {"email": "a@example.com"}
+            )
+            for _ in range(count)
+        ])
+
+    started = time.monotonic()
+    for _ in range(5):
+        caller.call("customer.create", simulator.Customer.create, email="s@example.com")
+    asyncio.run(create_async(5))
+    elapsed = time.monotonic() - started
+
+    # 10 calls with a burst of 1 at 50/s: at least 9 waits of 20ms
+    assert elapsed >= 0.17
+    assert simulator.stats()["objects"]["customer"] == 10
+
+
+def test_payment_service_retries_injected_stripe_errors(monkeypatch):
+    """Service creates should succeed despite simulated 429s and 500s, without duplicates"""
+    flaky = StripeSimulator(seed=3, error_rate=0.15, rate_limit_rate=0.15, dataset_size=0)
+    monkeypatch.setattr(payment, "_stripe", flaky)
+
+    customers = [payment.create_customer(email=f"user{i}@example.com") for i in range(20)]
+
+    stats = flaky.stats()
+    assert len({customer["id"] for customer in customers}) == 20
+    assert stats["objects"]["customer"] == 20
+    assert stats["errors_injected"] + stats["rate_limited"] > 0
@@ -0,0 +1,108 @@
+import asyncio
+import importlib
+
+from app.core.async_payment import async_payment
+from app.core.cache import cache
+from app.core.payment import payment, payment_cache
+from app.core.stripe_simulator import StripeSimulator, stripe_simulator
+from app.core.webhooks import webhooks
+
+# app.core re-exports the payment instance under the module's name
+payment_module = importlib.import_module("app.core.payment")
+
+
+def test_same_operation_id_creates_one_intent():
+    """Repeating a create with the same operation_id should return the first intent"""
+    first = payment.create_payment_intent(amount=1000, operation_id="order-1")
+    second = payment.create_payment_intent(amount=1000, operation_id="order-1")
+
+    assert second["id"] == first["id"]
+    assert stripe_simulator.stats()["objects"]["payment_intent"] == 1
+
+
+def test_idempotency_cache_holds_no_client_secret():
+    """Cached create results must not carry the secret, but repeats still return it"""
+    first = payment.create_payment_intent(amount=1000, operation_id="order-3")
+
+    cached = cache.get("idempotency:payment:payment_intent.create:order-3")
+    assert cached["id"] == first["id"]
+    assert "client_secret" not in cached
+
+    second = payment.create_payment_intent(amount=1000, operation_id="order-3")
+    third = asyncio.run(async_payment.create_payment_intent(amount=1000, operation_id="order-3"))
+    assert second["client_secret"] == third["client_secret"] == first["client_secret"]
+
+
+def test_same_amount_for_different_customers_creates_different_intents(monkeypatch):
+    """Content-derived keys must not merge two customers' payments"""
+    monkeypatch.setattr(payment_module, "IDEMPOTENCY_FROM_CONTENT", True)
+    alice = payment.create_customer(email="alice@example.com")
+    bob = payment.create_customer(email="bob@example.com")
+
+    alice_intent = payment.create_payment_intent(amount=1000, customer_id=alice["id"])
+    bob_intent = payment.create_payment_intent(amount=1000, customer_id=bob["id"])
+
+    assert alice_intent["id"] != bob_intent["id"]
+
+
+def test_anonymous_intents_for_same_amount_are_never_merged(monkeypatch):
+    """Two buyers paying the same amount without a customer are two payments"""
+    monkeypatch.setattr(payment_module, "IDEMPOTENCY_FROM_CONTENT", True)
+
+    first = payment.create_payment_intent(amount=1000)
+    second = payment.create_payment_intent(amount=1000)
+
+    assert first["id"] != second["id"]
+
+
+def test_concurrent_async_creates_with_same_operation_id_collapse(monkeypatch):
+    """Concurrent tasks creating the same operation should share one Stripe call"""
+    monkeypatch.setattr(stripe_simulator, "latency_ms", 5)
+
+    async def create_all():
+        return await asyncio.gather(*[
+            async_payment.create_payment_intent(amount=1000, operation_id="order-2")
+            for _ in range(5)
+        ])
+
+    intents = asyncio.run(create_all())
+
+    assert len({intent["id"] for intent in intents}) == 1
+    assert stripe_simulator.stats()["objects"]["payment_intent"] == 1
+
+
+def test_late_created_event_does_not_roll_back_cached_intent():
+    """An out-of-order payment_intent.created must not make retrieve report the old status"""
+    intent = payment.create_payment_intent(amount=1000)
+    assert payment.retrieve_payment_intent(intent["id"])["status"] == "succeeded"
+
+    created = stripe_simulator.events("payment_intent.created")[-1]
+    webhooks.dispatch(created)
+
+    assert payment_cache.get("payment_intent", intent["id"]) is None
+    assert payment.retrieve_payment_intent(intent["id"])["status"] == "succeeded"
+
+
+def test_webhook_invalidates_stale_cached_intent():
+    """A payment_intent.succeeded event should make the next retrieve read the new status"""
+    intent = stripe_simulator.PaymentIntent.create(amount=1000, currency="usd", confirm=False)
+    assert payment.retrieve_payment_intent(intent["id"])["status"] == "requires_confirmation"
+
+    stripe_simulator.PaymentIntent.confirm(intent["id"])
+    webhooks.dispatch(stripe_simulator.events("payment_intent.succeeded")[-1])
+
+    assert payment.retrieve_payment_intent(intent["id"])["status"] == "succeeded"
+
+
+def test_iterating_payment_intents_streams_every_page_once(monkeypatch):
+    """Pagination should yield new and historical intents, newest first, without gaps or repeats"""
+    simulator = StripeSimulator(seed=1, dataset_size=250)
+    monkeypatch.setattr(payment, "_stripe", simulator)
+    created = [simulator.PaymentIntent.create(amount=1000, currency="usd")["id"] for _ in range(3)]
+
+    streamed = [intent["id"] for intent in payment.iter_payment_intents(page_size=100)]
+    sequential = [intent["id"] for intent in payment.iter_payment_intents(page_size=100, prefetch=False)]
+
+    assert streamed[:3] == created[::-1]
+    assert len(streamed) == len(set(streamed)) == 253
+    assert sequential == streamed
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+
+from app.core.monitoring import monitor
+from app.core.profiler import SamplingProfiler
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def test_samples_are_tagged_with_trace_operation(tmp_path):
+    """Collapsed stacks should be rooted at the active trace() operation"""
+    profiler = SamplingProfiler()
+
+    with profiler.profile():
+        with monitor.trace("profile.busy"):
+            busy_loop(0.3)
+
+    path = profiler.export_collapsed(str(tmp_path / "busy.folded"))
+    with open(path) as f:
+        lines = f.read().splitlines()
+
+    assert profiler.stats()["samples"] > 0
+    assert any(line.startswith("[profile.busy];") and "busy_loop" in line for line in lines)
+
+
+def test_idle_daemon_threads_are_not_sampled(tmp_path):
+    """A daemon thread parked in a wait should not show up in the profile"""
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+
+    def park_idle():
+        stop.wait()
+
+    idle = threading.Thread(target=park_idle, daemon=True)
+    idle.start()
+    try:
+        with profiler.profile():
+            busy_loop(0.3)
+    finally:
+        stop.set()
+        idle.join()
+
+    path = profiler.export_collapsed(str(tmp_path / "idle.folded"))
+    with open(path) as f:
+        content = f.read()
+
+    assert "busy_loop" in content
+    assert "park_idle" not in content
+
+
+def test_speedscope_export_is_a_sampled_profile(tmp_path):
+    """The speedscope document should reference valid frames with one weight per sample"""
+    profiler = SamplingProfiler()
+    with profiler.profile():
+        busy_loop(0.2)
+
+    with open(profiler.export_speedscope(str(tmp_path / "profile.json"))) as f:
+        document = json.load(f)
+
+    frames = document["shared"]["frames"]
+    profile = document["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"]) > 0
+    assert all(0 <= index < len(frames) for stack in profile["samples"] for index in stack)
@@ -0,0 +1,91 @@
+import logging
+
+import pytest
+
+from app.core.query_analyzer import QueryAnalyzer, fingerprint
+
+
+class RecordList(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = QueryAnalyzer()
+    analyzer.n_plus_one_threshold = 10
+    records = RecordList()
+    analyzer._logger.addHandler(records)
+    analyzer.records = records.records
+    yield analyzer
+    analyzer._logger.removeHandler(records)
+
+
+def run_request(analyzer, repeats):
+    with analyzer.request("GET /orders"):
+        analyzer.record("SELECT * FROM orders WHERE user_id = 7", 2.0)
+        for item_id in range(repeats):
+            analyzer.record(f"SELECT * FROM items WHERE id = {item_id}", 1.0)
+    return analyzer.records[-1]
+
+
+def test_fingerprint_strips_literals():
+    """Queries differing only in literals should share a fingerprint"""
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'") == (
+        "select * from t where id in (?) and name = ?"
+    )
+    assert fingerprint("SELECT 1 FROM t WHERE a = 5") == fingerprint("select 1 from t   where a = 12")
+
+
+def test_repeats_above_threshold_are_flagged_as_n_plus_one(analyzer):
+    """More than n_plus_one_threshold repeats should produce a WARNING summary"""
+    summary = run_request(analyzer, 11)
+
+    assert summary.levelno == logging.WARNING
+    assert summary.n_plus_one == [
+        {"fingerprint": "select * from items where id = ?", "count": 11, "total_ms": 11.0}
+    ]
+    assert (summary.query_count, summary.unique_queries) == (12, 2)
+
+
+def test_repeats_at_threshold_are_not_flagged(analyzer):
+    """Exactly n_plus_one_threshold repeats is not an N+1"""
+    summary = run_request(analyzer, 10)
+
+    assert summary.levelno == logging.INFO
+    assert not hasattr(summary, "n_plus_one")
+
+
+def test_one_summary_per_request(analyzer):
+    """Queries are aggregated into one record instead of one line each"""
+    run_request(analyzer, 3)
+
+    assert len(analyzer.records) == 1
+    assert analyzer.records[0].db_time_ms == 5.0
+
+
+def test_top_queries_by_total_time(analyzer):
+    """Process-wide statistics should rank fingerprints across requests"""
+    run_request(analyzer, 5)
+    run_request(analyzer, 5)
+
+    top = analyzer.top_queries(by="total_ms", limit=1)[0]
+    assert top["fingerprint"] == "select * from items where id = ?"
+    assert (top["count"], top["total_ms"]) == (10, 10.0)
+
+
+def test_rare_slow_query_survives_eviction(analyzer):
+    """Eviction must keep a slow query even when cheaper ones run more often"""
+    analyzer.max_fingerprints = 12
+    analyzer.record("SELECT * FROM reports WHERE year = 2024", 900.0)
+    for table in range(30):
+        for _ in range(3):
+            analyzer.record(f"SELECT * FROM t{table} WHERE id = 1", 1.0)
+
+    fingerprints = [entry["fingerprint"] for entry in analyzer.top_queries(by="max_ms", limit=100)]
+    assert fingerprints[0] == "select * from reports where year = ?"
+    assert len(fingerprints) <= 12
@@ -0,0 +1,55 @@
+import importlib
+
+import pytest
+
+from app.core.stripe_simulator import SimulatedStripeError, StripeSimulator
+
+# app.core re-exports the simulator instance under the module's name
+simulator_module = importlib.import_module("app.core.stripe_simulator")
+
+
+def list_ids(simulator, **params):
+    return [obj["id"] for obj in simulator.PaymentIntent.list(**params)["data"]]
+
+
+def test_events_are_not_delivered_to_webhooks_by_default():
+    """Test-mode calls must not run the app's webhook handlers unless asked to"""
+    assert StripeSimulator(seed=1).webhook_sink is None
+
+
+def test_cursor_of_another_type_is_rejected():
+    """A customer ID is not a valid cursor for listing payment intents"""
+    simulator = StripeSimulator(seed=1, dataset_size=0)
+    simulator.PaymentIntent.create(amount=1000, currency="usd")
+    customer = simulator.Customer.create(email="user@example.com")
+
+    with pytest.raises(SimulatedStripeError) as raised:
+        simulator.PaymentIntent.list(starting_after=customer["id"])
+
+    assert (raised.value.http_status, raised.value.code) == (404, "resource_missing")
+
+
+def test_unknown_cursor_is_rejected():
+    """A cursor that was never issued should be a 404, not an empty page"""
+    simulator = StripeSimulator(seed=1, dataset_size=10)
+
+    with pytest.raises(SimulatedStripeError) as raised:
+        simulator.PaymentIntent.list(starting_after="pi_test_999999999999")
+
+    assert raised.value.http_status == 404
+
+
+def test_oldest_objects_are_forgotten_beyond_the_cap(monkeypatch):
+    """Stored objects are bounded and listing still pages correctly after eviction"""
+    monkeypatch.setattr(simulator_module, "MAX_STORED_OBJECTS", 10)
+    simulator = StripeSimulator(seed=1, dataset_size=0)
+    created = [simulator.PaymentIntent.create(amount=1000, currency="usd")["id"] for _ in range(25)]
+
+    stored = simulator.stats()["objects"]["payment_intent"]
+    assert stored <= 10
+
+    first_page = list_ids(simulator, limit=3)
+    second_page = list_ids(simulator, limit=3, starting_after=first_page[-1])
+    assert first_page + second_page == created[::-1][:6]
+    with pytest.raises(SimulatedStripeError):
+        simulator.PaymentIntent.retrieve(created[0])
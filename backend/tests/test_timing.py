@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from app.core.cache import cache
+from app.core.timing import RequestTiming, record_time, timed
+
+
+@timed("cache")
+def cache_lookup():
+    time.sleep(0.001)
+
+
+@timed("payment")
+def charge():
+    cache_lookup()
+    record_time("db", 5.0)
+    time.sleep(0.001)
+
+
+@timed("payment")
+async def charge_async():
+    cache_lookup()
+    await asyncio.sleep(0.001)
+
+
+def test_only_the_outermost_timed_call_is_counted():
+    """A cache lookup inside a payment call is payment time, not a second category"""
+    timing = RequestTiming()
+    with timing.bind():
+        charge()
+        cache_lookup()
+
+    breakdown = timing.breakdown()
+    assert breakdown["payment_calls"] == 1
+    assert breakdown["cache_calls"] == 1
+    assert "db_ms" not in breakdown
+    assert breakdown["payment_ms"] + breakdown["cache_ms"] + breakdown["app_ms"] <= breakdown["total_ms"] + 0.05
+
+
+def test_async_timed_call_counts_nested_calls_once():
+    """The async wrapper should also hide calls made inside it"""
+    timing = RequestTiming()
+
+    async def handle():
+        with timing.bind():
+            await charge_async()
+
+    asyncio.run(handle())
+
+    assert set(timing.categories) == {"payment"}
+    assert timing.categories["payment"][0] == 1
+
+
+def test_nothing_is_recorded_outside_a_request():
+    """Timed calls without a bound RequestTiming are plain calls"""
+    timing = RequestTiming()
+    charge()
+    record_time("db", 1.0)
+
+    assert timing.categories == {}
+
+
+def test_server_timing_lists_categories_app_and_total():
+    """The header should have one metric per category, then app and total"""
+    timing = RequestTiming()
+    timing.add("cache", 0.5)
+    timing.add("cache", 0.25)
+    timing.add("db", 3.0)
+    time.sleep(0.01)
+
+    metrics = [part.split(";") for part in timing.server_timing().split(", ")]
+
+    assert [metric[0] for metric in metrics] == ["cache", "db", "app", "total"]
+    assert metrics[0][1:] == ["dur=0.75", 'desc="2 calls"']
+    assert metrics[1][1:] == ["dur=3.00", 'desc="1 calls"']
+    total = float(metrics[3][1][len("dur="):])
+    app = float(metrics[2][1][len("dur="):])
+    assert abs(total - app - 3.75) < 0.02
+
+
+def test_memory_cache_calls_are_counted_without_time():
+    """In-memory cache calls should show up as cache_calls even though they are not timed"""
+    timing = RequestTiming()
+    with timing.bind():
+        cache.set("timing:key", 1)
+        cache.get("timing:key")
+        charge()
+
+    assert timing.categories["cache"] == [2, 0.0]
+    assert 'cache;dur=0.00;desc="2 calls"' in timing.server_timing()
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app.core.cache import cache
+from app.core.stripe_simulator import StripeSimulator
+from app.core.webhooks import WebhookError, WebhookProcessor, compute_signature
+
+SECRET = "whsec_test"
+
+
+def sign(event):
+    payload = json.dumps(event).encode()
+    timestamp = int(time.time())
+    return payload, f"t={timestamp},v1={compute_signature(payload, timestamp, SECRET)}"
+
+
+@pytest.fixture
+def processor():
+    processor = WebhookProcessor(workers=2)
+    processor.retry_delay = 0
+    yield processor
+    processor.stop()
+
+
+@pytest.fixture
+def simulator(processor):
+    """Simulator delivering its events to the processor under test."""
+    return StripeSimulator(seed=1, dataset_size=0, webhook_sink=processor.submit)
+
+
+def test_redelivered_event_is_handled_once(processor, simulator):
+    """A second delivery of the same event should be acknowledged as a duplicate"""
+    handled = []
+    processor.on("customer.created")(handled.append)
+    simulator.Customer.create(email="user@example.com")
+    processor.join()
+    payload, header = sign(simulator.events("customer.created")[-1])
+
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "duplicate"
+    assert len(handled) == 1
+
+
+def test_failed_delivery_is_processed_on_redelivery(processor):
+    """A handler failure should not be acknowledged and the redelivery should run it again"""
+    calls = []
+
+    @processor.on("customer.created")
+    def handler(event):
+        calls.append(event["id"])
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+
+    payload, header = sign({"id": "evt_retry", "type": "customer.created", "data": {"object": {"id": "cus_1"}}})
+
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "failed"
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "processed"
+    assert calls == ["evt_retry", "evt_retry"]
+
+
+def test_claim_of_a_process_that_died_expires(processor):
+    """An event claimed by a worker that never finished must be handled once the claim expires"""
+    handled = []
+    processor.on("customer.created")(handled.append)
+    event = {"id": "evt_orphaned", "type": "customer.created", "data": {"object": {"id": "cus_1"}}}
+    payload, header = sign(event)
+
+    # Claim taken by a process that crashed before its handlers ran
+    cache.set_if_absent("webhook:processing:evt_orphaned", 1, ttl=0.2)
+
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "in_progress"
+    assert handled == []
+
+    time.sleep(0.25)
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "processed"
+    assert [e["id"] for e in handled] == ["evt_orphaned"]
+
+
+def test_redelivery_while_handling_is_not_acknowledged(processor):
+    """A redelivery racing a delivery that later fails must not be acknowledged as a duplicate"""
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+
+    @processor.on("customer.created")
+    def handler(event):
+        calls.append(event["id"])
+        if len(calls) == 1:
+            started.set()
+            finish.wait(2)
+            raise RuntimeError("database unavailable")
+
+    payload, header = sign({"id": "evt_race", "type": "customer.created", "data": {"object": {"id": "cus_1"}}})
+    first = {}
+    delivery = threading.Thread(target=lambda: first.update(processor.ingest(payload, header, secret=SECRET)))
+    delivery.start()
+    started.wait(2)
+
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "in_progress"
+    finish.set()
+    delivery.join()
+
+    assert first["status"] == "failed"
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "processed"
+    assert processor.ingest(payload, header, secret=SECRET)["status"] == "duplicate"
+
+
+def test_submitted_event_is_dead_lettered_and_replayed(processor, simulator):
+    """Events whose handlers keep failing should be kept for replay, not dropped"""
+    processor.max_attempts = 2
+    broken = threading.Event()
+    broken.set()
+    handled = []
+
+    @processor.on("customer.created")
+    def handler(event):
+        if broken.is_set():
+            raise RuntimeError("handler bug")
+        handled.append(event["id"])
+
+    simulator.Customer.create(email="user@example.com")
+    processor.join()
+
+    assert [event["type"] for event in processor.dead_letters()] == ["customer.created"]
+
+    broken.clear()
+    assert processor.replay_dead_letters() == {"queued": 1}
+    processor.join()
+
+    assert handled == [simulator.events("customer.created")[-1]["id"]]
+    assert processor.dead_letters() == []
+
+
+def test_events_for_one_object_are_handled_in_order(processor, simulator):
+    """created must be handled before succeeded for every payment intent"""
+    seen = {}
+    processor.on("payment_intent.*")(
+        lambda event: seen.setdefault(event["data"]["object"]["id"], []).append(event["type"])
+    )
+
+    for _ in range(20):
+        simulator.PaymentIntent.create(amount=1000, currency="usd")
+    processor.join()
+
+    assert len(seen) == 20
+    assert all(types == ["payment_intent.created", "payment_intent.succeeded"] for types in seen.values())
+
+
+def test_invalid_signature_is_rejected(processor):
+    """A payload signed with another secret should raise WebhookError"""
+    payload, header = sign({"id": "evt_forged", "type": "customer.created", "data": {"object": {}}})
+
+    with pytest.raises(WebhookError):
+        processor.ingest(payload, header, secret="whsec_other")